@@ -0,0 +1,303 @@
+# Shared pre-aggregation for the charts in visualize_data.py.
+# Each aggregate is computed once from the processed artifacts and cached
+# next to them, so rendering cost depends on the number of distinct values
+# rather than the number of events.
+
+import hashlib
+import os
+import pandas as pd
+from config import PROCESSED_DIR
+from rollups import ROLLUP_ARTIFACTS, rollup_counts
+from storage import load_frame, artifact_signature
+
+
+# Processed artifacts and the columns the aggregates read from each (None = all)
+CHART_INPUTS = {
+    'hourly': (ROLLUP_ARTIFACTS['hour'], None),
+    'cowrie': ('cowrie_processed', ['timestamp', 'event_type', 'src_ip', 'username', 'password',
+                                    'input', 'attacker_role', 'event_category']),
+    'dionaea': ('dionaea_processed', ['src_ip', 'attacker_role', 'service']),
+    'logins': ('dionaea_logins', ['username', 'password']),
+    'sessions': ('attack_sessions', None)
+}
+
+AGGREGATES_CACHE = os.path.join(PROCESSED_DIR, "chart_aggregates.pkl")
+
+# Cowrie "commands" that are really SIP probes hitting the SSH port
+SIP_PATTERNS = [
+    'CSeq:', 'Max-Forwards:', 'Call-ID:', 'Content-Length:',
+    'Accept:', 'Via:', 'From:', 'To:', 'Contact:', 'User-Agent:',
+    'SIP/', 'OPTIONS sip:', 'INVITE sip:', 'REGISTER sip:',
+    'application/sdp', 'sip:', '@', 'Allow:'
+]
+
+
+def load_all_data():
+    """Load the processed artifacts, reading only the columns the charts use."""
+    data = {}
+    
+    for key, (name, columns) in CHART_INPUTS.items():
+        df = load_frame(name, columns=columns)
+        if df is not None:
+            data[key] = df
+            print(f"Loaded {key}: {len(df)} records")
+    
+    return data
+
+
+# CLEANING HELPERS
+
+def clean_password(x, width=20):
+    """Normalize a password for display, folding missing values into '(empty)'."""
+    if pd.isna(x):
+        return '(empty)'
+    x_str = str(x).strip()
+    if x_str == '' or x_str == 'nan' or x_str == 'None':
+        return '(empty)'
+    return x_str[:width] if len(x_str) > width else x_str
+
+
+def clean_username(x, width=20):
+    """Normalize a username for display."""
+    x_str = str(x).strip()
+    return x_str[:width] if len(x_str) > width else x_str
+
+
+def is_valid_shell_command(cmd):
+    """Reject SIP probe lines and bare numbers logged as Cowrie commands."""
+    cmd_upper = str(cmd).upper()
+    for pattern in SIP_PATTERNS:
+        if pattern.upper() in cmd_upper:
+            return False
+    if cmd_upper.startswith(('OPTIONS ', 'INVITE ', 'REGISTER ')):
+        return False
+    if cmd.isdigit():
+        return False
+    return True
+
+
+def sort_counts(counts):
+    """Sort counts in descending order the way Series.value_counts does."""
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def clean_counts(values, clean):
+    """
+    Count values after cleaning them, applying clean once per distinct value.
+    Matches values.map(clean).value_counts(), including the order of ties.
+    """
+    counts = values.value_counts(sort=False, dropna=False)
+    cleaned = [clean(value) for value in counts.index]
+    return sort_counts(counts.groupby(cleaned, sort=False).sum())
+
+
+# AGGREGATES
+
+def event_totals(data):
+    """Event, attacker, authentication and command counts per honeypot."""
+    cowrie_df = data['cowrie']
+    dionaea_df = data['dionaea']
+    categories = cowrie_df['event_category'].value_counts()
+    
+    return {
+        'cowrie_events': len(cowrie_df),
+        'dionaea_events': len(dionaea_df),
+        'cowrie_attackers': cowrie_df['src_ip'].nunique(),
+        'dionaea_attackers': dionaea_df['src_ip'].nunique(),
+        'cowrie_auth': int(categories.get('authentication', 0)),
+        'cowrie_commands': int(categories.get('command', 0)),
+        'dionaea_logins': len(data['logins']) if 'logins' in data else 0
+    }
+
+
+def rollup_value_counts(column):
+    """Return an aggregate counting timeline events per value of a rollup column."""
+    return lambda data: rollup_counts(data['hourly'], column)
+
+
+def hourly_roles(data):
+    """Timeline events per hour and attacker role, over every hour in the collection period."""
+    df = data['hourly']
+    pivot = df.groupby(['bucket', 'attacker_role'])['events'].sum().unstack(fill_value=0)
+    
+    if len(pivot) > 0:
+        full_range = pd.date_range(start=pivot.index.min(), end=pivot.index.max(), freq='h')
+        pivot = pivot.reindex(full_range, fill_value=0)
+    
+    return pivot
+
+
+def login_outcomes(data):
+    """Successful and failed Cowrie login attempts."""
+    counts = data['cowrie']['event_type'].value_counts()
+    event_types = counts.index.str.lower()
+    logins = event_types.str.contains('login')
+    
+    return {
+        'success': int(counts[logins & event_types.str.contains('success')].sum()),
+        'failed': int(counts[logins & event_types.str.contains('failed')].sum())
+    }
+
+
+def credential_counts(data):
+    """Cleaned username and password counts from Cowrie and Dionaea logins."""
+    cowrie = data['cowrie'][['username', 'password']].dropna(subset=['username'])
+    dionaea = data['logins'][['username', 'password']].dropna(subset=['username'])
+    all_creds = pd.concat([cowrie, dionaea], ignore_index=True)
+    
+    return {
+        'usernames': clean_counts(all_creds['username'], clean_username),
+        'passwords': clean_counts(all_creds['password'], clean_password)
+    }
+
+
+def cowrie_credential_counts(data):
+    """Cowrie username counts and passwords cleaned to dashboard width."""
+    cowrie_df = data['cowrie']
+    
+    return {
+        'usernames': cowrie_df['username'].dropna().value_counts(),
+        'passwords': clean_counts(cowrie_df['password'], lambda x: clean_password(x, width=15))
+    }
+
+
+def command_counts(data):
+    """Counts of shell commands executed in Cowrie, excluding SIP probes."""
+    df = data['cowrie']
+    commands = df[df['event_category'] == 'command']['input'].dropna()
+    commands = commands.str.strip()
+    commands = commands[commands != '']
+    
+    counts = commands.value_counts(sort=False)
+    valid = [is_valid_shell_command(cmd) for cmd in counts.index]
+    return sort_counts(counts[valid])
+
+
+def session_durations(data):
+    """Attacker role and duration of each session shorter than two hours."""
+    df = data['sessions']
+    durations = pd.DataFrame({
+        'attacker_role': df['attacker_role'],
+        'duration_seconds': (df['end_time'] - df['start_time']).dt.total_seconds()
+    })
+    
+    return durations[(durations['duration_seconds'] > 0) & (durations['duration_seconds'] < 7200)]
+
+
+def dionaea_service_counts(data):
+    """Counts of Dionaea connections per service."""
+    return data['dionaea']['service'].value_counts()
+
+
+def source_ip_counts(data):
+    """Event counts per source IP for each honeypot and the roles seen."""
+    cowrie_df = data['cowrie']
+    dionaea_df = data['dionaea']
+    roles = set(cowrie_df['attacker_role'].unique()) | set(dionaea_df['attacker_role'].unique())
+    
+    return {
+        'cowrie': cowrie_df.groupby('src_ip').size(),
+        'dionaea': dionaea_df.groupby('src_ip').size(),
+        'roles': sorted(roles)
+    }
+
+
+# Aggregate name -> (processed inputs it needs, function computing it)
+AGGREGATES = {
+    'event_totals': (['cowrie', 'dionaea'], event_totals),
+    'source_counts': (['hourly'], rollup_value_counts('source')),
+    'role_counts': (['hourly'], rollup_value_counts('attacker_role')),
+    'service_counts': (['hourly'], rollup_value_counts('service')),
+    'category_counts': (['hourly'], rollup_value_counts('event_category')),
+    'hourly_roles': (['hourly'], hourly_roles),
+    'login_outcomes': (['cowrie'], login_outcomes),
+    'credential_counts': (['cowrie', 'logins'], credential_counts),
+    'cowrie_credential_counts': (['cowrie'], cowrie_credential_counts),
+    'command_counts': (['cowrie'], command_counts),
+    'session_durations': (['sessions'], session_durations),
+    'dionaea_service_counts': (['dionaea'], dionaea_service_counts),
+    'source_ip_counts': (['cowrie', 'dionaea'], source_ip_counts)
+}
+
+
+def build_aggregates(data):
+    """Compute every aggregate whose inputs were loaded."""
+    aggregates = {}
+    
+    for name, (inputs, func) in AGGREGATES.items():
+        if all(key in data for key in inputs):
+            aggregates[name] = func(data)
+    
+    return aggregates
+
+
+def _update_digest(digest, obj):
+    """Feed an aggregate (frame, series, dict, list or scalar) into a hash."""
+    if isinstance(obj, pd.DataFrame):
+        digest.update(repr((list(obj.columns), list(obj.dtypes.astype(str)))).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        digest.update(repr((obj.name, str(obj.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, dict):
+        for key in sorted(obj):
+            digest.update(repr(key).encode())
+            _update_digest(digest, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(obj).encode())
+
+
+def aggregate_digest(*objs):
+    """Return a content hash of one or more aggregates."""
+    digest = hashlib.sha256()
+    for obj in objs:
+        _update_digest(digest, obj)
+    return digest.hexdigest()
+
+
+def aggregates_signature():
+    """
+    Identify the inputs of the cached aggregates: each processed artifact's
+    path, size and modification time, plus the code of this module.
+    """
+    with open(os.path.abspath(__file__), 'rb') as f:
+        code = hashlib.sha1(f.read()).hexdigest()
+    
+    inputs = {key: artifact_signature(name) for key, (name, _) in CHART_INPUTS.items()}
+    return {'code': code, 'inputs': inputs}
+
+
+def load_aggregates(refresh=False):
+    """
+    Return the chart aggregates, reusing the cached ones while the processed
+    artifacts are unchanged. refresh=True recomputes them from the artifacts.
+    """
+    signature = aggregates_signature()
+    
+    if not refresh and os.path.exists(AGGREGATES_CACHE):
+        try:
+            cached = pd.read_pickle(AGGREGATES_CACHE)
+        except Exception:
+            cached = None
+        if cached is not None and cached['signature'] == signature:
+            print("Using cached chart aggregates")
+            return cached['aggregates']
+    
+    data = load_all_data()
+    if not data:
+        return {}
+    
+    aggregates = build_aggregates(data)
+    save_aggregates(aggregates, signature)
+    
+    return aggregates
+
+
+def save_aggregates(aggregates, signature=None):
+    """Cache aggregates computed from the current processed artifacts."""
+    if signature is None:
+        signature = aggregates_signature()
+    pd.to_pickle({'signature': signature, 'aggregates': aggregates}, AGGREGATES_CACHE)
@@ -0,0 +1,172 @@
+"""
+Embedded analytics database for correlated honeypot data.
+Copies the unified timeline, attack sessions and multi-honeypot attackers
+from the processed store into one indexed SQLite file, so questions such as
+one IP's history or the sessions in a time window are answered from an
+index instead of loading the whole timeline.
+"""
+
+import argparse
+import os
+import sqlite3
+from contextlib import contextmanager
+from urllib.parse import quote
+import pandas as pd
+from config import ANALYTICS_DB, CORRELATION_CHUNK_SIZE
+from storage import iter_frame_chunks
+
+
+# Database table -> processed artifact copied into it
+DB_TABLES = {
+    "timeline": "unified_timeline",
+    "sessions": "attack_sessions",
+    "multi_honeypot_attackers": "multi_honeypot_attackers"
+}
+
+# Indexes created once the tables are loaded: name -> (table, columns)
+DB_INDEXES = {
+    "idx_timeline_src_ip": ("timeline", "src_ip, timestamp"),
+    "idx_timeline_timestamp": ("timeline", "timestamp"),
+    "idx_timeline_session_id": ("timeline", "session_id, timestamp"),
+    "idx_sessions_session_id": ("sessions", "session_id"),
+    "idx_sessions_src_ip": ("sessions", "src_ip, start_time"),
+    "idx_sessions_start_time": ("sessions", "start_time"),
+    "idx_multi_honeypot_ip": ("multi_honeypot_attackers", "ip")
+}
+
+# Datetimes are stored as fixed-width text, which sorts and compares in time order
+DB_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+DB_DATETIME_COLUMNS = ["timestamp", "start_time", "end_time", "first_seen", "last_seen"]
+
+
+def _to_db_time(value):
+    """Format a timestamp (or anything pd.Timestamp accepts) the way the database stores it."""
+    return pd.Timestamp(value).strftime(DB_TIME_FORMAT)
+
+
+def _to_db_rows(df):
+    """Convert the datetime columns of a chunk to database text."""
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime(DB_TIME_FORMAT)
+    return df
+
+
+def build_analytics_db(db_path=ANALYTICS_DB, chunksize=CORRELATION_CHUNK_SIZE):
+    """
+    Build the analytics database from the processed artifacts, a chunk at a
+    time, then index it. The new file replaces the old one only once it is
+    complete. Returns the number of rows loaded per table.
+    """
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    
+    rows = {}
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # The file is discarded on failure, so skip the rollback journal
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        
+        for table, name in DB_TABLES.items():
+            for chunk in iter_frame_chunks(name, chunksize=chunksize):
+                _to_db_rows(chunk).to_sql(table, conn, if_exists="append", index=False)
+                rows[table] = rows.get(table, 0) + len(chunk)
+        
+        for index, (table, columns) in DB_INDEXES.items():
+            if table in rows:
+                conn.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    
+    os.replace(tmp_path, db_path)
+    
+    return rows
+
+
+def connect_analytics_db(db_path=ANALYTICS_DB):
+    """Open a read-only connection to the analytics database."""
+    return sqlite3.connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro", uri=True)
+
+
+@contextmanager
+def _connection(db_path, conn=None):
+    """Yield the shared connection if given, otherwise a read-only one closed afterwards."""
+    if conn is not None:
+        yield conn
+        return
+    
+    conn = connect_analytics_db(db_path)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def query_analytics_db(query, params=(), conn=None, db_path=ANALYTICS_DB):
+    """Run a query against the analytics database, parsing datetime columns."""
+    with _connection(db_path, conn) as db:
+        df = pd.read_sql_query(query, db, params=params)
+    
+    for column in DB_DATETIME_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], format=DB_TIME_FORMAT)
+    
+    return df
+
+
+# COMMON LOOKUPS
+
+def ip_history(src_ip, start=None, end=None, conn=None, db_path=ANALYTICS_DB):
+    """Return the timeline events of one source IP in time order, optionally within [start, end]."""
+    query = "SELECT * FROM timeline WHERE src_ip = ?"
+    params = [src_ip]
+    if start is not None:
+        query += " AND timestamp >= ?"
+        params.append(_to_db_time(start))
+    if end is not None:
+        query += " AND timestamp <= ?"
+        params.append(_to_db_time(end))
+    
+    return query_analytics_db(query + " ORDER BY timestamp", params, conn, db_path)
+
+
+def ip_sessions(src_ip, conn=None, db_path=ANALYTICS_DB):
+    """Return the attack sessions of one source IP in time order."""
+    return query_analytics_db("SELECT * FROM sessions WHERE src_ip = ? ORDER BY start_time",
+                              [src_ip], conn, db_path)
+
+
+def sessions_between(start, end, conn=None, db_path=ANALYTICS_DB):
+    """Return the attack sessions active at any time within [start, end]."""
+    return query_analytics_db(
+        "SELECT * FROM sessions WHERE start_time <= ? AND end_time >= ? ORDER BY start_time",
+        [_to_db_time(end), _to_db_time(start)], conn, db_path
+    )
+
+
+def session_events(session_id, conn=None, db_path=ANALYTICS_DB):
+    """Return the timeline events of one attack session in time order."""
+    return query_analytics_db("SELECT * FROM timeline WHERE session_id = ? ORDER BY timestamp",
+                              [int(session_id)], conn, db_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the honeypot analytics database.")
+    parser.add_argument("--ip", help="print the event history of this source IP")
+    parser.add_argument("--sessions", nargs=2, metavar=("START", "END"),
+                        help="print the attack sessions active between two times")
+    args = parser.parse_args()
+    
+    if args.ip:
+        print(ip_history(args.ip).to_string(index=False))
+    elif args.sessions:
+        print(sessions_between(*args.sessions).to_string(index=False))
+    else:
+        rows = build_analytics_db()
+        for table, count in rows.items():
+            print(f"Loaded {table}: {count} rows")
+        print(f"Saved: {ANALYTICS_DB}")
@@ -0,0 +1,386 @@
+"""
+Benchmarks for the honeypot analysis pipeline.
+Micro-benchmarks report rows per second for the legacy row-by-row code
+paths and their vectorized replacements on generated data. The pipeline
+suite runs every stage, from the loaders to each chart, on synthetic
+datasets of several sizes, records throughput and peak memory, and
+compares them with a stored baseline so regressions fail the run.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from config import ATTACKER_IPS, REPORTS_DIR
+from aggregates import build_aggregates
+from correlate_logs import (build_unified_timeline, identify_attack_sessions, analyze_cross_honeypot_activity,
+                            summarize_sessions)
+from decoders import available_json_backends
+from generate_data import generate_dataset
+from load_cowrie import (categorize_event, categorize_events, iter_cowrie_events, iter_cowrie_records,
+                         new_cowrie_columns, append_cowrie_event, records_to_columns,
+                         load_cowrie_logs, process_cowrie_events, load_cowrie_file)
+from load_dionaea import (map_port_to_service, map_ports_to_services, connect_dionaea, load_dionaea_tables,
+                          process_dionaea_connections, process_dionaea_logins, process_dionaea_downloads)
+from lookups import map_attacker_roles
+from profiler import stage
+from rollups import rollup_events
+import visualize_data
+
+
+# Event types and ports sampled when generating benchmark data
+COWRIE_EVENT_TYPES = [
+    "cowrie.session.connect", "cowrie.client.version", "cowrie.client.kex",
+    "cowrie.login.failed", "cowrie.login.success", "cowrie.command.input",
+    "cowrie.session.file_download", "cowrie.session.closed", "cowrie.log.closed"
+]
+DIONAEA_PORTS = [21, 22, 23, 80, 443, 445, 1433, 3306, 5060, 8080, 135, 1900]
+
+# Dataset sizes (events) the pipeline suite runs on, and events per source IP in them
+PIPELINE_SIZES = [100000, 1000000]
+EVENTS_PER_IP = 1000
+
+# Stored pipeline results that later runs are compared with
+BENCHMARK_BASELINE = os.path.join(REPORTS_DIR, "benchmark_baseline.json")
+
+# Allowed drop in throughput and rise in peak memory before a stage counts as a regression
+REGRESSION_TOLERANCE = 0.25
+
+# Stages faster than this, or memory changes smaller than this, are within noise
+MIN_COMPARED_SECONDS = 0.1
+MIN_COMPARED_MB = 50
+
+
+def time_call(func, *args, repeat=3):
+    """Return the best wall-clock time of func(*args) over several runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_result(name, rows, seconds, peak_rss_mb=None):
+    """Build a benchmark result record."""
+    result = {
+        "name": name,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else float("inf")
+    }
+    if peak_rss_mb is not None:
+        result["peak_rss_mb"] = peak_rss_mb
+    return result
+
+
+def bench_categorization(rows, seed=0):
+    """Compare per-row and vectorized categorization and role/service mapping."""
+    rng = np.random.default_rng(seed)
+    event_types = pd.Series(rng.choice(COWRIE_EVENT_TYPES, rows))
+    ports = pd.Series(rng.choice(DIONAEA_PORTS, rows))
+    src_ips = pd.Series(rng.choice(list(ATTACKER_IPS) + ["203.0.113.7"], rows))
+    
+    cases = [
+        ("categorize_event (apply)", lambda: event_types.apply(categorize_event)),
+        ("categorize_events (vectorized)", lambda: categorize_events(event_types)),
+        ("map_port_to_service (apply)", lambda: ports.apply(map_port_to_service)),
+        ("map_ports_to_services (vectorized)", lambda: map_ports_to_services(ports)),
+        ("attacker role (map/fillna)", lambda: src_ips.map(ATTACKER_IPS).fillna("unknown")),
+        ("map_attacker_roles (vectorized)", lambda: map_attacker_roles(src_ips))
+    ]
+    
+    return [make_result(name, rows, time_call(func)) for name, func in cases]
+
+
+def make_cowrie_lines(rows, seed=0):
+    """Generate Cowrie JSON log lines with the keys a real sensor writes."""
+    rng = np.random.default_rng(seed)
+    event_types = rng.choice(COWRIE_EVENT_TYPES, rows)
+    src_ips = rng.choice(list(ATTACKER_IPS), rows)
+    src_ports = rng.integers(1024, 65535, rows)
+    start = pd.Timestamp("2026-01-01", tz="UTC")
+    
+    lines = []
+    for i in range(rows):
+        event = {
+            "eventid": str(event_types[i]),
+            "src_ip": str(src_ips[i]),
+            "src_port": int(src_ports[i]),
+            "dst_ip": "172.16.0.20",
+            "dst_port": 22,
+            "session": f"{i // 20:012x}",
+            "protocol": "ssh",
+            "message": f"{event_types[i]} event",
+            "sensor": "cowrie-honeypot",
+            "uuid": "6b1f2c4e-0d7a-4a8e-9c55-3f2b1e0a9d47",
+            "timestamp": (start + pd.Timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        }
+        if event["eventid"].startswith("cowrie.login"):
+            event["username"] = "root"
+            event["password"] = "123456"
+        elif event["eventid"] == "cowrie.command.input":
+            event["input"] = "uname -a"
+        lines.append(json.dumps(event) + "\n")
+    
+    return lines
+
+
+def legacy_cowrie_columns(path):
+    """Decode full events with json.loads and append their fields one by one."""
+    columns = new_cowrie_columns()
+    for event in iter_cowrie_events(path):
+        append_cowrie_event(columns, event)
+    return columns
+
+
+def projected_cowrie_columns(path, backend):
+    """Decode only the needed fields with a JSON backend and transpose them."""
+    return records_to_columns(list(iter_cowrie_records(path, backend)))
+
+
+def bench_json_decoding(rows):
+    """Compare log line to column array decoding for each JSON backend on a generated log."""
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        f.writelines(make_cowrie_lines(rows))
+        path = f.name
+    
+    cases = [("json.loads + append (legacy)", lambda: legacy_cowrie_columns(path))]
+    for backend in available_json_backends():
+        cases.append((f"{backend} projected",
+                      lambda backend=backend: projected_cowrie_columns(path, backend)))
+    
+    try:
+        return [make_result(name, rows, time_call(func)) for name, func in cases]
+    finally:
+        os.remove(path)
+
+
+# PIPELINE SUITE
+
+def _run_stage(results, name, rows, func, *args):
+    """Run one pipeline stage once, quietly, and add its result; returns the stage's output."""
+    with stage(name, rows_in=rows) as record:
+        with contextlib.redirect_stdout(io.StringIO()):
+            output = func(*args)
+    results.append(make_result(name, rows, record["wall_seconds"], record["peak_rss_mb"]))
+    return output
+
+
+def bench_pipeline(events, seed=0):
+    """
+    Generate a dataset of `events` events in a temporary directory and run
+    every pipeline stage on it in order. Returns one result per stage.
+    """
+    workdir = tempfile.mkdtemp(prefix="honeypot_bench_")
+    cowrie_log = os.path.join(workdir, "cowrie.json")
+    dionaea_db = os.path.join(workdir, "dionaea.sqlite")
+    results = []
+    
+    try:
+        ips = max(len(ATTACKER_IPS), events // EVENTS_PER_IP)
+        counts = generate_dataset(events, ips=ips, seed=seed, cowrie_log=cowrie_log, dionaea_db=dionaea_db)
+        
+        # Cowrie: the legacy list-of-events loader, and the chunked loader the pipeline uses
+        raw_events = _run_stage(results, "load_cowrie_logs", counts["cowrie_events"], load_cowrie_logs, cowrie_log)
+        _run_stage(results, "process_cowrie_events", len(raw_events), process_cowrie_events, raw_events)
+        del raw_events
+        cowrie = _run_stage(results, "load_cowrie_file", counts["cowrie_events"], load_cowrie_file, cowrie_log)
+        
+        # Dionaea
+        rows = counts["connections"] + counts["logins"] + counts["downloads"]
+        conn = connect_dionaea(dionaea_db)
+        try:
+            connections, logins, downloads = _run_stage(results, "load_dionaea_tables", rows,
+                                                        load_dionaea_tables, dionaea_db, None, conn)
+        finally:
+            conn.close()
+        data = {
+            "cowrie": cowrie,
+            "dionaea": _run_stage(results, "process_dionaea_connections", len(connections),
+                                  process_dionaea_connections, connections),
+            "logins": _run_stage(results, "process_dionaea_logins", len(logins), process_dionaea_logins, logins),
+            "downloads": _run_stage(results, "process_dionaea_downloads", len(downloads),
+                                    process_dionaea_downloads, downloads)
+        }
+        
+        # Correlation
+        rows = sum(len(df) for df in data.values())
+        timeline = _run_stage(results, "build_unified_timeline", rows, build_unified_timeline, data)
+        timeline = _run_stage(results, "identify_attack_sessions", len(timeline), identify_attack_sessions, timeline)
+        _run_stage(results, "analyze_cross_honeypot_activity", len(timeline),
+                   analyze_cross_honeypot_activity, timeline)
+        
+        # Charts, drawn from the aggregates of the in-memory data and saved to the temporary directory
+        data["hourly"] = rollup_events(timeline)["hour"]
+        data["sessions"] = summarize_sessions(timeline)
+        aggs = _run_stage(results, "build_aggregates", len(timeline), build_aggregates, data)
+        
+        matplotlib.use("Agg")
+        charts_dir = visualize_data.CHARTS_DIR
+        visualize_data.CHARTS_DIR = workdir
+        try:
+            for _, func, _, _ in visualize_data.CHARTS:
+                _run_stage(results, func.__name__, len(timeline), func, aggs)
+        finally:
+            visualize_data.CHARTS_DIR = charts_dir
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    for result in results:
+        result["size"] = events
+    return results
+
+
+def _result_key(result):
+    """Identify a pipeline result across runs by stage and dataset size."""
+    return f"{result['name']}@{result['size']}"
+
+
+def load_baseline(path=BENCHMARK_BASELINE):
+    """Load stored pipeline results keyed by stage and size, or None if there are none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return {_result_key(r): r for r in json.load(f)["results"]}
+
+
+def save_results(results, path):
+    """Write pipeline results, with the machine they ran on, to a JSON file."""
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "cpus": os.cpu_count(),
+        "results": results
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare_to_baseline(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compare pipeline results with the baseline. Returns a description of
+    each stage whose throughput fell, or whose peak memory rose, by more
+    than the tolerance.
+    """
+    regressions = []
+    
+    for result in results:
+        base = baseline.get(_result_key(result))
+        if base is None:
+            continue
+        
+        if max(result["seconds"], base["seconds"]) >= MIN_COMPARED_SECONDS:
+            if result["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+                regressions.append(f"{_result_key(result)}: {result['rows_per_sec']:,.0f} rows/sec "
+                                   f"(baseline {base['rows_per_sec']:,.0f})")
+        
+        memory, base_memory = result.get("peak_rss_mb"), base.get("peak_rss_mb")
+        if memory is not None and base_memory is not None and memory - base_memory >= MIN_COMPARED_MB:
+            if memory > base_memory * (1 + tolerance):
+                regressions.append(f"{_result_key(result)}: peak {memory:,.0f} MB (baseline {base_memory:,.0f} MB)")
+    
+    return regressions
+
+
+def print_results(results):
+    """Print benchmark results as a table."""
+    width = max(len(r["name"]) for r in results)
+    memory = any("peak_rss_mb" in r for r in results)
+    print(f"{'Benchmark':<{width}}  {'Rows':>12}  {'Seconds':>9}  {'Rows/sec':>14}"
+          + (f"  {'Peak MB':>9}" if memory else ""))
+    for r in results:
+        line = f"{r['name']:<{width}}  {r['rows']:>12,}  {r['seconds']:>9.4f}  {r['rows_per_sec']:>14,.0f}"
+        if memory:
+            line += f"  {r.get('peak_rss_mb') or 0:>9,.1f}"
+        print(line)
+
+
+def run_pipeline_suite(sizes=PIPELINE_SIZES, seed=0, baseline=BENCHMARK_BASELINE, save_baseline=False,
+                       tolerance=REGRESSION_TOLERANCE):
+    """
+    Run the pipeline suite at each dataset size and compare it with the
+    baseline (or store it as the new baseline). Returns True if no stage
+    regressed.
+    """
+    results = []
+    for size in sizes:
+        print(f"\nPipeline stages ({size:,} events):")
+        size_results = bench_pipeline(size, seed)
+        print_results(size_results)
+        results.extend(size_results)
+    
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    print(f"\nResults saved to: {save_results(results, os.path.join(REPORTS_DIR, f'benchmark_{stamp}.json'))}")
+    
+    if save_baseline:
+        print(f"Baseline saved to: {save_results(results, baseline)}")
+        return True
+    
+    stored = load_baseline(baseline)
+    if stored is None:
+        print(f"No baseline at {baseline}; run with --save-baseline to create one")
+        return True
+    
+    regressions = compare_to_baseline(results, stored, tolerance)
+    if regressions:
+        print(f"\n[FAIL] {len(regressions)} regression(s) beyond {tolerance:.0%} of the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return False
+    
+    print(f"\nNo regressions beyond {tolerance:.0%} of the baseline")
+    return True
+
+
+def main(rows=1000000, pipeline=False, sizes=PIPELINE_SIZES, seed=0, baseline=BENCHMARK_BASELINE,
+         save_baseline=False, tolerance=REGRESSION_TOLERANCE):
+    """Run the micro-benchmarks, or the pipeline suite. Returns False if the pipeline regressed."""
+    print("=" * 60)
+    print("Honeypot Pipeline Benchmarks")
+    print("=" * 60)
+    
+    if pipeline:
+        return run_pipeline_suite(sizes, seed, baseline, save_baseline, tolerance)
+    
+    print(f"\nCategorization and mapping ({rows:,} rows):")
+    print_results(bench_categorization(rows))
+    
+    lines = min(rows, 200000)
+    print(f"\nCowrie JSON decoding ({lines:,} lines):")
+    print_results(bench_json_decoding(lines))
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline.")
+    parser.add_argument("--rows", type=int, default=1000000,
+                        help="number of generated rows per benchmark")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="run every pipeline stage on generated datasets instead of the micro-benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=PIPELINE_SIZES,
+                        help="dataset sizes in events for --pipeline")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed of the generated datasets")
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE,
+                        help="stored results to compare --pipeline runs with")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this --pipeline run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed fractional drop in throughput or rise in memory")
+    args = parser.parse_args()
+    ok = main(rows=args.rows, pipeline=args.pipeline, sizes=args.sizes, seed=args.seed,
+              baseline=args.baseline, save_baseline=args.save_baseline, tolerance=args.tolerance)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,37 @@
+# Checkpoint files that let incremental runs resume where the last run stopped.
+
+import json
+import os
+from config import CHECKPOINT_DIR
+
+
+def checkpoint_path(name):
+    """Return the path of a named checkpoint file."""
+    return os.path.join(CHECKPOINT_DIR, f"{name}.json")
+
+
+def load_checkpoint(name):
+    """Load a named checkpoint, or return None if there is none."""
+    path = checkpoint_path(name)
+    if not os.path.exists(path):
+        return None
+    
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_checkpoint(name, state):
+    """Atomically write a named checkpoint."""
+    path = checkpoint_path(name)
+    tmp_path = path + ".tmp"
+    
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def clear_checkpoint(name):
+    """Remove a named checkpoint so the next incremental run starts fresh."""
+    path = checkpoint_path(name)
+    if os.path.exists(path):
+        os.remove(path)
@@ -7,6 +7,8 @@ BASE_DIR = os.path.expanduser("~/honeypot_research")
 
 # Raw data paths
 RAW_DATA_DIR = os.path.join(BASE_DIR, "raw_data")
+# COWRIE_LOG may also be a directory of rotated logs or a glob pattern
+# (e.g. ".../cowrie/logs/cowrie.json*"); rotated logs may be gzip-compressed
 COWRIE_LOG = os.path.join(RAW_DATA_DIR, "cowrie/logs/cowrie_combined.json")
 DIONAEA_DB = os.path.join(RAW_DATA_DIR, "dionaea/dionaea.sqlite")
 
@@ -15,9 +17,22 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "analysis/output")
 PROCESSED_DIR = os.path.join(OUTPUT_DIR, "processed")
 CHARTS_DIR = os.path.join(OUTPUT_DIR, "charts")
 REPORTS_DIR = os.path.join(OUTPUT_DIR, "reports")
+CHECKPOINT_DIR = os.path.join(OUTPUT_DIR, "checkpoints")
+
+# Indexed SQLite copy of the correlated data for ad hoc queries
+ANALYTICS_DB = os.path.join(PROCESSED_DIR, "honeypot_analytics.sqlite")
+
+# Processed artifact format: "parquet" (needs pyarrow, falls back to CSV) or "csv"
+STORAGE_FORMAT = "parquet"
+
+# Also write CSV copies of processed artifacts
+EXPORT_CSV = False
+
+# Also build the analytics database after correlation
+EXPORT_DB = False
 
 # Create directories if they don't exist
-for directory in [PROCESSED_DIR, CHARTS_DIR, REPORTS_DIR]:
+for directory in [PROCESSED_DIR, CHARTS_DIR, REPORTS_DIR, CHECKPOINT_DIR]:
     os.makedirs(directory, exist_ok=True)
 
 # Attack source IP mapping
@@ -29,3 +44,22 @@ ATTACKER_IPS = {
     "172.16.0.105": "multistage",
     "172.16.0.10": "manual"
 }
+
+# Number of Cowrie log lines parsed per chunk in streaming mode
+COWRIE_CHUNK_SIZE = 100000
+
+# Number of Dionaea rows fetched per query chunk (None reads each table at once)
+DIONAEA_CHUNK_SIZE = 100000
+
+# Processes used to parse rotated Cowrie logs in parallel (None uses all cores)
+COWRIE_WORKERS = None
+
+# JSON parser for Cowrie lines: "auto" (fastest installed), "simdjson", "orjson" or "json"
+COWRIE_JSON_BACKEND = "auto"
+
+# Open attack sessions kept by the streaming sessionizer; the least recently
+# active session is closed early when the cap is reached
+MAX_OPEN_SESSIONS = 100000
+
+# Rows read per chunk when correlating out of core (correlate_logs.py --shards)
+CORRELATION_CHUNK_SIZE = 1000000
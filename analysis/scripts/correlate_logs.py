@@ -4,15 +4,38 @@ Correlates events across Cowrie and Dionaea honeypots to build unified attack ti
 
 """
 
+import argparse
+import glob
+import numpy as np
 import pandas as pd
 import os
-from datetime import timedelta
-from config import PROCESSED_DIR, ATTACKER_IPS
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from config import (PROCESSED_DIR, OUTPUT_DIR, EXPORT_CSV, EXPORT_DB, ANALYTICS_DB,
+                    CORRELATION_CHUNK_SIZE)
+from analytics_db import build_analytics_db
+from checkpoint import load_checkpoint, save_checkpoint
+from rollups import (rollup_events, merge_rollups, load_rollups, save_rollups, rollup_signatures,
+                     rollup_statistics)
+from schema import as_category, compact_frame, report_memory
+from profiler import start_profile, stage, save_profile
+from storage import load_frame, save_frame, save_frame_chunks, iter_frame_chunks, artifact_path
+
+try:
+    import pyarrow.compute as pc
+except ImportError:
+    pc = None
 
 
 # Time window for correlating events from the same attack session (seconds)
 CORRELATION_WINDOW = 300
 
+# Time span of each slice when sharded timelines are merged back in time order
+TIMELINE_SLICE = pd.Timedelta(days=1)
+
+# File each shard's sessionized events are written to
+SESSIONIZED_SHARD = "sessionized.parquet"
+
 
 def normalize_timestamp(ts):
     """Convert timestamp to timezone-naive for consistent comparison."""
@@ -23,156 +46,242 @@ def normalize_timestamp(ts):
     return ts
 
 
+# Processed artifacts and the columns the timeline needs from each
+TIMELINE_INPUTS = {
+    "cowrie": ("cowrie_processed", ["timestamp", "src_ip", "attacker_role", "event_type",
+                                    "event_category", "input", "message"]),
+    "dionaea": ("dionaea_processed", ["timestamp", "src_ip", "attacker_role", "service", "dst_port"]),
+    "logins": ("dionaea_logins", ["timestamp", "src_ip", "attacker_role", "service",
+                                  "username", "password"]),
+    "downloads": ("dionaea_downloads", ["timestamp", "src_ip", "attacker_role", "md5_hash"])
+}
+
+# Labels used when reporting loaded inputs
+INPUT_LABELS = {
+    "cowrie": "Cowrie",
+    "dionaea": "Dionaea connections",
+    "logins": "Dionaea logins",
+    "downloads": "Dionaea downloads"
+}
+
+
 def load_processed_data():
-    """Load all processed CSV files into DataFrames."""
+    """Load the columns of each processed artifact that the timeline needs."""
     
     data = {}
     
-    # Load Cowrie events
-    cowrie_path = os.path.join(PROCESSED_DIR, "cowrie_processed.csv")
-    if os.path.exists(cowrie_path):
-        data["cowrie"] = pd.read_csv(cowrie_path, parse_dates=["timestamp"])
-        print(f"Loaded Cowrie: {len(data['cowrie'])} events")
-    
-    # Load Dionaea connections
-    dionaea_path = os.path.join(PROCESSED_DIR, "dionaea_processed.csv")
-    if os.path.exists(dionaea_path):
-        data["dionaea"] = pd.read_csv(dionaea_path, parse_dates=["timestamp"])
-        print(f"Loaded Dionaea connections: {len(data['dionaea'])} events")
-    
-    # Load Dionaea logins
-    logins_path = os.path.join(PROCESSED_DIR, "dionaea_logins.csv")
-    if os.path.exists(logins_path):
-        data["logins"] = pd.read_csv(logins_path, parse_dates=["timestamp"])
-        print(f"Loaded Dionaea logins: {len(data['logins'])} events")
-    
-    # Load Dionaea downloads
-    downloads_path = os.path.join(PROCESSED_DIR, "dionaea_downloads.csv")
-    if os.path.exists(downloads_path):
-        data["downloads"] = pd.read_csv(downloads_path, parse_dates=["timestamp"])
-        print(f"Loaded Dionaea downloads: {len(data['downloads'])} events")
+    for key, (name, columns) in TIMELINE_INPUTS.items():
+        df = load_frame(name, columns=columns)
+        if df is not None:
+            data[key] = df
+            print(f"Loaded {INPUT_LABELS[key]}: {len(df)} events")
     
     return data
 
 
+# Columns of the unified timeline, in output order
+TIMELINE_COLUMNS = ["timestamp", "source", "src_ip", "attacker_role",
+                    "event_type", "event_category", "service", "detail"]
+
+
+def _column(df, name, default):
+    """Return a column of df, or a constant column if it does not exist."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index, dtype=object)
+
+
+def _is_falsy(values):
+    """
+    Elementwise truthiness of a column, as used by `a or b` on row values.
+    None and empty strings are falsy; NaN (a missing CSV cell) is truthy.
+    """
+    values = values.to_numpy(dtype=object)
+    return np.equal(values, None) | np.equal(values, "")
+
+
+def _as_text(values):
+    """Format every value of a column the way str() does."""
+    return pd.Series(values.to_numpy(dtype=object).astype(str), index=values.index)
+
+
+def _project_events(df, source, event_type, event_category, service, detail):
+    """Project one source DataFrame onto the unified timeline schema."""
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(df["timestamp"], utc=True),
+        "source": source,
+        "src_ip": df["src_ip"],
+        "attacker_role": _column(df, "attacker_role", "unknown"),
+        "event_type": event_type,
+        "event_category": event_category,
+        "service": service,
+        "detail": detail
+    }, index=df.index, columns=TIMELINE_COLUMNS)
+
+
 def build_unified_timeline(data):
     """
     Build a unified timeline of all events from both honeypots.
     Each event is tagged with its source honeypot for comparison.
     """
     
-    timeline_records = []
+    frames = []
     
-    # Process Cowrie events
+    # Project Cowrie events (detail is input, else message, else empty)
     if "cowrie" in data:
-        for _, row in data["cowrie"].iterrows():
-            record = {
-                "timestamp": row["timestamp"],
-                "source": "cowrie",
-                "src_ip": row["src_ip"],
-                "attacker_role": row.get("attacker_role", "unknown"),
-                "event_type": row["event_type"],
-                "event_category": row.get("event_category", "other"),
-                "service": "SSH/Telnet",
-                "detail": row.get("input") or row.get("message") or ""
-            }
-            timeline_records.append(record)
-    
-    # Process Dionaea connections
+        df = data["cowrie"]
+        detail = _column(df, "input", None)
+        for fallback in (_column(df, "message", None), ""):
+            detail = detail.where(~_is_falsy(detail), fallback)
+        frames.append(_project_events(
+            df, "cowrie", df["event_type"], _column(df, "event_category", "other"),
+            "SSH/Telnet", detail
+        ))
+    
+    # Project Dionaea connections
     if "dionaea" in data:
-        for _, row in data["dionaea"].iterrows():
-            record = {
-                "timestamp": row["timestamp"],
-                "source": "dionaea",
-                "src_ip": row["src_ip"],
-                "attacker_role": row.get("attacker_role", "unknown"),
-                "event_type": "connection",
-                "event_category": "connection",
-                "service": row.get("service", "unknown"),
-                "detail": f"Port {row.get('dst_port', 'unknown')}"
-            }
-            timeline_records.append(record)
-    
-    # Process Dionaea logins
+        df = data["dionaea"]
+        frames.append(_project_events(
+            df, "dionaea", "connection", "connection", _column(df, "service", "unknown"),
+            "Port " + _as_text(_column(df, "dst_port", "unknown"))
+        ))
+    
+    # Project Dionaea logins
     if "logins" in data:
-        for _, row in data["logins"].iterrows():
-            username = row.get("username", "")
-            password = row.get("password", "")
-            record = {
-                "timestamp": row["timestamp"],
-                "source": "dionaea",
-                "src_ip": row["src_ip"],
-                "attacker_role": row.get("attacker_role", "unknown"),
-                "event_type": "login_attempt",
-                "event_category": "authentication",
-                "service": row.get("service", "unknown"),
-                "detail": f"{username}:{password}"
-            }
-            timeline_records.append(record)
-    
-    # Process Dionaea downloads
+        df = data["logins"]
+        detail = (_as_text(_column(df, "username", "")) + ":" +
+                  _as_text(_column(df, "password", "")))
+        frames.append(_project_events(
+            df, "dionaea", "login_attempt", "authentication",
+            _column(df, "service", "unknown"), detail
+        ))
+    
+    # Project Dionaea downloads (first 16 characters of the MD5 hash)
     if "downloads" in data:
-        for _, row in data["downloads"].iterrows():
-            record = {
-                "timestamp": row["timestamp"],
-                "source": "dionaea",
-                "src_ip": row["src_ip"],
-                "attacker_role": row.get("attacker_role", "unknown"),
-                "event_type": "malware_download",
-                "event_category": "file_transfer",
-                "service": "HTTP",
-                "detail": row.get("md5_hash", "")[:16] if row.get("md5_hash") else ""
-            }
-            timeline_records.append(record)
-    
-    # Create DataFrame and normalize timestamps
-    timeline_df = pd.DataFrame(timeline_records)
-    
-    # Convert all timestamps to timezone-naive for consistent comparison
-    timeline_df["timestamp"] = pd.to_datetime(timeline_df["timestamp"], utc=True)
+        df = data["downloads"]
+        md5_hash = _column(df, "md5_hash", "")
+        missing = _is_falsy(md5_hash) | md5_hash.isna().to_numpy()
+        detail = _as_text(md5_hash).str[:16].where(~missing, "")
+        frames.append(_project_events(
+            df, "dionaea", "malware_download", "file_transfer", "HTTP", detail
+        ))
+    
+    if not frames:
+        return pd.DataFrame(columns=TIMELINE_COLUMNS)
+    
+    # Concatenate once; timestamps are already UTC so they can be made timezone-naive
+    timeline_df = compact_frame(pd.concat(frames, ignore_index=True))
     timeline_df["timestamp"] = timeline_df["timestamp"].dt.tz_localize(None)
     
-    timeline_df = timeline_df.sort_values("timestamp").reset_index(drop=True)
+    # Simultaneous events keep their input order
+    timeline_df = timeline_df.sort_values("timestamp", kind="stable").reset_index(drop=True)
     
     return timeline_df
 
 
-def identify_attack_sessions(timeline_df, window_seconds=CORRELATION_WINDOW):
+def _ip_time_order(ip_codes, times):
+    """
+    Stable order by IP code, then time.
+    Timelines arrive nearly sorted by time, so the time pass is cheap; the IP
+    codes are then placed with 16-bit radix passes.
+    """
+    order = np.argsort(times, kind="stable")
+    shift = 0
+    while shift == 0 or (ip_codes.max() >> shift) > 0:
+        digits = ((ip_codes[order] >> shift) & 0xFFFF).astype(np.uint16)
+        order = order[np.argsort(digits, kind="stable")]
+        shift += 16
+    return order
+
+
+def _sessionize_arrays(ip_codes, timestamps, window_ns, missing_ip):
+    """
+    Sort events by IP code, then timestamp, and flag rows that open a session.
+    A session starts when the IP changes or the gap to the previous event
+    exceeds the window. Returns the sort order and the flags in that order.
+    """
+    missing_time = np.isnat(timestamps)
+    times = timestamps.view("int64")
+    order = _ip_time_order(ip_codes, np.where(missing_time, np.iinfo(np.int64).max, times))
+    
+    codes = ip_codes[order]
+    times = times[order]
+    missing_time = missing_time[order]
+    
+    new_session = np.ones(len(order), dtype=bool)
+    if len(order) > 1:
+        gap = (np.diff(times) > window_ns) & ~missing_time[1:] & ~missing_time[:-1]
+        new_session[1:] = (codes[1:] != codes[:-1]) | gap
+    
+    # Events without a source IP never share a session
+    new_session |= codes == missing_ip
+    
+    return order, new_session
+
+
+def _ip_partitions(ip_codes, n_codes, parts):
+    """Split the IP codes into contiguous ranges holding similar event counts."""
+    cumulative = np.cumsum(np.bincount(ip_codes, minlength=n_codes))
+    targets = cumulative[-1] * np.arange(1, parts) / parts
+    cuts = np.searchsorted(cumulative, targets, side="right")
+    bounds = np.unique(np.concatenate(([0], cuts, [n_codes])))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _sessionize_parallel(ip_codes, timestamps, window_ns, missing_ip, workers):
+    """Sessionize disjoint IP ranges in a process pool and stitch the results."""
+    partitions = [np.flatnonzero((ip_codes >= lo) & (ip_codes < hi))
+                  for lo, hi in _ip_partitions(ip_codes, missing_ip + 1, workers)]
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_sessionize_arrays,
+                           [ip_codes[rows] for rows in partitions],
+                           [timestamps[rows] for rows in partitions],
+                           [window_ns] * len(partitions),
+                           [missing_ip] * len(partitions))
+        results = list(results)
+    
+    # Partitions cover ascending IP ranges, so their sorted outputs concatenate in order
+    order = np.concatenate([rows[part_order] for rows, (part_order, _) in zip(partitions, results)])
+    new_session = np.concatenate([flags for _, flags in results])
+    
+    return order, new_session
+
+
+def identify_attack_sessions(timeline_df, window_seconds=CORRELATION_WINDOW, workers=1):
     """
     Group events into attack sessions based on source IP and time proximity.
     Events from the same IP within the time window are considered part of the same session.
+    With workers > 1, disjoint ranges of source IPs are sessionized in parallel.
     """
     
     if timeline_df.empty:
         return timeline_df
     
-    timeline_df = timeline_df.sort_values(["src_ip", "timestamp"]).reset_index(drop=True)
+    # Sorted factorization gives IP codes in src_ip order; missing IPs sort last
+    ip_codes, uniques = pd.factorize(as_category(timeline_df["src_ip"]), sort=True)
+    missing_ip = len(uniques)
+    ip_codes = np.where(ip_codes < 0, missing_ip, ip_codes)
     
-    session_ids = []
-    current_session = 0
-    prev_ip = None
-    prev_time = None
+    timestamps = pd.to_datetime(timeline_df["timestamp"]).to_numpy(dtype="datetime64[ns]")
+    window_ns = int(window_seconds * 1e9)
     
-    for _, row in timeline_df.iterrows():
-        current_ip = row["src_ip"]
-        current_time = row["timestamp"]
-        
-        # Start new session if IP changed or time gap exceeded
-        if prev_ip != current_ip:
-            current_session += 1
-        elif prev_time is not None and pd.notna(current_time) and pd.notna(prev_time):
-            time_diff = (current_time - prev_time).total_seconds()
-            if time_diff > window_seconds:
-                current_session += 1
-        
-        session_ids.append(current_session)
-        prev_ip = current_ip
-        prev_time = current_time
+    if workers > 1 and missing_ip > 1:
+        order, new_session = _sessionize_parallel(ip_codes, timestamps, window_ns, missing_ip, workers)
+    else:
+        order, new_session = _sessionize_arrays(ip_codes, timestamps, window_ns, missing_ip)
     
-    timeline_df["session_id"] = session_ids
+    session_ids = np.cumsum(new_session)
     
-    # Re-sort by timestamp for chronological view
-    timeline_df = timeline_df.sort_values("timestamp").reset_index(drop=True)
+    # Re-sort by timestamp for chronological view, with missing timestamps last;
+    # simultaneous events stay in source IP order
+    times = timestamps[order]
+    valid = ~np.isnat(times)
+    chronological = np.concatenate((np.flatnonzero(valid)[times[valid].argsort(kind="stable")],
+                                    np.flatnonzero(~valid)))
+    
+    timeline_df = timeline_df.take(order[chronological]).reset_index(drop=True)
+    timeline_df["session_id"] = session_ids[chronological]
     
     return timeline_df
 
@@ -181,6 +290,8 @@ def analyze_cross_honeypot_activity(timeline_df):
     """
     Identify attackers that targeted both honeypots.
     This shows attack patterns that span multiple services.
+    Per-IP event counts by honeypot, first/last seen and distinct services
+    are computed in one grouped pass rather than per IP group.
     """
     
     results = {
@@ -190,170 +301,520 @@ def analyze_cross_honeypot_activity(timeline_df):
         "attack_patterns": []
     }
     
-    # Group by source IP
-    ip_groups = timeline_df.groupby("src_ip")
-    
-    for ip, group in ip_groups:
-        sources = group["source"].unique()
-        
-        if len(sources) > 1:
-            # This IP attacked both honeypots
-            results["multi_honeypot_ips"].append({
-                "ip": ip,
-                "role": group["attacker_role"].iloc[0],
-                "cowrie_events": len(group[group["source"] == "cowrie"]),
-                "dionaea_events": len(group[group["source"] == "dionaea"]),
-                "first_seen": group["timestamp"].min(),
-                "last_seen": group["timestamp"].max(),
-                "services_targeted": group["service"].nunique()
-            })
-        elif "cowrie" in sources:
-            results["cowrie_only_ips"].append(ip)
-        else:
-            results["dionaea_only_ips"].append(ip)
+    df = timeline_df[timeline_df["src_ip"].notna()]
+    if df.empty:
+        return results
+    
+    # Events per IP and honeypot, plus per-IP time range and distinct services
+    source_counts = df.groupby(["src_ip", "source"], observed=True).size().unstack(fill_value=0)
+    grouped = df.groupby("src_ip", observed=True)
+    per_ip = pd.DataFrame({
+        "role": df.drop_duplicates("src_ip").set_index("src_ip")["attacker_role"],
+        "cowrie_events": source_counts.get("cowrie", 0),
+        "dionaea_events": source_counts.get("dionaea", 0),
+        "first_seen": grouped["timestamp"].min(),
+        "last_seen": grouped["timestamp"].max(),
+        "services_targeted": grouped["service"].nunique()
+    }).loc[source_counts.index]
+    
+    multi = (source_counts > 0).sum(axis=1) > 1
+    cowrie_only = ~multi & (per_ip["cowrie_events"] > 0)
+    
+    # This IP attacked both honeypots
+    multi_df = per_ip[multi].rename_axis("ip").reset_index()
+    results["multi_honeypot_ips"] = multi_df.to_dict("records")
+    results["cowrie_only_ips"] = per_ip.index[cowrie_only].tolist()
+    results["dionaea_only_ips"] = per_ip.index[~multi & ~cowrie_only].tolist()
     
     return results
 
 
-def generate_attack_sequence(timeline_df, src_ip):
+# Attack sequence step fields and the timeline columns they come from
+SEQUENCE_STEPS = {
+    "time": "timestamp",
+    "honeypot": "source",
+    "action": "event_type",
+    "service": "service",
+    "detail": "detail"
+}
+
+
+def _sequence_columns(events):
+    """
+    Return the step fields of events as lists, with details cut to 50
+    characters and missing details as empty strings.
+    """
+    columns = {step: events[column].tolist() for step, column in SEQUENCE_STEPS.items()}
+    detail = events["detail"]
+    present = detail.notna() & ~_is_falsy(detail)
+    columns["detail"] = detail.str[:50].where(present, "").tolist()
+    return columns
+
+
+def _sequence_steps(columns, start, stop):
+    """Build the steps for rows start:stop of the sequence columns."""
+    keys = list(columns)
+    values = [columns[key][start:stop] for key in keys]
+    return [dict(zip(keys, step)) for step in zip(*values)]
+
+
+def generate_attack_sequence(timeline_df, src_ip, index=None):
     """
     Generate the attack sequence for a specific IP address.
     Shows the chronological order of actions taken by the attacker.
+    With an index from build_sequence_index the timeline is not scanned.
     """
     
-    ip_events = timeline_df[timeline_df["src_ip"] == src_ip].copy()
-    ip_events = ip_events.sort_values("timestamp")
-    
-    sequence = []
-    for _, row in ip_events.iterrows():
-        step = {
-            "time": row["timestamp"],
-            "honeypot": row["source"],
-            "action": row["event_type"],
-            "service": row["service"],
-            "detail": row["detail"][:50] if row["detail"] else ""
-        }
-        sequence.append(step)
-    
-    return sequence
-
-
-def calculate_attack_statistics(timeline_df):
-    """Calculate summary statistics for the correlated data."""
-    
-    stats = {
-        "total_events": len(timeline_df),
-        "unique_ips": timeline_df["src_ip"].nunique(),
-        "unique_sessions": timeline_df["session_id"].nunique() if "session_id" in timeline_df.columns else 0,
-        "time_range": {
-            "start": timeline_df["timestamp"].min(),
-            "end": timeline_df["timestamp"].max()
-        },
-        "events_by_source": timeline_df["source"].value_counts().to_dict(),
-        "events_by_category": timeline_df["event_category"].value_counts().to_dict(),
-        "events_by_role": timeline_df["attacker_role"].value_counts().to_dict(),
-        "services_targeted": timeline_df["service"].value_counts().to_dict()
-    }
+    if index is not None:
+        return lookup_attack_sequence(index, src_ip)
+    
+    ip_events = timeline_df[timeline_df["src_ip"] == src_ip]
+    ip_events = ip_events.sort_values("timestamp", kind="stable")
     
-    return stats
+    return _sequence_steps(_sequence_columns(ip_events), 0, len(ip_events))
 
 
-def export_correlated_data(timeline_df, cross_activity, stats):
-    """Export all correlated data to CSV files."""
+def build_sequence_index(timeline_df):
+    """
+    Index the timeline for attack sequence lookups.
+    Events are sorted once by source IP, then time, and each IP maps to the
+    start and end of its rows, so a lookup costs only that IP's events.
+    """
+    
+    ip_codes, uniques = pd.factorize(as_category(timeline_df["src_ip"]), sort=True)
+    rows = np.flatnonzero(ip_codes >= 0)
+    bounds = np.zeros(len(uniques) + 1, dtype=np.int64)
+    
+    if len(rows):
+        timestamps = pd.to_datetime(timeline_df["timestamp"]).to_numpy(dtype="datetime64[ns]")[rows]
+        times = np.where(np.isnat(timestamps), np.iinfo(np.int64).max, timestamps.view("int64"))
+        rows = rows[_ip_time_order(ip_codes[rows], times)]
+        bounds = np.searchsorted(ip_codes[rows], np.arange(len(uniques) + 1))
+    
+    return {
+        "offsets": dict(zip(uniques.tolist(), zip(bounds[:-1].tolist(), bounds[1:].tolist()))),
+        "columns": _sequence_columns(timeline_df.take(rows))
+    }
+
+
+def lookup_attack_sequence(index, src_ip):
+    """Return the attack sequence of one IP from a sequence index."""
+    start, stop = index["offsets"].get(src_ip, (0, 0))
+    return _sequence_steps(index["columns"], start, stop)
+
+
+def generate_attack_sequences(timeline_df, index=None):
+    """Generate the attack sequence of every source IP in one pass over the timeline."""
+    if index is None:
+        index = build_sequence_index(timeline_df)
+    return {ip: _sequence_steps(index["columns"], start, stop)
+            for ip, (start, stop) in index["offsets"].items()}
+
+
+def summarize_sessions(timeline_df):
+    """Summarize each attack session: time range, source IP, role, honeypots, event count."""
+    session_summary = timeline_df.groupby("session_id").agg({
+        "timestamp": ["min", "max"],
+        "src_ip": "first",
+        "attacker_role": "first",
+        "source": lambda x: ",".join(x.unique()),
+        "event_type": "count"
+    }).reset_index()
+    session_summary.columns = ["session_id", "start_time", "end_time", 
+                                "src_ip", "attacker_role", "honeypots", "event_count"]
+    return session_summary
+
+
+def export_correlated_data(timeline_df, cross_activity, stats, export_csv=EXPORT_CSV):
+    """Export all correlated data to the processed store."""
     
     # Export unified timeline
-    timeline_path = os.path.join(PROCESSED_DIR, "unified_timeline.csv")
-    timeline_df.to_csv(timeline_path, index=False)
+    timeline_path = save_frame(timeline_df, "unified_timeline", export_csv=export_csv)
     print(f"Saved: {timeline_path}")
     
     # Export multi-honeypot attackers
     if cross_activity["multi_honeypot_ips"]:
         multi_df = pd.DataFrame(cross_activity["multi_honeypot_ips"])
-        multi_path = os.path.join(PROCESSED_DIR, "multi_honeypot_attackers.csv")
-        multi_df.to_csv(multi_path, index=False)
+        multi_path = save_frame(multi_df, "multi_honeypot_attackers", export_csv=export_csv)
         print(f"Saved: {multi_path}")
     
     # Export session summary
     if "session_id" in timeline_df.columns:
-        session_summary = timeline_df.groupby("session_id").agg({
-            "timestamp": ["min", "max"],
-            "src_ip": "first",
-            "attacker_role": "first",
-            "source": lambda x: ",".join(x.unique()),
-            "event_type": "count"
-        }).reset_index()
-        session_summary.columns = ["session_id", "start_time", "end_time", 
-                                    "src_ip", "attacker_role", "honeypots", "event_count"]
-        session_path = os.path.join(PROCESSED_DIR, "attack_sessions.csv")
-        session_summary.to_csv(session_path, index=False)
+        session_summary = summarize_sessions(timeline_df)
+        session_path = save_frame(session_summary, "attack_sessions", export_csv=export_csv)
         print(f"Saved: {session_path}")
     
     return timeline_path
 
 
-def main():
-    """Main function to run log correlation analysis."""
+# TIMELINE ROLLUPS
+
+def update_timeline_rollups(rebuild=False, export_csv=EXPORT_CSV, chunksize=CORRELATION_CHUNK_SIZE):
+    """
+    Bring the timeline rollups up to date with the processed inputs.
+    Only rows appended to an input since the last update are projected onto
+    the timeline and merged in. The rollups are rebuilt from every row with
+    rebuild=True, without a checkpoint, or when the stored rollups are not
+    the ones the checkpoint was written for. Returns the rollups, or None if
+    there is no processed data.
+    """
+    checkpoint = None if rebuild else load_checkpoint("rollups")
+    rollups = None
+    if checkpoint is not None and checkpoint["rollups"] == rollup_signatures():
+        rollups = load_rollups()
+    if rollups is None:
+        checkpoint = {"rows": {}}
+    rows = checkpoint["rows"]
+    
+    changed = False
+    for key, (name, columns) in TIMELINE_INPUTS.items():
+        for chunk in iter_frame_chunks(name, columns, chunksize, skip=rows.get(key, 0)):
+            rollups = merge_rollups(rollups, rollup_events(build_unified_timeline({key: chunk})))
+            rows[key] = rows.get(key, 0) + len(chunk)
+            changed = True
+    
+    # The checkpoint records which rollup files hold the rows it counts
+    if changed:
+        checkpoint["rollups"] = save_rollups(rollups, export_csv)
+        save_checkpoint("rollups", checkpoint)
+    
+    return rollups
+
+
+# OUT-OF-CORE CORRELATION
+
+def shard_of(src_ip, shards):
+    """Assign events to shards by a stable hash of their source IP; missing IPs go to shard 0."""
+    values = src_ip.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    hashes = pd.util.hash_array(np.where(missing, "", values))
+    shard_ids = (hashes % np.uint64(shards)).astype(np.int64)
+    shard_ids[missing] = 0
+    return shard_ids
+
+
+def _timeline_dtypes(timeline_df):
+    """Give timeline columns the same dtypes in every shard and time slice."""
+    timeline_df["timestamp"] = timeline_df["timestamp"].astype("datetime64[ns]")
+    timeline_df["detail"] = timeline_df["detail"].astype("str")
+    return compact_frame(timeline_df)
+
+
+def partition_timeline(shard_dir, shards, chunksize=CORRELATION_CHUNK_SIZE):
+    """
+    Project the processed inputs onto the timeline a chunk at a time and
+    write the events to on-disk shards by source IP hash, so every event of
+    an IP lands in the same shard. Returns the shard directories.
+    """
+    shard_paths = [os.path.join(shard_dir, f"shard-{shard:03d}") for shard in range(shards)]
+    for path in shard_paths:
+        os.makedirs(path)
+    
+    # Part names sort in input order, so shards are sessionized in the same order as a whole timeline
+    for k, (key, (name, columns)) in enumerate(TIMELINE_INPUTS.items()):
+        events_read = 0
+        for i, chunk in enumerate(iter_frame_chunks(name, columns, chunksize)):
+            events = _timeline_dtypes(build_unified_timeline({key: chunk}))
+            shard_ids = shard_of(events["src_ip"], shards)
+            for shard in np.unique(shard_ids):
+                part_path = os.path.join(shard_paths[shard], f"{k}-{key}-{i:05d}.parquet")
+                events[shard_ids == shard].to_parquet(part_path, index=False)
+            events_read += len(events)
+        if events_read:
+            print(f"Partitioned {INPUT_LABELS[key]}: {events_read} events")
+    
+    return shard_paths
+
+
+def correlate_shard(shard_path, window_seconds=CORRELATION_WINDOW):
+    """
+    Sessionize and aggregate one shard. All events of an IP share a shard,
+    so its sessions and per-IP results are complete. The sessionized events
+    are written back in time order; returns the session summary and
+    cross-honeypot activity, or None for an empty shard.
+    """
+    parts = sorted(glob.glob(os.path.join(shard_path, "*.parquet")))
+    if not parts:
+        return None
+    
+    # Parts with different categories concatenate as text, so re-encode them
+    timeline_df = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+    timeline_df = identify_attack_sessions(compact_frame(timeline_df), window_seconds)
+    timeline_df.to_parquet(os.path.join(shard_path, SESSIONIZED_SHARD), index=False,
+                           row_group_size=100000)
+    for part in parts:
+        os.remove(part)
+    
+    return summarize_sessions(timeline_df), analyze_cross_honeypot_activity(timeline_df)
+
+
+def merge_shard_results(results):
+    """
+    Merge per-shard results. Sessions are renumbered by source IP and start
+    time, as identify_attack_sessions numbers them on a whole timeline.
+    Returns the session summary, an array per shard mapping its session IDs
+    to the merged ones and the cross-honeypot activity.
+    """
+    summaries = []
+    for shard, (summary, _) in enumerate(results):
+        summaries.append(summary.assign(shard=shard, local_id=summary["session_id"]))
+    
+    sessions = pd.concat(summaries, ignore_index=True)
+    sessions = sessions.sort_values(["src_ip", "start_time"], na_position="last", kind="stable",
+                                    ignore_index=True)
+    sessions["session_id"] = np.arange(1, len(sessions) + 1)
+    
+    id_maps = []
+    for shard, (summary, _) in enumerate(results):
+        in_shard = sessions[sessions["shard"] == shard]
+        id_map = np.zeros(int(summary["session_id"].max()) + 1, dtype=np.int64)
+        id_map[in_shard["local_id"].to_numpy()] = in_shard["session_id"].to_numpy()
+        id_maps.append(id_map)
+    sessions = sessions.drop(columns=["shard", "local_id"])
+    
+    cross_activity = {
+        "multi_honeypot_ips": sorted((ip for _, cross in results for ip in cross["multi_honeypot_ips"]),
+                                    key=lambda attacker: attacker["ip"]),
+        "cowrie_only_ips": sorted(ip for _, cross in results for ip in cross["cowrie_only_ips"]),
+        "dionaea_only_ips": sorted(ip for _, cross in results for ip in cross["dionaea_only_ips"]),
+        "attack_patterns": []
+    }
     
+    return sessions, id_maps, cross_activity
+
+
+def _read_timeline_slice(shard_paths, id_maps, condition):
+    """
+    Read the sessionized events matching a filter from every shard, in time
+    order. Simultaneous events are put in source IP order, as
+    identify_attack_sessions leaves them; each IP comes from one shard, which
+    already holds its events in order.
+    """
+    frames = []
+    for path, id_map in zip(shard_paths, id_maps):
+        df = pd.read_parquet(path, filters=condition)
+        if len(df):
+            df["session_id"] = id_map[df["session_id"].to_numpy()]
+            frames.append(df)
+    
+    if not frames:
+        return None
+    df = compact_frame(pd.concat(frames, ignore_index=True))
+    ip_codes = df["src_ip"].cat.codes.to_numpy()
+    ip_codes = np.where(ip_codes < 0, len(df["src_ip"].cat.categories), ip_codes)
+    order = np.lexsort((ip_codes, df["timestamp"].to_numpy(dtype="datetime64[ns]").view("int64")))
+    return df.take(order).reset_index(drop=True)
+
+
+def iter_sessionized_timeline(shard_paths, id_maps, time_range, slice_length=TIMELINE_SLICE):
+    """
+    Yield the sessionized shards merged back into one chronological timeline,
+    one time slice at a time, followed by events without a timestamp.
+    """
+    timestamp = pc.field("timestamp")
+    conditions = []
+    
+    if not pd.isna(time_range["start"]):
+        edges = pd.date_range(time_range["start"].floor(slice_length),
+                              time_range["end"] + slice_length, freq=slice_length)
+        conditions = [(timestamp >= lo) & (timestamp < hi) for lo, hi in zip(edges[:-1], edges[1:])]
+    conditions.append(timestamp.is_null())
+    
+    for condition in conditions:
+        chunk = _read_timeline_slice(shard_paths, id_maps, condition)
+        if chunk is not None:
+            yield chunk
+
+
+def correlate_out_of_core(shards, workers=1, export_csv=EXPORT_CSV, window_seconds=CORRELATION_WINDOW):
+    """
+    Correlate timelines larger than memory. Events are partitioned into
+    on-disk shards by source IP hash, each shard is sessionized and
+    aggregated on its own (in parallel with workers > 1) and the results are
+    merged; only one shard per worker, or one time slice of the timeline, is
+    held in memory at a time. Returns the cross-honeypot activity and
+    statistics, or None if there is no processed data.
+    """
+    if pc is None:
+        raise ValueError("Out-of-core correlation requires pyarrow")
+    
+    with tempfile.TemporaryDirectory(prefix="shards-", dir=OUTPUT_DIR) as shard_dir:
+        print(f"\n[1/4] Partitioning events into {shards} shards...")
+        with stage("partition_timeline"):
+            shard_paths = partition_timeline(shard_dir, shards)
+        
+        print("\n[2/4] Sessionizing shards...")
+        with stage("correlate_shards"):
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(correlate_shard, shard_paths, [window_seconds] * shards))
+            else:
+                results = [correlate_shard(path, window_seconds) for path in shard_paths]
+        
+        shard_paths = [os.path.join(path, SESSIONIZED_SHARD)
+                       for path, result in zip(shard_paths, results) if result is not None]
+        results = [result for result in results if result is not None]
+        if not results:
+            return None
+        
+        print("\n[3/4] Merging shard results...")
+        with stage("merge_shard_results") as record:
+            sessions, id_maps, cross_activity = merge_shard_results(results)
+            record["rows_out"] = len(sessions)
+        print(f"Identified {len(sessions)} attack sessions")
+        print(f"  Multi-honeypot attackers: {len(cross_activity['multi_honeypot_ips'])}")
+        print(f"  Cowrie-only attackers: {len(cross_activity['cowrie_only_ips'])}")
+        print(f"  Dionaea-only attackers: {len(cross_activity['dionaea_only_ips'])}")
+        
+        # Statistics come from the timeline rollups
+        with stage("rollup_statistics"):
+            stats = rollup_statistics(update_timeline_rollups(export_csv=export_csv), len(sessions))
+        
+        print("\n[4/4] Exporting correlated data...")
+        with stage("export_correlated_data") as record:
+            time_range = {"start": sessions["start_time"].min(), "end": sessions["end_time"].max()}
+            record["rows_out"] = save_frame_chunks(
+                iter_sessionized_timeline(shard_paths, id_maps, time_range),
+                "unified_timeline", export_csv=export_csv
+            )
+            print(f"Saved: {artifact_path('unified_timeline')}")
+            
+            if cross_activity["multi_honeypot_ips"]:
+                multi_df = pd.DataFrame(cross_activity["multi_honeypot_ips"])
+                print(f"Saved: {save_frame(multi_df, 'multi_honeypot_attackers', export_csv=export_csv)}")
+            print(f"Saved: {save_frame(sessions, 'attack_sessions', export_csv=export_csv)}")
+    
+    return cross_activity, stats
+
+
+def print_correlation_summary(cross_activity, stats):
+    """Print the correlation summary and the multi-honeypot attackers."""
+    print("\n" + "=" * 60)
+    print("Correlation Summary")
     print("=" * 60)
-    print("Log Correlation Engine")
-    print("=" * 60)
+    print(f"\nTotal correlated events: {stats['total_events']}")
+    print(f"Unique source IPs: {stats['unique_ips']}")
+    print(f"Attack sessions: {stats['unique_sessions']}")
+    print(f"\nEvents by honeypot:")
+    for source, count in stats["events_by_source"].items():
+        print(f"  {source}: {count}")
+    print(f"\nEvents by attacker role:")
+    for role, count in stats["events_by_role"].items():
+        print(f"  {role}: {count}")
+    
+    # Show multi-honeypot attacker details
+    if cross_activity["multi_honeypot_ips"]:
+        print(f"\nMulti-honeypot attackers:")
+        for attacker in cross_activity["multi_honeypot_ips"]:
+            print(f"  {attacker['ip']} ({attacker['role']}): "
+                  f"{attacker['cowrie_events']} Cowrie + {attacker['dionaea_events']} Dionaea events")
+    
+    print(f"\nOutput saved to: {PROCESSED_DIR}")
+
+
+def correlate_in_memory(workers=1, export_csv=EXPORT_CSV):
+    """
+    Correlate the whole timeline in memory.
+    Returns the cross-honeypot activity and statistics, or None if there is
+    no processed data.
+    """
     
     # Load processed data
     print("\n[1/5] Loading processed data...")
-    data = load_processed_data()
+    with stage("load_processed_data") as record:
+        data = load_processed_data()
+        record["rows_out"] = sum(len(df) for df in data.values())
     
     if not data:
-        print("Error: No processed data found. Run process_data.py first.")
-        return
+        return None
+    report_memory("loading", data.values())
     
     # Build unified timeline
     print("\n[2/5] Building unified timeline...")
-    timeline_df = build_unified_timeline(data)
+    with stage("build_unified_timeline", rows_in=record["rows_out"]) as record:
+        timeline_df = build_unified_timeline(data)
+        record["rows_out"] = len(timeline_df)
     print(f"Created timeline with {len(timeline_df)} events")
+    report_memory("building the timeline", [timeline_df])
     
     # Identify attack sessions
     print("\n[3/5] Identifying attack sessions...")
-    timeline_df = identify_attack_sessions(timeline_df)
+    with stage("identify_attack_sessions", rows_in=len(timeline_df)) as record:
+        timeline_df = identify_attack_sessions(timeline_df, workers=workers)
+        record["rows_out"] = len(timeline_df)
     print(f"Identified {timeline_df['session_id'].nunique()} attack sessions")
+    report_memory("sessionizing", [timeline_df])
     
     # Analyze cross-honeypot activity
     print("\n[4/5] Analyzing cross-honeypot activity...")
-    cross_activity = analyze_cross_honeypot_activity(timeline_df)
+    with stage("analyze_cross_honeypot_activity", rows_in=len(timeline_df)) as record:
+        cross_activity = analyze_cross_honeypot_activity(timeline_df)
+        record["rows_out"] = len(cross_activity["multi_honeypot_ips"])
     
     print(f"  Multi-honeypot attackers: {len(cross_activity['multi_honeypot_ips'])}")
     print(f"  Cowrie-only attackers: {len(cross_activity['cowrie_only_ips'])}")
     print(f"  Dionaea-only attackers: {len(cross_activity['dionaea_only_ips'])}")
     
-    # Calculate statistics
-    stats = calculate_attack_statistics(timeline_df)
+    # Read statistics from the timeline rollups
+    with stage("rollup_statistics"):
+        stats = rollup_statistics(update_timeline_rollups(export_csv=export_csv),
+                                  timeline_df["session_id"].nunique())
     
     # Export results
     print("\n[5/5] Exporting correlated data...")
-    export_correlated_data(timeline_df, cross_activity, stats)
+    with stage("export_correlated_data", rows_in=len(timeline_df)):
+        export_correlated_data(timeline_df, cross_activity, stats, export_csv)
+    
+    return cross_activity, stats
+
+
+def main(workers=1, export_csv=EXPORT_CSV, shards=0, export_db=EXPORT_DB):
+    """
+    Main function to run log correlation analysis.
+    With workers > 1, sessions are identified in a process pool.
+    With export_csv=True CSV copies of the outputs are written as well.
+    With shards > 0 the timeline is correlated out of core in that many
+    on-disk shards, with workers shards processed at a time.
+    With export_db=True the outputs are also loaded into the analytics database.
+    """
     
-    # Print summary
-    print("\n" + "=" * 60)
-    print("Correlation Summary")
     print("=" * 60)
-    print(f"\nTotal correlated events: {stats['total_events']}")
-    print(f"Unique source IPs: {stats['unique_ips']}")
-    print(f"Attack sessions: {stats['unique_sessions']}")
-    print(f"\nEvents by honeypot:")
-    for source, count in stats["events_by_source"].items():
-        print(f"  {source}: {count}")
-    print(f"\nEvents by attacker role:")
-    for role, count in stats["events_by_role"].items():
-        print(f"  {role}: {count}")
+    print("Log Correlation Engine")
+    print("=" * 60)
+    start_profile("correlate_logs")
     
-    # Show multi-honeypot attacker details
-    if cross_activity["multi_honeypot_ips"]:
-        print(f"\nMulti-honeypot attackers:")
-        for attacker in cross_activity["multi_honeypot_ips"]:
-            print(f"  {attacker['ip']} ({attacker['role']}): "
-                  f"{attacker['cowrie_events']} Cowrie + {attacker['dionaea_events']} Dionaea events")
+    if shards:
+        result = correlate_out_of_core(shards, workers, export_csv)
+    else:
+        result = correlate_in_memory(workers, export_csv)
     
-    print(f"\nOutput saved to: {PROCESSED_DIR}")
+    if result is None:
+        print("Error: No processed data found. Run process_data.py first.")
+        save_profile()
+        return
+    
+    if export_db:
+        print("\nBuilding analytics database...")
+        with stage("build_analytics_db") as record:
+            rows = build_analytics_db()
+            record["rows_out"] = sum(rows.values())
+        print(f"Saved: {ANALYTICS_DB} ({rows.get('timeline', 0)} events)")
+    
+    # Print summary
+    print_correlation_summary(*result)
+    print(f"Profile saved to: {save_profile()}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Correlate processed honeypot data.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used to sessionize disjoint source IP ranges")
+    parser.add_argument("--csv", action="store_true",
+                        help="also write CSV copies of the correlated data")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="correlate out of core in this many on-disk shards by source IP")
+    parser.add_argument("--db", action="store_true",
+                        help="also load the outputs into the indexed analytics database")
+    args = parser.parse_args()
+    main(workers=args.workers, export_csv=args.csv or EXPORT_CSV, shards=args.shards,
+         export_db=args.db or EXPORT_DB)
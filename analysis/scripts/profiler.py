@@ -0,0 +1,158 @@
+# Stage profiler for the pipeline scripts.
+# Records wall time, CPU time, peak resident memory and rows in/out for
+# each stage of a run and writes them to a JSON report in REPORTS_DIR, so
+# runs can be compared as the data grows.
+
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from config import REPORTS_DIR
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Writing "5" here resets the process's peak RSS (Linux 4.0+)
+CLEAR_REFS = "/proc/self/clear_refs"
+
+# Profile of the current run and its start (wall clock, CPU time), set by start_profile
+_profile = None
+_started = None
+
+# Highest peak RSS seen in this run; resetting the peak per stage also resets ru_maxrss
+_run_peak = None
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS so the next reading covers one stage; returns False if unsupported."""
+    try:
+        with open(CLEAR_REFS, 'w') as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb(who=None):
+    """Peak resident memory in MB of this process, or of its finished child processes."""
+    if resource is None:
+        return None
+    if who is None:
+        who = resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    if sys.platform == "darwin":
+        return round(peak / 1e6, 1)
+    return round(peak / 1e3, 1)
+
+
+def _current_peak_rss_mb():
+    """Peak RSS of this process since the last reset, read from /proc when available."""
+    try:
+        with open("/proc/self/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1e3, 1)
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _note_run_peak():
+    """Fold the current peak RSS into the run peak before it is reset."""
+    global _run_peak
+    peak = _current_peak_rss_mb()
+    if peak is not None:
+        _run_peak = max(_run_peak or 0, peak)
+
+
+def _cpu_seconds():
+    """CPU time used by this process and its finished child processes."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def start_profile(script):
+    """Start profiling a run of a pipeline script; later stages are recorded in it."""
+    global _profile, _started, _run_peak
+    _run_peak = None
+    _note_run_peak()
+    _profile = {
+        "script": script,
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "stages": []
+    }
+    _started = (time.perf_counter(), _cpu_seconds())
+    return _profile
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Time a pipeline stage. Yields its record, where the caller can set
+    rows_out (and rows_in if it is only known inside the stage). The
+    record is added to the current profile, if one was started.
+    """
+    record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+    _note_run_peak()
+    per_stage_peak = _reset_peak_rss()
+    wall = time.perf_counter()
+    cpu = _cpu_seconds()
+    
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = str(e)
+        raise
+    finally:
+        record["wall_seconds"] = round(time.perf_counter() - wall, 4)
+        record["cpu_seconds"] = round(_cpu_seconds() - cpu, 4)
+        # Without a reset the peak covers the run so far
+        record["peak_rss_mb"] = _current_peak_rss_mb()
+        record["peak_rss_scope"] = "stage" if per_stage_peak else "run"
+        _note_run_peak()
+        if _profile is not None:
+            _profile["stages"].append(record)
+
+
+def add_stage(record):
+    """Add a stage record measured elsewhere (e.g. in a worker process) to the current profile."""
+    if _profile is not None:
+        _profile["stages"].append(record)
+
+
+def save_profile():
+    """
+    Finish the current profile and write it to REPORTS_DIR as JSON.
+    Returns the report path, or None if no profile was started.
+    """
+    global _profile
+    if _profile is None:
+        return None
+    
+    wall, cpu = _started
+    _profile["wall_seconds"] = round(time.perf_counter() - wall, 4)
+    _profile["cpu_seconds"] = round(_cpu_seconds() - cpu, 4)
+    # ru_maxrss only covers the time since the last stage reset it
+    _note_run_peak()
+    peaks = [peak for peak in (_run_peak, _peak_rss_mb()) if peak is not None]
+    _profile["peak_rss_mb"] = max(peaks) if peaks else None
+    if resource is not None:
+        _profile["children_peak_rss_mb"] = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(REPORTS_DIR, f"profile_{_profile['script']}_{stamp}.json")
+    with open(path, 'w') as f:
+        json.dump(_profile, f, indent=2)
+    
+    _profile = None
+    return path
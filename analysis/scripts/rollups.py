@@ -0,0 +1,136 @@
+"""
+Materialized rollups of the unified timeline.
+Event counts per minute, hour and day by honeypot, attacker role, service
+and event category, plus per-IP counts and first/last sightings. Rollups of
+new events are merged into the stored ones, so charts and statistics read a
+table sized by time buckets and distinct values instead of the timeline.
+"""
+
+import pandas as pd
+from config import EXPORT_CSV
+from storage import load_frame, save_frame, artifact_signature
+
+
+# Rollup grain -> time bucket frequency
+ROLLUP_GRAINS = {"minute": "min", "hour": "h", "day": "D"}
+
+# Columns the time-bucketed rollups count events by, after the bucket
+ROLLUP_KEYS = ["source", "attacker_role", "service", "event_category"]
+
+# Columns the per-IP rollup counts events by
+IP_ROLLUP_KEYS = ["src_ip", "source", "event_category"]
+
+# Rollup -> processed artifact it is stored as
+ROLLUP_ARTIFACTS = {
+    "minute": "timeline_rollup_minute",
+    "hour": "timeline_rollup_hour",
+    "day": "timeline_rollup_day",
+    "ips": "timeline_rollup_ips"
+}
+
+
+def _key_columns(events, keys):
+    """
+    Return the key columns of timeline events as strings. Missing values
+    stay missing (pd.NA) rather than becoming the string "nan".
+    """
+    return {key: events[key].astype("string") for key in keys}
+
+
+def rollup_events(events):
+    """Roll up unified timeline events. Events without a timestamp or key keep their own rows."""
+    rollups = {}
+    keys = _key_columns(events, ROLLUP_KEYS)
+    
+    for grain, freq in ROLLUP_GRAINS.items():
+        frame = pd.DataFrame({"bucket": events["timestamp"].dt.floor(freq), **keys})
+        counts = frame.groupby(["bucket"] + ROLLUP_KEYS, dropna=False).size()
+        rollups[grain] = counts.rename("events").reset_index()
+    
+    frame = pd.DataFrame({"timestamp": events["timestamp"], **_key_columns(events, IP_ROLLUP_KEYS)})
+    rollups["ips"] = frame.groupby(IP_ROLLUP_KEYS, dropna=False).agg(
+        events=("timestamp", "size"),
+        first_seen=("timestamp", "min"),
+        last_seen=("timestamp", "max")
+    ).reset_index()
+    
+    return rollups
+
+
+def merge_rollups(rollups, new_rollups):
+    """Merge two sets of rollups (either may be None) into one."""
+    if rollups is None:
+        return new_rollups
+    if new_rollups is None:
+        return rollups
+    
+    merged = {}
+    for grain in ROLLUP_GRAINS:
+        combined = pd.concat([rollups[grain], new_rollups[grain]], ignore_index=True)
+        counts = combined.groupby(["bucket"] + ROLLUP_KEYS, dropna=False)["events"].sum()
+        merged[grain] = counts.reset_index()
+    
+    combined = pd.concat([rollups["ips"], new_rollups["ips"]], ignore_index=True)
+    merged["ips"] = combined.groupby(IP_ROLLUP_KEYS, dropna=False).agg(
+        events=("events", "sum"),
+        first_seen=("first_seen", "min"),
+        last_seen=("last_seen", "max")
+    ).reset_index()
+    
+    return merged
+
+
+def load_rollups():
+    """Load the stored rollups, or return None if any of them is missing."""
+    rollups = {}
+    for key, name in ROLLUP_ARTIFACTS.items():
+        rollups[key] = load_frame(name)
+        if rollups[key] is None:
+            return None
+    return rollups
+
+
+def save_rollups(rollups, export_csv=EXPORT_CSV):
+    """Save the rollups and return the signatures of the files written."""
+    signatures = {}
+    for key, name in ROLLUP_ARTIFACTS.items():
+        save_frame(rollups[key], name, export_csv=export_csv)
+        signatures[key] = artifact_signature(name)
+    return signatures
+
+
+def rollup_signatures():
+    """Return the signatures of the stored rollup files."""
+    return {key: artifact_signature(name) for key, name in ROLLUP_ARTIFACTS.items()}
+
+
+def rollup_counts(rollup, column):
+    """
+    Event counts per value of a rollup key column, largest first, like
+    Series.value_counts. Events with a missing value are left out.
+    """
+    counts = rollup.groupby(column, dropna=True)["events"].sum()
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def rollup_statistics(rollups, unique_sessions=0):
+    """
+    Return summary statistics for the correlated data from the rollups.
+    Source IPs and key values that are missing are not counted as values.
+    """
+    day = rollups["day"]
+    ips = rollups["ips"]
+    
+    return {
+        "total_events": int(day["events"].sum()),
+        "unique_ips": ips["src_ip"].nunique(),
+        "unique_sessions": unique_sessions,
+        "time_range": {
+            "start": ips["first_seen"].min(),
+            "end": ips["last_seen"].max()
+        },
+        "events_by_source": rollup_counts(day, "source").to_dict(),
+        "events_by_category": rollup_counts(day, "event_category").to_dict(),
+        "events_by_role": rollup_counts(day, "attacker_role").to_dict(),
+        "services_targeted": rollup_counts(day, "service").to_dict()
+    }
@@ -0,0 +1,61 @@
+# Compact column dtypes shared by the loaders and the correlation engine.
+# Low-cardinality text columns are dictionary-encoded as categoricals with
+# sorted categories, so they sort, group and factorize like the strings they
+# replace; ports are nullable 16-bit integers.
+
+import pandas as pd
+
+
+# Columns stored as categoricals
+CATEGORY_COLUMNS = ["source", "src_ip", "attacker_role", "event_type", "event_category",
+                    "service", "protocol", "connection_type"]
+
+# Columns stored as ports, and their dtype
+PORT_COLUMNS = ["src_port", "dst_port"]
+PORT_DTYPE = "UInt16"
+
+
+def as_category(values):
+    """Dictionary-encode a column, with its categories in sorted order."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype("category")
+    
+    # Categories built from first appearance (e.g. by lookup_categorical) are reordered
+    categories = values.cat.categories
+    if not categories.is_monotonic_increasing:
+        values = values.cat.reorder_categories(categories.sort_values())
+    return values
+
+
+def as_port(values):
+    """Convert a column to nullable 16-bit ports; anything that is not a valid port becomes missing."""
+    ports = pd.to_numeric(values, errors="coerce")
+    valid = (ports >= 0) & (ports <= 65535) & (ports % 1 == 0)
+    return ports.where(valid).astype(PORT_DTYPE)
+
+
+def compact_frame(df):
+    """Give the known columns of a DataFrame their compact dtypes and return it."""
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = as_category(df[column])
+    
+    for column in PORT_COLUMNS:
+        if column in df.columns and df[column].dtype != PORT_DTYPE:
+            df[column] = as_port(df[column])
+    
+    return df
+
+
+def frame_memory(df):
+    """Return the bytes a DataFrame holds, including the strings it references."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def report_memory(stage, frames):
+    """Print the memory held by the DataFrames alive after a pipeline stage."""
+    frames = [df for df in frames if df is not None]
+    total = sum(frame_memory(df) for df in frames)
+    rows = sum(len(df) for df in frames)
+    print(f"  Memory after {stage}: {total / 1e6:.1f} MB for {rows} rows")
+    return total
@@ -0,0 +1,197 @@
+"""
+Streaming attack sessionizer.
+Groups unified timeline events into attack sessions as they arrive, keeping
+only one open session per source IP instead of the whole timeline. Closed
+sessions are emitted once CORRELATION_WINDOW passes without activity and
+summarize to the same rows as attack_sessions from correlate_logs.py
+(events without a timestamp join their IP's open session rather than its
+last session overall).
+"""
+
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from config import MAX_OPEN_SESSIONS
+from correlate_logs import CORRELATION_WINDOW
+
+
+# Integer value of NaT in nanosecond timestamps
+NAT = np.iinfo(np.int64).min
+
+# Fields of an emitted session record and columns of the session summary
+SESSION_FIELDS = ["src_ip", "start_time", "end_time", "attacker_role", "honeypots", "event_count"]
+SESSION_COLUMNS = ["session_id", "start_time", "end_time", "src_ip",
+                   "attacker_role", "honeypots", "event_count"]
+
+
+def new_sessionizer(window_seconds=CORRELATION_WINDOW, max_open=MAX_OPEN_SESSIONS, lateness_seconds=0):
+    """
+    Return empty sessionizer state.
+    Sessions stay open lateness_seconds longer than the window so events that
+    arrive slightly out of order still join them.
+    """
+    return {
+        "window": int(window_seconds * 1e9),
+        "lateness": int(lateness_seconds * 1e9),
+        "max_open": max_open,
+        # src_ip -> [start ns, end ns, attacker_role, honeypots, event count],
+        # least recently active first
+        "open": OrderedDict(),
+        "watermark": NAT,
+        "evicted": 0
+    }
+
+
+def _timestamps_ns(timestamps):
+    """Return timestamps as a list of nanosecond integers (NaT as NAT)."""
+    values = pd.to_datetime(timestamps).to_numpy(dtype="datetime64[ns]")
+    return values.view("int64").tolist()
+
+
+def _joins(state, ts, window):
+    """Check whether an event at ts belongs to an open session."""
+    if ts == NAT or state[1] == NAT:
+        return True
+    return state[0] - window <= ts <= state[1] + window
+
+
+def _extend(state, ts, source, role, counted):
+    """
+    Add an event to an open session. An event earlier than the session start
+    comes first in time order, so its role and honeypot take precedence.
+    """
+    earliest = ts != NAT and (state[0] == NAT or ts < state[0])
+    honeypots = state[3].split(",")
+    
+    if earliest:
+        state[0] = ts
+        if not pd.isna(role):
+            state[2] = role
+        if source not in honeypots:
+            state[3] = ",".join([source] + honeypots)
+    else:
+        if pd.isna(state[2]):
+            state[2] = role
+        if source not in honeypots:
+            state[3] = f"{state[3]},{source}"
+    
+    if ts != NAT and (state[1] == NAT or ts > state[1]):
+        state[1] = ts
+    state[4] += counted
+
+
+def _record(ip, state):
+    """Return the emitted record of a session."""
+    return (ip, state[0], state[1], state[2], state[3], state[4])
+
+
+def add_events(sessionizer, events):
+    """
+    Add unified timeline events, in near-time order, to the open sessions.
+    Returns the records of sessions closed by these events: sessions idle
+    for longer than the window and sessions evicted to respect max_open.
+    """
+    window = sessionizer["window"]
+    open_sessions = sessionizer["open"]
+    closed = []
+    
+    for ts, ip, source, role, counted in zip(_timestamps_ns(events["timestamp"]),
+                                             events["src_ip"].tolist(),
+                                             events["source"].tolist(),
+                                             events["attacker_role"].tolist(),
+                                             events["event_type"].notna().tolist()):
+        if ts > sessionizer["watermark"]:
+            sessionizer["watermark"] = ts
+        
+        # Events without a source IP never share a session
+        if pd.isna(ip):
+            closed.append(_record(ip, [ts, ts, role, source, int(counted)]))
+            continue
+        
+        state = open_sessions.get(ip)
+        if state is not None and not _joins(state, ts, window):
+            if ts < state[0]:
+                # Far older than the open session: a session of its own
+                closed.append(_record(ip, [ts, ts, role, source, int(counted)]))
+                continue
+            closed.append(_record(ip, open_sessions.pop(ip)))
+            state = None
+        
+        if state is None:
+            open_sessions[ip] = [ts, ts, role, source, int(counted)]
+            if len(open_sessions) > sessionizer["max_open"]:
+                closed.append(_record(*open_sessions.popitem(last=False)))
+                sessionizer["evicted"] += 1
+        else:
+            _extend(state, ts, source, role, counted)
+            open_sessions.move_to_end(ip)
+    
+    closed.extend(expire_sessions(sessionizer))
+    
+    return closed
+
+
+def expire_sessions(sessionizer, now=None):
+    """
+    Close sessions with no event for longer than the window (plus lateness)
+    before the newest event seen, or before now (a Timestamp) if it is later.
+    Returns the closed session records.
+    """
+    cutoff = sessionizer["watermark"]
+    if now is not None:
+        cutoff = max(cutoff, pd.Timestamp(now).value)
+    if cutoff == NAT:
+        return []
+    cutoff -= sessionizer["window"] + sessionizer["lateness"]
+    
+    open_sessions = sessionizer["open"]
+    closed = []
+    
+    # Sessions are ordered by last activity, so stop at the first active one
+    while open_sessions:
+        ip, state = next(iter(open_sessions.items()))
+        if state[1] != NAT and state[1] >= cutoff:
+            break
+        del open_sessions[ip]
+        closed.append(_record(ip, state))
+    
+    return closed
+
+
+def flush_sessions(sessionizer):
+    """Close every open session and return their records."""
+    closed = [_record(ip, state) for ip, state in sessionizer["open"].items()]
+    sessionizer["open"].clear()
+    return closed
+
+
+def open_session_records(sessionizer):
+    """Return records of the sessions that are still open."""
+    return [_record(ip, state) for ip, state in sessionizer["open"].items()]
+
+
+def sessions_frame(records):
+    """
+    Summarize session records in the attack_sessions format. Sessions are
+    numbered by source IP and start time, as identify_attack_sessions does.
+    """
+    df = pd.DataFrame(records, columns=SESSION_FIELDS)
+    for column in ["start_time", "end_time"]:
+        df[column] = np.asarray(df[column], dtype="int64").view("datetime64[ns]")
+    
+    df = df.sort_values(["src_ip", "start_time"], na_position="last", kind="stable", ignore_index=True)
+    df["session_id"] = np.arange(1, len(df) + 1)
+    
+    return df[SESSION_COLUMNS]
+
+
+def sessionize_stream(chunks, window_seconds=CORRELATION_WINDOW, max_open=MAX_OPEN_SESSIONS):
+    """Sessionize an iterable of timeline chunks and return the session summary."""
+    sessionizer = new_sessionizer(window_seconds, max_open)
+    closed = []
+    
+    for chunk in chunks:
+        closed.extend(add_events(sessionizer, chunk))
+    closed.extend(flush_sessions(sessionizer))
+    
+    return sessions_frame(closed)
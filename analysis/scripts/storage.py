@@ -0,0 +1,338 @@
+# Storage backend for processed artifacts in PROCESSED_DIR.
+# Parquet keeps categorical and datetime dtypes and can read a subset of
+# columns; CSV is used when pyarrow is not installed and can be exported
+# alongside Parquet for people who want plain files. Rows appended to a
+# Parquet artifact go to a new part file next to it, so an append costs
+# the size of the new rows rather than of the whole artifact.
+
+import glob
+import os
+import numpy as np
+import pandas as pd
+from config import PROCESSED_DIR, STORAGE_FORMAT, EXPORT_CSV
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Columns parsed as datetimes when an artifact is read back from CSV
+CSV_DATETIME_COLUMNS = ["timestamp", "start_time", "end_time"]
+
+# Precisions to_csv writes timezone-naive datetimes at, coarsest first
+CSV_DATETIME_UNITS = ["D", "s", "ms", "us", "ns"]
+
+
+def storage_format():
+    """Return the active storage format, falling back to CSV without pyarrow."""
+    if STORAGE_FORMAT == "parquet" and pq is None:
+        return "csv"
+    return STORAGE_FORMAT
+
+
+def artifact_path(name, fmt=None):
+    """Return the path of a processed artifact in the given (or active) format."""
+    return os.path.join(PROCESSED_DIR, f"{name}.{fmt or storage_format()}")
+
+
+def _part_paths(name):
+    """Return the part files appended to a Parquet artifact, in the order they were written."""
+    return sorted(glob.glob(os.path.join(PROCESSED_DIR, f"{glob.escape(name)}.part*.parquet")))
+
+
+def _parquet_paths(name):
+    """Return the files holding a Parquet artifact (the base file, then its parts), or [] if it does not exist."""
+    path = artifact_path(name, "parquet")
+    if not os.path.exists(path):
+        return []
+    return [path] + _part_paths(name)
+
+
+def _remove_parts(name):
+    """Delete the part files appended to a Parquet artifact."""
+    for part in _part_paths(name):
+        os.remove(part)
+
+
+def frame_exists(name):
+    """Check whether a processed artifact exists in any readable format."""
+    return any(os.path.exists(artifact_path(name, fmt)) for fmt in (storage_format(), "csv"))
+
+
+def artifact_signature(name):
+    """
+    Return [path, size, modification time in ns] of the files load_frame
+    would read for an artifact (total size and latest time over Parquet
+    parts), or None if it does not exist.
+    """
+    for fmt in (storage_format(), "csv"):
+        path = artifact_path(name, fmt)
+        if os.path.exists(path):
+            paths = _parquet_paths(name) if fmt == "parquet" else [path]
+            stats = [os.stat(p) for p in paths]
+            return [path, sum(st.st_size for st in stats), max(st.st_mtime_ns for st in stats)]
+    return None
+
+
+def load_frame(name, columns=None):
+    """
+    Load a processed artifact, optionally only the listed columns.
+    Falls back to an existing CSV copy; returns None if neither exists.
+    """
+    paths = _parquet_paths(name) if storage_format() == "parquet" else []
+    
+    if paths:
+        if columns is not None:
+            available = pq.read_schema(paths[0]).names
+            columns = [c for c in columns if c in available]
+        return _concat_keeping_categories([pd.read_parquet(path, columns=columns) for path in paths])
+    
+    csv_path = artifact_path(name, "csv")
+    if os.path.exists(csv_path):
+        usecols = (lambda c: c in columns) if columns is not None else None
+        return _parse_csv_datetimes(pd.read_csv(csv_path, usecols=usecols))
+    
+    return None
+
+
+def _parse_csv_datetimes(df):
+    """Parse the datetime columns of a frame read from CSV."""
+    for column in CSV_DATETIME_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+
+def iter_frame_chunks(name, columns=None, chunksize=100000, skip=0):
+    """
+    Yield a processed artifact in chunks of up to chunksize rows, optionally
+    only the listed columns and starting after the first skip rows, without
+    loading it whole. Falls back to an existing CSV copy; yields nothing if
+    neither exists.
+    """
+    paths = _parquet_paths(name) if storage_format() == "parquet" else []
+    
+    if paths:
+        if columns is not None:
+            columns = [c for c in columns if c in pq.read_schema(paths[0]).names]
+        
+        for path in paths:
+            parquet_file = pq.ParquetFile(path)
+            
+            # Start reading at the part and row group holding the first row wanted
+            groups = [parquet_file.metadata.row_group(i).num_rows
+                      for i in range(parquet_file.metadata.num_row_groups)]
+            first_group = 0
+            while first_group < len(groups) and skip >= groups[first_group]:
+                skip -= groups[first_group]
+                first_group += 1
+            
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns,
+                                                   row_groups=range(first_group, len(groups))):
+                if skip:
+                    skipped = min(skip, batch.num_rows)
+                    batch = batch.slice(skipped)
+                    skip -= skipped
+                if batch.num_rows:
+                    yield batch.to_pandas()
+        return
+    
+    csv_path = artifact_path(name, "csv")
+    if os.path.exists(csv_path):
+        usecols = (lambda c: c in columns) if columns is not None else None
+        for df in pd.read_csv(csv_path, usecols=usecols, chunksize=chunksize,
+                              skiprows=range(1, skip + 1)):
+            yield _parse_csv_datetimes(df)
+
+
+def _datetime_unit(values):
+    """
+    Return the precision to_csv writes a timezone-naive datetime column at:
+    the coarsest of CSV_DATETIME_UNITS that shows every value exactly.
+    """
+    ns = values.dropna().to_numpy(dtype="datetime64[ns]").view("int64")
+    for unit, step in (("ns", 10**3), ("us", 10**6), ("ms", 10**9), ("s", 86400 * 10**9)):
+        if (ns % step).any():
+            return unit
+    return "D"
+
+
+def _csv_units(frames):
+    """Return the precision of each timezone-naive datetime column over all of the frames."""
+    units = {}
+    for df in frames:
+        for column in df.columns:
+            dtype = df[column].dtype
+            if pd.api.types.is_datetime64_dtype(dtype) and getattr(dtype, "tz", None) is None:
+                unit = _datetime_unit(df[column])
+                units[column] = max(units.get(column, "D"), unit, key=CSV_DATETIME_UNITS.index)
+    return units
+
+
+def _artifact_csv_units(name):
+    """Return the precision of each timezone-naive datetime column over a whole Parquet artifact."""
+    paths = _parquet_paths(name)
+    if not paths:
+        return {}
+    columns = [field.name for field in pq.read_schema(paths[0])
+               if pa.types.is_timestamp(field.type) and field.type.tz is None]
+    if not columns:
+        return {}
+    return _csv_units(iter_frame_chunks(name, columns=columns))
+
+
+def _write_csv(df, path, append, csv_kwargs, units=None):
+    """
+    Write or append a DataFrame to CSV, adding the header to new files.
+    Timezone-naive datetime columns are written at the precision in units
+    (by default the one to_csv would pick for the frame), so chunks of an
+    artifact written one by one come out as a single write of it would.
+    """
+    if units is None:
+        units = _csv_units([df])
+    formatted = {}
+    for column, unit in units.items():
+        values = df[column]
+        text = pd.Series(np.datetime_as_string(values.to_numpy(dtype="datetime64[ns]"), unit=unit),
+                         index=df.index)
+        formatted[column] = text.str.replace("T", " ").where(values.notna(), "")
+    if formatted:
+        df = df.assign(**formatted)
+    
+    append = append and os.path.exists(path)
+    df.to_csv(path, index=False, mode="a" if append else "w", header=not append, **csv_kwargs)
+
+
+def _export_csv(name, csv_kwargs):
+    """Write a CSV copy of a whole Parquet artifact, a chunk at a time."""
+    path = artifact_path(name, "csv")
+    tmp_path = path + ".tmp"
+    units = _artifact_csv_units(name)
+    first = True
+    for chunk in iter_frame_chunks(name):
+        _write_csv(chunk, tmp_path, not first, csv_kwargs, units)
+        first = False
+    if not first:
+        os.replace(tmp_path, path)
+
+
+def _concat_keeping_categories(frames):
+    """Concatenate frames, keeping columns that were categorical in the first as categorical."""
+    if len(frames) == 1:
+        return frames[0]
+    combined = pd.concat(frames, ignore_index=True)
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            combined[column] = combined[column].astype("category")
+    return combined
+
+
+def save_frame(df, name, append=False, export_csv=EXPORT_CSV, **csv_kwargs):
+    """
+    Save a processed artifact; append=True adds the rows to an existing one.
+    csv_kwargs are passed to DataFrame.to_csv when a CSV file is written.
+    """
+    fmt = storage_format()
+    path = artifact_path(name, fmt)
+    
+    if fmt == "parquet" and not (append and df.empty and os.path.exists(path)):
+        if append and os.path.exists(path):
+            # Appended rows become the artifact's next part file
+            parts = _part_paths(name)
+            number = int(parts[-1].rsplit(".part", 1)[1].split(".")[0]) + 1 if parts else 1
+            target = os.path.join(PROCESSED_DIR, f"{name}.part{number:05d}.parquet")
+        else:
+            _remove_parts(name)
+            target = path
+        tmp_path = target + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, target)
+    
+    if fmt == "csv" or export_csv:
+        csv_path = artifact_path(name, "csv")
+        if append and fmt == "parquet" and not os.path.exists(csv_path):
+            # No copy to append to, so the CSV gets every row of the artifact
+            _export_csv(name, csv_kwargs)
+        elif append and fmt == "parquet":
+            # Appended times are written at the precision of the whole artifact
+            _write_csv(df, csv_path, append, csv_kwargs, _artifact_csv_units(name))
+        else:
+            _write_csv(df, csv_path, append, csv_kwargs)
+    
+    return path
+
+
+def _chunk_schema(schema):
+    """
+    Widen a chunk's Arrow schema so later chunks can be cast to it:
+    dictionary indices become int32, all-null columns become strings and
+    timestamps use nanoseconds.
+    """
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        elif pa.types.is_timestamp(field.type):
+            field = field.with_type(pa.timestamp("ns", tz=field.type.tz))
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def save_frame_chunks(chunks, name, export_csv=EXPORT_CSV, **csv_kwargs):
+    """
+    Save an artifact from an iterable of DataFrame chunks without holding
+    them all in memory. Returns the number of rows written.
+    With no chunks the previous copy of the artifact is deleted.
+    The CSV copy of a Parquet artifact is written from the finished artifact,
+    so its times have the same precision as in a single write of it.
+    """
+    fmt = storage_format()
+    path = artifact_path(name, fmt)
+    tmp_path = path + ".tmp"
+    csv_path = artifact_path(name, "csv")
+    csv_tmp_path = csv_path + ".tmp"
+    writer = None
+    rows = 0
+    first = True
+    
+    try:
+        for chunk in chunks:
+            if fmt == "parquet":
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = _chunk_schema(table.schema)
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(table.cast(schema))
+            
+            if fmt == "csv":
+                # Precision is decided per chunk here, as the rest is not known yet
+                _write_csv(chunk, csv_tmp_path, not first, csv_kwargs)
+            
+            rows += len(chunk)
+            first = False
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    if first:
+        # Nothing to write, so don't leave a stale copy behind to be read back
+        _remove_parts(name)
+        for stale in (artifact_path(name, "parquet"), csv_path):
+            if os.path.exists(stale):
+                os.remove(stale)
+        return rows
+    
+    if writer is not None:
+        _remove_parts(name)
+        os.replace(tmp_path, path)
+        if export_csv:
+            _export_csv(name, csv_kwargs)
+    if os.path.exists(csv_tmp_path):
+        os.replace(csv_tmp_path, csv_path)
+    
+    return rows
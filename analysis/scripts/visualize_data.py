@@ -1,18 +1,28 @@
 # Visualization module for honeypot data analysis.
 
+import argparse
+import inspect
+import json
+import time
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import matplotlib.patches as mpatches
 import numpy as np
 import seaborn as sns
-from datetime import datetime
 import os
-from config import PROCESSED_DIR, CHARTS_DIR, ATTACKER_IPS
+from config import CHARTS_DIR, ATTACKER_IPS
+from concurrent.futures import ProcessPoolExecutor
+from aggregates import load_aggregates, aggregate_digest
+from profiler import start_profile, stage, add_stage, save_profile
 
 
 # THEME CONFIGURATION
 
+# Bump to re-render every chart after a styling change the chart cache cannot see
+THEME_VERSION = 1
+
 # Color palette 
 PALETTE = {
     'cowrie': '#1A5F7A',
@@ -96,43 +106,20 @@ def format_bars(ax, orientation='vertical'):
     ax.tick_params(axis='both', which='both', length=0)
 
 
-def load_all_data():
-    """Load all processed CSV files."""
-    data = {}
-    
-    files = {
-        'unified': 'unified_timeline.csv',
-        'cowrie': 'cowrie_processed.csv',
-        'dionaea': 'dionaea_processed.csv',
-        'logins': 'dionaea_logins.csv',
-        'downloads': 'dionaea_downloads.csv',
-        'sessions': 'attack_sessions.csv',
-        'multi_hp': 'multi_honeypot_attackers.csv'
-    }
-    
-    for key, filename in files.items():
-        filepath = os.path.join(PROCESSED_DIR, filename)
-        if os.path.exists(filepath):
-            df = pd.read_csv(filepath)
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-            if 'start_time' in df.columns:
-                df['start_time'] = pd.to_datetime(df['start_time'])
-            if 'end_time' in df.columns:
-                df['end_time'] = pd.to_datetime(df['end_time'])
-            data[key] = df
-            print(f"Loaded {key}: {len(df)} records")
-    
-    return data
+def chart_path(func):
+    """Return the output path of a chart function, from its file name in CHARTS."""
+    filename = next(filename for _, chart, filename, _ in CHARTS if chart is func)
+    return os.path.join(CHARTS_DIR, filename)
 
 
 # CHART FUNCTIONS
 
-def chart_total_events(data, save=True):
+def chart_total_events(aggs, save=True):
     """Total events comparison between honeypots."""
     
-    cowrie_count = len(data['cowrie'])
-    dionaea_count = len(data['dionaea'])
+    totals = aggs['event_totals']
+    cowrie_count = totals['cowrie_events']
+    dionaea_count = totals['dionaea_events']
     
     fig, ax = plt.subplots(figsize=(8, 5))
     
@@ -163,7 +150,7 @@ def chart_total_events(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'total_events.png')
+        filepath = chart_path(chart_total_events)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -171,11 +158,10 @@ def chart_total_events(data, save=True):
     return fig
 
 
-def chart_attack_types(data, save=True):
+def chart_attack_types(aggs, save=True):
     # Attack category distribution.
     
-    df = data['unified']
-    categories = df['event_category'].value_counts()
+    categories = aggs['category_counts'].copy()
     
     rename_map = {
         'session': 'Session Management',
@@ -218,7 +204,7 @@ def chart_attack_types(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'attack_types.png')
+        filepath = chart_path(chart_attack_types)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -226,17 +212,10 @@ def chart_attack_types(data, save=True):
     return fig
 
 
-def chart_timeline_by_role(data, save=True):
+def chart_timeline_by_role(aggs, save=True):
     """Attack timeline by attacker role."""
     
-    df = data['unified'].copy()
-    df['hour_bin'] = df['timestamp'].dt.floor('h')
-    
-    pivot = df.groupby(['hour_bin', 'attacker_role']).size().unstack(fill_value=0)
-    
-    if len(pivot) > 0:
-        full_range = pd.date_range(start=pivot.index.min(), end=pivot.index.max(), freq='h')
-        pivot = pivot.reindex(full_range, fill_value=0)
+    pivot = aggs['hourly_roles']
     
     role_order = ['recon', 'bruteforce', 'exploit', 'postaccess', 'multistage', 'manual', 'unknown']
     pivot = pivot.reindex(columns=[c for c in role_order if c in pivot.columns])
@@ -270,7 +249,7 @@ def chart_timeline_by_role(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'timeline_by_role.png')
+        filepath = chart_path(chart_timeline_by_role)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -278,11 +257,10 @@ def chart_timeline_by_role(data, save=True):
     return fig
 
 
-def chart_targeted_services(data, save=True):
+def chart_targeted_services(aggs, save=True):
     # Top targeted services across all honeypots.
     
-    df = data['unified']
-    services = df['service'].value_counts().head(10)
+    services = aggs['service_counts'].head(10)
     
     fig, ax = plt.subplots(figsize=(10, 6))
     
@@ -314,7 +292,7 @@ def chart_targeted_services(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'targeted_services.png')
+        filepath = chart_path(chart_targeted_services)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -322,31 +300,13 @@ def chart_targeted_services(data, save=True):
     return fig
 
 
-def chart_credentials(data, save=True):
+def chart_credentials(aggs, save=True):
     # Top credentials used across all honeypots.
     
-    cowrie = data['cowrie'][['username', 'password']].dropna(subset=['username'])
-    dionaea = data['logins'][['username', 'password']].dropna(subset=['username'])
-    all_creds = pd.concat([cowrie, dionaea], ignore_index=True)
-    
-    def clean_password(x):
-        if pd.isna(x):
-            return '(empty)'
-        x_str = str(x).strip()
-        if x_str == '' or x_str == 'nan' or x_str == 'None':
-            return '(empty)'
-        return x_str[:20] if len(x_str) > 20 else x_str
-    
-    all_creds['password'] = all_creds['password'].apply(clean_password)
-    
-    def clean_username(x):
-        x_str = str(x).strip()
-        return x_str[:20] if len(x_str) > 20 else x_str
-    
-    all_creds['username'] = all_creds['username'].apply(clean_username)
+    credentials = aggs['credential_counts']
     
-    top_users = all_creds['username'].value_counts().head(10)
-    top_passwords = all_creds['password'].value_counts().head(10)
+    top_users = credentials['usernames'].head(10)
+    top_passwords = credentials['passwords'].head(10)
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
     
@@ -382,7 +342,7 @@ def chart_credentials(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'credentials.png')
+        filepath = chart_path(chart_credentials)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -390,14 +350,12 @@ def chart_credentials(data, save=True):
     return fig
 
 
-def chart_login_success(data, save=True):
+def chart_login_success(aggs, save=True):
     # Login attempt outcomes in Cowrie.
     
-    df = data['cowrie']
-    login_events = df[df['event_type'].str.contains('login', case=False, na=False)]
-    
-    success_count = len(login_events[login_events['event_type'].str.contains('success', case=False, na=False)])
-    failed_count = len(login_events[login_events['event_type'].str.contains('failed', case=False, na=False)])
+    outcomes = aggs['login_outcomes']
+    success_count = outcomes['success']
+    failed_count = outcomes['failed']
     
     fig, ax = plt.subplots(figsize=(8, 7))
     
@@ -433,7 +391,7 @@ def chart_login_success(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'login_success.png')
+        filepath = chart_path(chart_login_success)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -441,34 +399,10 @@ def chart_login_success(data, save=True):
     return fig
 
 
-def chart_commands(data, save=True):
+def chart_commands(aggs, save=True):
     # Top commands executed in Cowrie.
     
-    df = data['cowrie']
-    commands = df[df['event_category'] == 'command']['input'].dropna()
-    commands = commands.str.strip()
-    commands = commands[commands != '']
-    
-    sip_patterns = [
-        'CSeq:', 'Max-Forwards:', 'Call-ID:', 'Content-Length:',
-        'Accept:', 'Via:', 'From:', 'To:', 'Contact:', 'User-Agent:',
-        'SIP/', 'OPTIONS sip:', 'INVITE sip:', 'REGISTER sip:',
-        'application/sdp', 'sip:', '@', 'Allow:'
-    ]
-    
-    def is_valid_shell_command(cmd):
-        cmd_upper = str(cmd).upper()
-        for pattern in sip_patterns:
-            if pattern.upper() in cmd_upper:
-                return False
-        if cmd_upper.startswith(('OPTIONS ', 'INVITE ', 'REGISTER ')):
-            return False
-        if cmd.isdigit():
-            return False
-        return True
-    
-    commands = commands[commands.apply(is_valid_shell_command)]
-    command_counts = commands.value_counts().head(15)
+    command_counts = aggs['command_counts'].head(15)
     
     fig, ax = plt.subplots(figsize=(11, 7))
     
@@ -495,7 +429,7 @@ def chart_commands(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'commands.png')
+        filepath = chart_path(chart_commands)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -503,13 +437,11 @@ def chart_commands(data, save=True):
     return fig
 
 
-def chart_heatmap(data, save=True):
+def chart_heatmap(aggs, save=True):
     # Attack activity heatmap by hour and role.
     
-    df = data['unified'].copy()
-    df['hour'] = df['timestamp'].dt.hour
-    
-    pivot = df.groupby(['hour', 'attacker_role']).size().unstack(fill_value=0)
+    hourly = aggs['hourly_roles']
+    pivot = hourly.groupby(hourly.index.hour).sum()
     
     pivot = pivot.reindex(range(24), fill_value=0)
     
@@ -537,7 +469,7 @@ def chart_heatmap(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'heatmap.png')
+        filepath = chart_path(chart_heatmap)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -545,13 +477,10 @@ def chart_heatmap(data, save=True):
     return fig
 
 
-def chart_session_duration(data, save=True):
+def chart_session_duration(aggs, save=True):
     # Session duration distribution by attacker role.
     
-    df = data['sessions'].copy()
-    df['duration_seconds'] = (df['end_time'] - df['start_time']).dt.total_seconds()
-    
-    df = df[(df['duration_seconds'] > 0) & (df['duration_seconds'] < 7200)]
+    df = aggs['session_durations']
     
     role_order = ['manual', 'recon', 'bruteforce', 'exploit', 'postaccess', 'multistage']
     roles = [r for r in role_order if r in df['attacker_role'].values]
@@ -590,7 +519,7 @@ def chart_session_duration(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'session_duration.png')
+        filepath = chart_path(chart_session_duration)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -598,11 +527,10 @@ def chart_session_duration(data, save=True):
     return fig
 
 
-def chart_protocols(data, save=True):
+def chart_protocols(aggs, save=True):
     # Protocol/service distribution in Dionaea.
     
-    df = data['dionaea']
-    services = df['service'].value_counts()
+    services = aggs['dionaea_service_counts']
     
     TOP_N = 8
     if len(services) > TOP_N:
@@ -648,7 +576,7 @@ def chart_protocols(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'protocols.png')
+        filepath = chart_path(chart_protocols)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -656,28 +584,27 @@ def chart_protocols(data, save=True):
     return fig
 
 
-def chart_comparison(data, save=True):
+def chart_comparison(aggs, save=True):
     # Comparative metrics between honeypots.
     
-    cowrie_df = data['cowrie']
-    dionaea_df = data['dionaea']
+    totals = aggs['event_totals']
     
     metrics = {
         'Total\nEvents': [
-            len(cowrie_df),
-            len(dionaea_df)
+            totals['cowrie_events'],
+            totals['dionaea_events']
         ],
         'Unique\nAttackers': [
-            cowrie_df['src_ip'].nunique(),
-            dionaea_df['src_ip'].nunique()
+            totals['cowrie_attackers'],
+            totals['dionaea_attackers']
         ],
         'Auth\nAttempts': [
-            len(cowrie_df[cowrie_df['event_category'] == 'authentication']),
-            len(data['logins']) if 'logins' in data else 0
+            totals['cowrie_auth'],
+            totals['dionaea_logins']
         ],
         'Shell Cmds\n/ Net Conns*': [
-            len(cowrie_df[cowrie_df['event_category'] == 'command']),
-            len(dionaea_df)
+            totals['cowrie_commands'],
+            totals['dionaea_events']
         ]
     }
     
@@ -718,7 +645,7 @@ def chart_comparison(data, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'comparison.png')
+        filepath = chart_path(chart_comparison)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -726,7 +653,7 @@ def chart_comparison(data, save=True):
     return fig
 
 
-def chart_dashboard(data, save=True):
+def chart_dashboard(aggs, save=True):
     # Overview dashboard.
     
     fig = plt.figure(figsize=(16, 12))
@@ -735,11 +662,10 @@ def chart_dashboard(data, save=True):
     gs = fig.add_gridspec(3, 3, hspace=0.4, wspace=0.3, 
                           left=0.06, right=0.94, top=0.9, bottom=0.08)
     
-    unified_df = data['unified']
-    cowrie_df = data['cowrie']
+    cowrie_credentials = aggs['cowrie_credential_counts']
     
     ax1 = fig.add_subplot(gs[0, 0])
-    counts = unified_df['source'].value_counts()
+    counts = aggs['source_counts']
     ax1.bar(['Cowrie', 'Dionaea'], [counts.get('cowrie', 0), counts.get('dionaea', 0)],
             color=[PALETTE['cowrie'], PALETTE['dionaea']], edgecolor='white')
     ax1.set_title('Events by Honeypot', fontweight='bold', fontsize=10)
@@ -747,7 +673,7 @@ def chart_dashboard(data, save=True):
     format_bars(ax1)
     
     ax2 = fig.add_subplot(gs[0, 1])
-    roles = unified_df['attacker_role'].value_counts().head(6)
+    roles = aggs['role_counts'].head(6)
     colors = [ROLE_PALETTE.get(r, '#999') for r in roles.index]
     ax2.barh(range(len(roles)), roles.values, color=colors, edgecolor='white')
     ax2.set_yticks(range(len(roles)))
@@ -757,7 +683,7 @@ def chart_dashboard(data, save=True):
     format_bars(ax2)
     
     ax3 = fig.add_subplot(gs[0, 2])
-    services = unified_df['service'].value_counts().head(6)
+    services = aggs['service_counts'].head(6)
     ax3.barh(range(len(services)), services.values, color=PALETTE['primary'], edgecolor='white')
     ax3.set_yticks(range(len(services)))
     ax3.set_yticklabels(services.index, fontsize=9)
@@ -766,7 +692,7 @@ def chart_dashboard(data, save=True):
     format_bars(ax3)
     
     ax4 = fig.add_subplot(gs[1, 0])
-    categories = unified_df['event_category'].value_counts()
+    categories = aggs['category_counts']
     colors = plt.cm.Set2(np.linspace(0, 1, len(categories)))
     wedges, texts, autotexts = ax4.pie(categories.values, labels=None, autopct='%1.0f%%', startangle=90,
             colors=colors,
@@ -776,7 +702,7 @@ def chart_dashboard(data, save=True):
     ax4.set_title('Event Categories', fontweight='bold', fontsize=10)
     
     ax5 = fig.add_subplot(gs[1, 1])
-    users = cowrie_df['username'].dropna().value_counts().head(5)
+    users = cowrie_credentials['usernames'].head(5)
     ax5.barh(range(len(users)), users.values, color=PALETTE['secondary'], edgecolor='white')
     ax5.set_yticks(range(len(users)))
     ax5.set_yticklabels(users.index, fontfamily='monospace', fontsize=9)
@@ -786,16 +712,7 @@ def chart_dashboard(data, save=True):
     
     ax6 = fig.add_subplot(gs[1, 2])
     
-    def clean_pwd(x):
-        if pd.isna(x):
-            return '(empty)'
-        x_str = str(x).strip()
-        if x_str == '' or x_str == 'nan' or x_str == 'None':
-            return '(empty)'
-        return x_str[:15] if len(x_str) > 15 else x_str
-    
-    pwd_cleaned = cowrie_df['password'].apply(clean_pwd)
-    passwords = pwd_cleaned.value_counts().head(5)
+    passwords = cowrie_credentials['passwords'].head(5)
     ax6.barh(range(len(passwords)), passwords.values, color=PALETTE['accent'], edgecolor='white')
     ax6.set_yticks(range(len(passwords)))
     ax6.set_yticklabels(passwords.index, fontfamily='monospace', fontsize=9)
@@ -804,7 +721,7 @@ def chart_dashboard(data, save=True):
     format_bars(ax6)
     
     ax7 = fig.add_subplot(gs[2, :])
-    hourly = unified_df.set_index('timestamp').resample('h').size()
+    hourly = aggs['hourly_roles'].sum(axis=1)
     ax7.fill_between(hourly.index, hourly.values, alpha=0.3, color=PALETTE['primary'])
     ax7.plot(hourly.index, hourly.values, color=PALETTE['primary'], linewidth=2)
     ax7.set_title('Attack Activity Over Time', fontweight='bold', fontsize=10)
@@ -820,7 +737,7 @@ def chart_dashboard(data, save=True):
              ha='center', fontsize=10, style='italic', color=PALETTE['text_secondary'])
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'dashboard.png')
+        filepath = chart_path(chart_dashboard)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -828,16 +745,15 @@ def chart_dashboard(data, save=True):
     return fig
 
 
-def chart_attack_sources(data: dict, save=True):
+def chart_attack_sources(aggs: dict, save=True):
     """Attack source distribution by IP address."""
     
-    # Use individual CSVs for accurate counts matching text
-    cowrie_df = data['cowrie']
-    dionaea_df = data['dionaea']
+    # Use individual honeypot counts for accurate counts matching text
+    sources = aggs['source_ip_counts']
     
     # Combine counts from both honeypots by src_ip
-    cowrie_counts = cowrie_df.groupby('src_ip').size()
-    dionaea_counts = dionaea_df.groupby('src_ip').size()
+    cowrie_counts = sources['cowrie']
+    dionaea_counts = sources['dionaea']
     
     # Merge counts
     all_ips = set(cowrie_counts.index) | set(dionaea_counts.index)
@@ -873,8 +789,8 @@ def chart_attack_sources(data: dict, save=True):
     
     ax.set_xlim(0, ip_counts.max() * 1.15)
     
-    # Get roles from individual CSVs
-    all_roles = set(cowrie_df['attacker_role'].unique()) | set(dionaea_df['attacker_role'].unique())
+    # Get roles from individual honeypots
+    all_roles = set(sources['roles'])
     legend_handles = []
     for role in ['recon', 'bruteforce', 'exploit', 'postaccess', 'multistage', 'manual']:
         if role in all_roles:
@@ -890,7 +806,7 @@ def chart_attack_sources(data: dict, save=True):
     plt.tight_layout()
     
     if save:
-        filepath = os.path.join(CHARTS_DIR, 'attack_sources.png')
+        filepath = chart_path(chart_attack_sources)
         plt.savefig(filepath, facecolor=fig.get_facecolor())
         print(f"Saved: {filepath}")
     
@@ -900,51 +816,196 @@ def chart_attack_sources(data: dict, save=True):
 
 # MAIN
 
-def main():
-    """Generate all visualization charts."""
+# Chart name, function, output file and the aggregates it is drawn from
+CHARTS = [
+    ("Total Events", chart_total_events, 'total_events.png', ['event_totals']),
+    ("Attack Types", chart_attack_types, 'attack_types.png', ['category_counts']),
+    ("Timeline by Role", chart_timeline_by_role, 'timeline_by_role.png', ['hourly_roles']),
+    ("Targeted Services", chart_targeted_services, 'targeted_services.png', ['service_counts']),
+    ("Credentials", chart_credentials, 'credentials.png', ['credential_counts']),
+    ("Login Success", chart_login_success, 'login_success.png', ['login_outcomes']),
+    ("Commands", chart_commands, 'commands.png', ['command_counts']),
+    ("Heatmap", chart_heatmap, 'heatmap.png', ['hourly_roles']),
+    ("Session Duration", chart_session_duration, 'session_duration.png', ['session_durations']),
+    ("Protocols", chart_protocols, 'protocols.png', ['dionaea_service_counts']),
+    ("Comparison", chart_comparison, 'comparison.png', ['event_totals']),
+    ("Dashboard", chart_dashboard, 'dashboard.png',
+     ['source_counts', 'role_counts', 'service_counts', 'category_counts',
+      'cowrie_credential_counts', 'hourly_roles']),
+    ("Attack Sources", chart_attack_sources, 'attack_sources.png', ['source_ip_counts'])
+]
+
+# Content hashes of the charts last rendered, by output file
+CHART_MANIFEST = os.path.join(CHARTS_DIR, "chart_manifest.json")
+
+
+def theme_fingerprint():
+    """Hash of everything shared by all charts: theme version, palettes, helpers and IP roles."""
+    helpers = [inspect.getsource(func) for func in (apply_theme, add_chart_title, format_bars)]
+    return aggregate_digest(THEME_VERSION, PALETTE, ROLE_PALETTE, ATTACKER_IPS, helpers)
+
+
+def chart_key(index, aggs, theme):
+    """Content hash of a chart: its input aggregates, its code and the theme."""
+    _, func, _, inputs = CHARTS[index]
+    return aggregate_digest(theme, inspect.getsource(func),
+                            [aggs.get(name) for name in inputs])
+
+
+def load_manifest():
+    """Load the chart manifest, or an empty one if missing or unreadable."""
+    try:
+        with open(CHART_MANIFEST, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    """Atomically write the chart manifest."""
+    tmp_path = CHART_MANIFEST + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, CHART_MANIFEST)
+
+
+def render_chart(index, aggs):
+    """
+    Render one chart from CHARTS, returning its index, seconds taken, error
+    (or None) and profiler stage record.
+    """
+    name, func, _, _ = CHARTS[index]
+    error = None
+    try:
+        with stage(func.__name__) as record:
+            print(f"\n  Generating {name}...")
+            func(aggs)
+    except Exception as e:
+        print(f"  Error in {name}: {e}")
+        error = str(e)
+    return index, record["wall_seconds"], error, record
+
+
+# Chart aggregates in a worker process, set by _init_worker
+_worker_aggs = None
+
+
+def _init_worker(aggs):
+    """Set up a chart worker: non-interactive backend and the chart aggregates."""
+    global _worker_aggs
+    matplotlib.use("Agg")
+    _worker_aggs = aggs
+
+
+def _render_in_worker(index):
+    """Render one chart in a worker process."""
+    return render_chart(index, _worker_aggs)
+
+
+def render_charts_parallel(aggs, workers, indices):
+    """
+    Render the given charts in a process pool. The aggregates are small, so
+    they are pickled to each worker once when it starts.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(aggs,)) as executor:
+        return list(executor.map(_render_in_worker, indices))
+
+
+def print_timings(results):
+    """Print the time taken by each chart, slowest first."""
+    print("\nChart timings:")
+    for index, seconds, error, _ in sorted(results, key=lambda r: r[1], reverse=True):
+        status = " (failed)" if error else ""
+        print(f"  {CHARTS[index][0]:<20} {seconds:6.2f}s{status}")
+
+
+def generate_charts(aggs, workers=1, force=False):
+    """
+    Render every chart from the aggregates and print the timings.
+    Charts whose inputs, code and theme are unchanged since they were last
+    rendered are reused unless force=True.
+    With workers > 1 the charts are rendered in parallel processes.
+    """
+    print("\nGenerating charts...")
+    start = time.perf_counter()
+    
+    # Skip charts whose content hash matches the one recorded when last rendered
+    manifest = load_manifest()
+    theme = theme_fingerprint()
+    keys = [chart_key(index, aggs, theme) for index in range(len(CHARTS))]
+    reused = [index for index, (_, _, filename, _) in enumerate(CHARTS)
+              if not force and manifest.get(filename) == keys[index]
+              and os.path.exists(os.path.join(CHARTS_DIR, filename))]
+    pending = [index for index in range(len(CHARTS)) if index not in reused]
+    
+    if workers > 1 and len(pending) > 1:
+        results = render_charts_parallel(aggs, workers, pending)
+        # Charts rendered in worker processes were timed there
+        for result in results:
+            add_stage(result[3])
+    else:
+        results = [render_chart(index, aggs) for index in pending]
+    
+    for index, _, error, _ in results:
+        filename = CHARTS[index][2]
+        if error is None and os.path.exists(os.path.join(CHARTS_DIR, filename)):
+            manifest[filename] = keys[index]
+        else:
+            manifest.pop(filename, None)
+    save_manifest(manifest)
+    
+    elapsed = time.perf_counter() - start
+    successful = sum(1 for _, _, error, _ in results if error is None)
+    if results:
+        print_timings(results)
+    if reused:
+        print("\nReused unchanged charts:")
+        for index in reused:
+            print(f"  {CHARTS[index][0]}")
+    
+    print("\n" + "=" * 60)
+    print(f"Complete: {successful}/{len(pending)} charts generated, "
+          f"{len(reused)} reused in {elapsed:.1f}s")
+    print("=" * 60)
+    print(f"\nOutput directory: {CHARTS_DIR}")
+    
+    return results
+
+
+def main(workers=1, refresh=False, force=False):
+    """
+    Generate all visualization charts.
+    Charts whose inputs, code and theme are unchanged since they were last
+    rendered are reused unless force=True.
+    With workers > 1 the charts are rendered in parallel processes.
+    With refresh=True the chart aggregates are recomputed even if cached.
+    """
     
     print("=" * 60)
     print("Honeypot Data Visualization")
     print("=" * 60)
+    start_profile("visualize_data")
     
-    print("\nLoading processed data...")
-    data = load_all_data()
+    print("\nLoading chart aggregates...")
+    with stage("load_aggregates"):
+        aggs = load_aggregates(refresh)
     
-    if not data:
+    if not aggs:
         print("Error: No data found. Run correlate_logs.py first.")
+        save_profile()
         return
     
-    print("\nGenerating charts...")
-    
-    charts = [
-        ("Total Events", chart_total_events),
-        ("Attack Types", chart_attack_types),
-        ("Timeline by Role", chart_timeline_by_role),
-        ("Targeted Services", chart_targeted_services),
-        ("Credentials", chart_credentials),
-        ("Login Success", chart_login_success),
-        ("Commands", chart_commands),
-        ("Heatmap", chart_heatmap),
-        ("Session Duration", chart_session_duration),
-        ("Protocols", chart_protocols),
-        ("Comparison", chart_comparison),
-        ("Dashboard", chart_dashboard),
-        ("Attack Sources", chart_attack_sources)
-    ]
-    
-    successful = 0
-    for name, func in charts:
-        try:
-            print(f"\n  Generating {name}...")
-            func(data)
-            successful += 1
-        except Exception as e:
-            print(f"  Error in {name}: {e}")
-    
-    print("\n" + "=" * 60)
-    print(f"Complete: {successful}/{len(charts)} charts generated")
-    print("=" * 60)
-    print(f"\nOutput directory: {CHARTS_DIR}")
+    generate_charts(aggs, workers, force)
+    print(f"Profile saved to: {save_profile()}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate charts from processed honeypot data.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes rendering charts in parallel")
+    parser.add_argument("--refresh", action="store_true",
+                        help="recompute the chart aggregates instead of using the cache")
+    parser.add_argument("--force", action="store_true",
+                        help="re-render every chart even if it is up to date")
+    args = parser.parse_args()
+    main(workers=args.workers, refresh=args.refresh, force=args.force)
@@ -0,0 +1,10 @@
+# Test setup: the analysis scripts are flat modules, so put their directory on the path.
+# HOME points at a temporary directory before config.py is imported, so tests never
+# touch real captures or processed data.
+
+import os
+import sys
+import tempfile
+
+os.environ["HOME"] = tempfile.mkdtemp(prefix="honeypot_tests_")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
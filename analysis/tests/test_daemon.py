@@ -0,0 +1,49 @@
+# Tests for saving the live sessions of the correlation daemon.
+
+import pandas as pd
+from daemon import new_live_state, save_live_sessions
+from sessionizer import add_events, open_session_records, sessions_frame
+from storage import load_frame
+
+
+def timeline(ip, start, count, step=10):
+    """Return timeline events from one IP every step seconds."""
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=count, freq=f"{step}s"),
+        "source": "cowrie",
+        "src_ip": ip,
+        "attacker_role": "unknown",
+        "event_type": "cowrie.session.connect",
+        "event_category": "connection",
+        "service": "SSH/Telnet",
+        "detail": ""
+    })
+
+
+def test_saves_append_closed_sessions_and_rewrite_open_ones():
+    state = new_live_state(window_seconds=60)
+    batches = [timeline("172.16.0.101", "2026-02-06 00:00", 3),
+               timeline("172.16.0.102", "2026-02-06 00:10", 3),
+               timeline("172.16.0.101", "2026-02-06 00:20", 3)]
+    
+    every_closed = []
+    for batch in batches:
+        closed = add_events(state["sessionizer"], batch)
+        every_closed.extend(closed)
+        save_live_sessions(closed, open_session_records(state["sessionizer"]), state["saved"])
+        state["saved"] += len(closed)
+    
+    saved = load_frame("live_sessions")
+    open_sessions = load_frame("live_open_sessions")
+    assert len(saved) == state["saved"] == 2
+    assert len(open_sessions) == 1
+    assert sorted(saved["session_id"].tolist() + open_sessions["session_id"].tolist()) == [1, 2, 3]
+    
+    expected = sessions_frame(every_closed).drop(columns="session_id")
+    pd.testing.assert_frame_equal(
+        saved.drop(columns="session_id").sort_values(["src_ip", "start_time"], ignore_index=True),
+        expected, check_dtype=False, check_categorical=False)
+    
+    # A new run starts over instead of appending to the previous run's sessions
+    save_live_sessions([], [], 0)
+    assert load_frame("live_sessions").empty
@@ -0,0 +1,73 @@
+# Tests for incremental Cowrie log reading.
+
+import json
+import os
+from load_cowrie import read_cowrie_increment
+
+
+def cowrie_lines(first, count):
+    """Return Cowrie log lines numbered from first, one second apart."""
+    lines = []
+    for i in range(first, first + count):
+        event = {
+            "timestamp": f"2026-02-06T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}.000000Z",
+            "eventid": "cowrie.command.input",
+            "src_ip": "172.16.0.104",
+            "session": "3d0abfdd43c6",
+            "input": f"echo {i}",
+            "message": f"CMD: echo {i}",
+            "protocol": "ssh"
+        }
+        lines.append(json.dumps(event) + "\n")
+    return lines
+
+
+def append_lines(path, lines):
+    with open(path, 'a') as f:
+        f.writelines(lines)
+
+
+def test_increment_reads_appended_lines(tmp_path):
+    log = str(tmp_path / "cowrie.json")
+    append_lines(log, cowrie_lines(0, 50))
+    df, checkpoint = read_cowrie_increment(log)
+    assert len(df) == 50
+    
+    append_lines(log, cowrie_lines(50, 25))
+    df, checkpoint = read_cowrie_increment(log, checkpoint)
+    assert df["input"].tolist() == [f"echo {i}" for i in range(50, 75)]
+    
+    df, _ = read_cowrie_increment(log, checkpoint)
+    assert len(df) == 0
+
+
+def test_increment_finishes_rotated_log(tmp_path):
+    log = str(tmp_path / "cowrie.json")
+    append_lines(log, cowrie_lines(0, 50))
+    _, checkpoint = read_cowrie_increment(log)
+    
+    # 50 more events reach the old log, which is then rotated and replaced
+    append_lines(log, cowrie_lines(50, 50))
+    os.rename(log, str(tmp_path / "cowrie.json.2026-02-06"))
+    append_lines(log, cowrie_lines(100, 50))
+    
+    df, checkpoint = read_cowrie_increment(log, checkpoint)
+    assert df["input"].tolist() == [f"echo {i}" for i in range(50, 150)]
+    assert checkpoint["inode"] == os.stat(log).st_ino
+    
+    append_lines(log, cowrie_lines(150, 10))
+    df, _ = read_cowrie_increment(log, checkpoint)
+    assert df["input"].tolist() == [f"echo {i}" for i in range(150, 160)]
+
+
+def test_increment_without_rotated_log_skips_seen_events(tmp_path):
+    log = str(tmp_path / "cowrie.json")
+    append_lines(log, cowrie_lines(0, 50))
+    _, checkpoint = read_cowrie_increment(log)
+    
+    # The rotated log is gone; the new log repeats some already processed events
+    os.remove(log)
+    append_lines(log, cowrie_lines(40, 30))
+    
+    df, _ = read_cowrie_increment(log, checkpoint)
+    assert df["input"].tolist() == [f"echo {i}" for i in range(50, 70)]
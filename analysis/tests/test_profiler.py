@@ -0,0 +1,22 @@
+# Tests for the stage profiler.
+
+import json
+import numpy as np
+from profiler import start_profile, stage, save_profile
+
+
+def test_run_peak_covers_earlier_stages():
+    start_profile("test")
+    with stage("large"):
+        block = np.ones(200_000_000 // 8)
+        del block
+    with stage("small"):
+        sum(range(1000))
+    
+    with open(save_profile()) as f:
+        profile = json.load(f)
+    
+    large, small = profile["stages"]
+    if large["peak_rss_scope"] == "stage":
+        assert large["peak_rss_mb"] > small["peak_rss_mb"] + 150
+        assert profile["peak_rss_mb"] >= large["peak_rss_mb"]
@@ -0,0 +1,38 @@
+# Tests for the materialized timeline rollups.
+
+import numpy as np
+import pandas as pd
+from rollups import rollup_events, merge_rollups, rollup_statistics
+
+
+def timeline():
+    """Return timeline events with a missing source IP and a missing service."""
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(["2026-02-06 00:00:10", "2026-02-06 00:01:00",
+                                     "2026-02-06 01:00:00", "2026-02-07 00:00:00"]),
+        "source": pd.Series(["cowrie", "cowrie", "dionaea", "dionaea"], dtype="category"),
+        "src_ip": pd.Series(["172.16.0.101", np.nan, "172.16.0.102", "172.16.0.101"], dtype="category"),
+        "attacker_role": ["scanner", "scanner", "unknown", "scanner"],
+        "event_category": ["connection", "command", "connection", "authentication"],
+        "service": pd.Series(["SSH/Telnet", "SSH/Telnet", np.nan, "SMB"], dtype="category")
+    })
+
+
+def test_missing_keys_stay_missing():
+    events = timeline()
+    rollups = rollup_events(events)
+    stats = rollup_statistics(rollups)
+    
+    assert not (rollups["ips"]["src_ip"] == "nan").any()
+    assert rollups["ips"]["src_ip"].isna().sum() == 1
+    assert stats["total_events"] == 4
+    assert stats["unique_ips"] == events["src_ip"].nunique() == 2
+    assert stats["services_targeted"] == events["service"].value_counts().to_dict()
+    assert stats["time_range"] == {"start": events["timestamp"].min(), "end": events["timestamp"].max()}
+
+
+def test_merged_rollups_match_one_rollup():
+    events = timeline()
+    merged = merge_rollups(rollup_events(events.iloc[:2]), rollup_events(events.iloc[2:]))
+    
+    assert rollup_statistics(merged) == rollup_statistics(rollup_events(events))
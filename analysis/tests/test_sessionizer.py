@@ -0,0 +1,72 @@
+# Tests that the streaming sessionizer matches the batch attack sessions.
+
+import pandas as pd
+from correlate_logs import identify_attack_sessions, summarize_sessions
+from sessionizer import sessionize_stream
+
+
+def events(ip, source, role, start, count, step=10):
+    """Return timeline events from one IP every step seconds."""
+    return pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=count, freq=f"{step}s"),
+        "source": source,
+        "src_ip": ip,
+        "attacker_role": role,
+        "event_type": "connection",
+        "event_category": "connection",
+        "service": "SSH/Telnet",
+        "detail": ""
+    })
+
+
+def timeline(*parts):
+    """Return the events of all parts in time order."""
+    df = pd.concat(parts, ignore_index=True)
+    return df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+def chunks(df, size):
+    """Split a timeline into chunks of size rows."""
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def batch_sessions(df, window_seconds):
+    """Return the attack_sessions summary of a timeline, as correlate_logs.py builds it."""
+    return summarize_sessions(identify_attack_sessions(df, window_seconds))
+
+
+def test_stream_matches_attack_sessions():
+    df = timeline(
+        events("172.16.0.101", "dionaea", "recon", "2026-02-06 00:00", 12),
+        events("172.16.0.101", "cowrie", "recon", "2026-02-06 00:01:05", 6),
+        # Idle for longer than the window, so a second session
+        events("172.16.0.101", "cowrie", "recon", "2026-02-06 01:00", 5),
+        events("172.16.0.102", "cowrie", "bruteforce", "2026-02-06 00:00:05", 30, step=7),
+        events("172.16.0.103", "dionaea", "manual", "2026-02-06 00:03", 8, step=45),
+    )
+    expected = batch_sessions(df, window_seconds=60)
+    assert len(expected) == 4
+    
+    for size in (len(df), 7, 1):
+        pd.testing.assert_frame_equal(sessionize_stream(chunks(df, size), window_seconds=60),
+                                      expected, check_dtype=False, check_categorical=False)
+
+
+def test_evicted_session_splits_when_ip_returns():
+    df = timeline(
+        events("172.16.0.101", "cowrie", "recon", "2026-02-06 00:00", 3),
+        events("172.16.0.102", "cowrie", "recon", "2026-02-06 00:00:05", 3),
+    )
+    expected = batch_sessions(df, window_seconds=60)
+    assert len(expected) == 2
+    
+    # With one open session, each IP closes the other's session early, so
+    # every event after a switch of IP starts a new session
+    sessions = sessionize_stream(chunks(df, 2), window_seconds=60, max_open=1)
+    assert len(sessions) == 6
+    assert sessions.groupby("src_ip")["event_count"].sum().tolist() == [3, 3]
+    assert (sessions["end_time"] == sessions["start_time"]).all()
+    
+    # Enough room for both IPs gives the batch sessions again
+    pd.testing.assert_frame_equal(sessionize_stream(chunks(df, 2), window_seconds=60, max_open=2),
+                                  expected, check_dtype=False, check_categorical=False)
@@ -0,0 +1,113 @@
+# Tests for the processed artifact store.
+
+import os
+import pandas as pd
+from storage import (save_frame, save_frame_chunks, load_frame, iter_frame_chunks, artifact_signature,
+                     artifact_path, frame_exists, storage_format, _part_paths)
+
+
+def events(first, count):
+    """Return a small frame of timeline-like rows numbered from first."""
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2026-02-06", periods=count, freq="s") + pd.Timedelta(seconds=first),
+        "src_ip": pd.Series([f"172.16.0.{101 + i % 5}" for i in range(first, first + count)], dtype="category"),
+        "n": range(first, first + count)
+    })
+
+
+def test_append_writes_parts_read_back_as_one_frame():
+    save_frame(events(0, 10), "test_append")
+    signature = artifact_signature("test_append")
+    save_frame(events(10, 5), "test_append", append=True)
+    save_frame(events(15, 5), "test_append", append=True)
+    
+    if storage_format() == "parquet":
+        assert len(_part_paths("test_append")) == 2
+    assert artifact_signature("test_append") != signature
+    
+    df = load_frame("test_append")
+    assert df["n"].tolist() == list(range(20))
+    assert isinstance(df["src_ip"].dtype, pd.CategoricalDtype)
+    assert load_frame("test_append", columns=["n", "missing"]).columns.tolist() == ["n"]
+    
+    chunks = list(iter_frame_chunks("test_append", columns=["n"], chunksize=4, skip=12))
+    assert pd.concat(chunks)["n"].tolist() == list(range(12, 20))
+
+
+def test_rewrite_drops_appended_parts():
+    save_frame(events(0, 10), "test_rewrite")
+    save_frame(events(10, 5), "test_rewrite", append=True)
+    save_frame(events(100, 3), "test_rewrite")
+    
+    assert _part_paths("test_rewrite") == []
+    assert load_frame("test_rewrite")["n"].tolist() == [100, 101, 102]
+
+
+def test_chunks_replace_artifact_and_csv_copy():
+    save_frame(events(0, 10), "test_chunks", export_csv=True)
+    save_frame(events(10, 5), "test_chunks", append=True, export_csv=True)
+    
+    rows = save_frame_chunks([events(100, 3), events(103, 2)], "test_chunks", export_csv=True)
+    
+    assert rows == 5
+    assert _part_paths("test_chunks") == []
+    assert load_frame("test_chunks")["n"].tolist() == list(range(100, 105))
+    assert pd.read_csv(artifact_path("test_chunks", "csv"))["n"].tolist() == list(range(100, 105))
+    assert not [f for f in os.listdir(os.path.dirname(artifact_path("test_chunks"))) if f.endswith(".tmp")]
+
+
+def test_no_chunks_remove_stale_artifact():
+    save_frame(events(0, 10), "test_empty", export_csv=True)
+    save_frame(events(10, 5), "test_empty", append=True, export_csv=True)
+    
+    assert save_frame_chunks([], "test_empty", export_csv=True) == 0
+    assert not frame_exists("test_empty")
+    assert _part_paths("test_empty") == []
+    assert load_frame("test_empty") is None
+
+
+def test_chunked_csv_matches_single_write():
+    df = events(0, 6)
+    df["timestamp"] = pd.to_datetime(["2026-02-06 00:00:00.123456789", "2026-02-06 00:00:01",
+                                      "2026-02-06 00:00:02", "2026-02-06 00:00:03",
+                                      "2026-02-06 00:00:04", None], format="mixed")
+    
+    save_frame(df, "test_whole", export_csv=True)
+    save_frame_chunks([df.iloc[:1], df.iloc[1:4], df.iloc[4:]], "test_parts", export_csv=True)
+    
+    save_frame(df.iloc[:4], "test_appended", export_csv=True)
+    save_frame(df.iloc[4:], "test_appended", append=True, export_csv=True)
+    
+    with open(artifact_path("test_whole", "csv")) as whole:
+        expected = whole.read()
+    for name in ("test_parts", "test_appended"):
+        with open(artifact_path(name, "csv")) as copy:
+            assert copy.read() == expected
+
+
+def test_csv_times_written_as_to_csv_writes_them():
+    df = events(0, 3)
+    df["timestamp"] = pd.to_datetime(["2026-02-06 00:00:00", "2026-02-06 00:00:01", None])
+    df["start_time"] = pd.to_datetime(["2026-02-06", "2026-02-07", "2026-02-08"])
+    df["end_time"] = pd.to_datetime(["2026-02-06 00:00:00.5", None, "2026-02-06 00:00:01"], format="mixed")
+    
+    save_frame_chunks([df.iloc[:1], df.iloc[1:]], "test_plain", export_csv=True)
+    
+    with open(artifact_path("test_plain", "csv")) as copy:
+        assert copy.read() == df.to_csv(index=False)
+
+
+def test_append_without_csv_copy_exports_whole_artifact():
+    save_frame(events(0, 5), "test_late_csv")
+    save_frame(events(5, 2), "test_late_csv", append=True, export_csv=True)
+    save_frame(events(7, 3), "test_late_csv", append=True, export_csv=True)
+    
+    csv = pd.read_csv(artifact_path("test_late_csv", "csv"))
+    assert csv["n"].tolist() == load_frame("test_late_csv")["n"].tolist() == list(range(10))
+    
+    # Appending no rows writes no part, but still brings a missing CSV copy up to date
+    os.remove(artifact_path("test_late_csv", "csv"))
+    parts = _part_paths("test_late_csv")
+    save_frame(events(10, 0), "test_late_csv", append=True, export_csv=True)
+    assert _part_paths("test_late_csv") == parts
+    assert len(pd.read_csv(artifact_path("test_late_csv", "csv"))) == 10